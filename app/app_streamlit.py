@@ -1,4 +1,5 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import requests
 import plotly.express as px
@@ -6,6 +7,8 @@ from datetime import datetime, timedelta
 
 # Configuración inicial
 API_URL = "https://acceptable-amazement-production.up.railway.app/api/v1/predict"
+# La grilla municipio x estación x fecha se expande en el servidor
+GRID_URL = f"{API_URL}/grid"
 
 st.set_page_config(
     page_title="Dashboard de Calidad del Aire",
@@ -109,31 +112,31 @@ with tab2:
             st.warning("Por favor selecciona al menos un municipio y una estación.")
         else:
             start_pred, end_pred = fecha_rango_pred if len(fecha_rango_pred) == 2 else (fecha_rango_pred[0], fecha_rango_pred[0])
-            fechas_pred = pd.date_range(start=start_pred, end=end_pred)
-
-            inputs_api = []
-            for municipio in municipios_pred:
-                for estacion in estaciones_pred:
-                    for fecha in fechas_pred:
-                        inputs_api.append({
-                            "Municipio": municipio,
-                            "Estacion": estacion,
-                            "Año": fecha.year,
-                            "Mes": fecha.month,
-                            "Dia": fecha.day,
-                            "DiaSemana": fecha.day_name()
-                        })
+            grid_request = {
+                "municipios": municipios_pred,
+                "estaciones": estaciones_pred,
+                # Sin diámetro, en estaciones con varios contaminantes los lags irían en NaN
+                "diametros": ["PM10"],
+                "start": pd.Timestamp(start_pred).date().isoformat(),
+                "end": pd.Timestamp(end_pred).date().isoformat(),
+            }
 
             try:
-                response = requests.post(API_URL, json={"inputs": inputs_api})
+                response = requests.post(GRID_URL, json=grid_request)
                 if response.status_code == 200:
                     results = response.json()
-                    df_pred = pd.DataFrame(inputs_api)
-                    df_pred["Fecha"] = [
-                        datetime(row["Año"], row["Mes"], row["Dia"])
-                        for _, row in df_pred.iterrows()
-                    ]
-                    df_pred["Predicción_PM10"] = results.get("predictions", [None]*len(inputs_api))
+                    fechas = pd.to_datetime(results["fechas"])
+                    series = results["series"]
+                    df_pred = pd.DataFrame({
+                        "Municipio": np.repeat([s["Municipio"] for s in series], len(fechas)),
+                        "Estacion": np.repeat([s["Estacion"] for s in series], len(fechas)),
+                        "Fecha": np.tile(fechas, len(series)),
+                    })
+                    df_pred["Año"] = df_pred["Fecha"].dt.year
+                    df_pred["Mes"] = df_pred["Fecha"].dt.month
+                    df_pred["Dia"] = df_pred["Fecha"].dt.day
+                    df_pred["DiaSemana"] = df_pred["Fecha"].dt.day_name()
+                    df_pred["Predicción_PM10"] = [p for s in series for p in s["predictions"]]
 
                     # Métricas principales de las predicciones
                     st.subheader("📊 Métricas de Predicción")
@@ -0,0 +1,192 @@
+"""
+Control de admisión para las rutas de predicción, en dos niveles:
+
+1. `AdmissionMiddleware` (ASGI puro) limita las peticiones en curso a
+   `ADMISSION_MAX_REQUESTS` y rechaza el exceso antes de leer el cuerpo: parsear y
+   validar un lote grande en el event loop ya es trabajo que no se debe aceptar.
+2. En el handler, ya validado el cuerpo, cada petición se cobra por sus filas (un
+   lote de 5000 filas pesa 5000 veces lo que una consulta puntual) contra
+   `ADMISSION_MAX_ROWS`. Si no hay cupo espera en una cola FIFO acotada
+   (`ADMISSION_QUEUE_SIZE`) a lo sumo `ADMISSION_QUEUE_TIMEOUT` segundos.
+
+Al saturarse se responde 503 con `Retry-After`: la sobrecarga se rechaza rápido en
+lugar de alargar la latencia de todas las peticiones en curso.
+
+Un lote más grande que `ADMISSION_MAX_ROWS` se cobra como `ADMISSION_MAX_ROWS`:
+entra cuando el servicio está libre y corre solo. El estado vive en el event loop
+de cada worker (sin locks): todas las llamadas ocurren en ese hilo.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app_api.config import settings
+
+# Petición en espera: (filas cobradas, futuro que se resuelve al admitirla)
+_Waiter = Tuple[int, "asyncio.Future[None]"]
+
+
+class AdmissionController:
+    def __init__(
+        self, max_rows: int, max_requests: int, max_queue: int, timeout: float, retry_after: int = 1
+    ):
+        self.max_rows = max_rows
+        self.max_requests = max_requests
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.inflight_rows = 0
+        self.inflight_requests = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _charge(self, n_rows: int) -> int:
+        return max(1, min(n_rows, self.max_rows))
+
+    def _fits(self, rows: int) -> bool:
+        return self.inflight_rows + rows <= self.max_rows
+
+    def _admit(self, rows: int) -> None:
+        self.inflight_rows += rows
+        self.admitted += 1
+
+    def message(self, reason: str) -> str:
+        return f"Servicio saturado ({reason}); reintente en {self.retry_after} s"
+
+    def _reject(self, reason: str) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=503, detail=self.message(reason), headers={"Retry-After": str(self.retry_after)}
+        )
+
+    def enter(self) -> bool:
+        """Nivel 1: cuenta una petición en curso; False si ya hay `max_requests`."""
+        if self.inflight_requests >= self.max_requests:
+            self.rejected += 1
+            return False
+        self.inflight_requests += 1
+        return True
+
+    def leave(self) -> None:
+        self.inflight_requests -= 1
+
+    async def acquire(self, n_rows: int) -> int:
+        """Nivel 2: espera cupo para `n_rows` filas; devuelve las filas cobradas o lanza 503."""
+        rows = self._charge(n_rows)
+        # Con peticiones en cola no se adelanta a nadie (FIFO: los lotes grandes no se quedan sin turno)
+        if not self._waiters and self._fits(rows):
+            self._admit(rows)
+            return rows
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("cola de admisión llena")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (rows, future)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            if future.done():  # admitida justo al vencer el plazo
+                return rows
+            self._waiters.remove(waiter)
+            # Si era la primera de la cola, las siguientes quizá ya caben
+            self._wake()
+            raise self._reject("tiempo de espera en cola agotado")
+        except asyncio.CancelledError:  # el cliente se desconectó
+            if future.done():
+                self.release(rows)
+            else:
+                self._waiters.remove(waiter)
+                self._wake()
+            raise
+        return rows
+
+    def release(self, rows: int) -> None:
+        self.inflight_rows -= rows
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._fits(self._waiters[0][0]):
+            rows, future = self._waiters.popleft()
+            self._admit(rows)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, n_rows: int) -> AsyncIterator[None]:
+        rows = await self.acquire(n_rows)
+        try:
+            yield
+        finally:
+            self.release(rows)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": len(self._waiters),
+            "inflight_rows": self.inflight_rows,
+            "inflight_requests": self.inflight_requests,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission() -> Optional[AdmissionController]:
+    """Controlador del worker; None si ADMISSION_MAX_ROWS es 0 (sin control de admisión)."""
+    global _controller
+    if settings.ADMISSION_MAX_ROWS <= 0:
+        return None
+    if _controller is None:
+        _controller = AdmissionController(
+            max_rows=settings.ADMISSION_MAX_ROWS,
+            max_requests=settings.ADMISSION_MAX_REQUESTS,
+            max_queue=settings.ADMISSION_QUEUE_SIZE,
+            timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            retry_after=settings.ADMISSION_RETRY_AFTER,
+        )
+    return _controller
+
+
+class AdmissionMiddleware:
+    """Rechaza con 503 las peticiones a `prefix` que excedan ADMISSION_MAX_REQUESTS en curso."""
+
+    def __init__(self, app: ASGIApp, prefix: str):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        controller = get_admission()
+        if controller is None or scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        if not controller.enter():
+            response = JSONResponse(
+                {"detail": controller.message("demasiadas peticiones en curso")},
+                status_code=503,
+                headers={"Retry-After": str(controller.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            # Incluye el envío: una respuesta en streaming cuenta hasta terminar
+            await self.app(scope, receive, send)
+        finally:
+            controller.leave()
+
+
+@asynccontextmanager
+async def admitted(n_rows: int) -> AsyncIterator[None]:
+    """`async with admitted(n):` alrededor del trabajo de una petición de `n` filas."""
+    controller = get_admission()
+    if controller is None:
+        yield
+        return
+    async with controller.admit(n_rows):
+        yield
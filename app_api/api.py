@@ -1,16 +1,31 @@
+import functools
 import json
+import random
+import sys
+import time
 from typing import Any
 
-import numpy as np
-import pandas as pd
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
 from loguru import logger
 #from model import __version__ as model_version
-from calidad_aire.predict import make_prediction
 
-from app_api  import __version__, schemas
+from app_api  import __version__, bulk, metrics, profiling, schemas
+from app_api.admission import admitted, get_admission
+from app_api.batching import get_batcher
 from app_api.config import settings
+from app_api.forecast_table import get_forecast_table, take_rows
+from app_api.inference import run_inference
+from app_api.model_watcher import current_run_id, served_model
+from app_api.prediction_cache import get_prediction_cache
+from app_api.serving import (
+    build_model_columns,
+    expand_grid,
+    get_feature_store,
+    ingest_into_feature_store,
+    rows_to_columns,
+)
+from app_api.shadow import get_shadow
 
 api_router = APIRouter()
 
@@ -20,25 +35,19 @@ def health() -> dict:
     """
     Root Get
     """
+    served = served_model()
     health = schemas.Health(
-        #name=settings.PROJECT_NAME, api_version=__version__, model_version=model_version
-        name=settings.PROJECT_NAME, api_version=__version__, model_version="0.1.0"
+        name=settings.PROJECT_NAME,
+        api_version=__version__,
+        model_version=served.version or served.run_id,
+        model_run_id=served.run_id,
+        model_source=served.source,
+        model_loaded_at=served.loaded_at,
     )
 
     return health.dict()
 
-# Ruta para realizar las predicciones
-@api_router.post("/predict", response_model=schemas.PredictionResults, status_code=200)
-async def predict(input_data: schemas.MultipleDataInputs) -> Any:
-    """
-    Prediccion usando el modelo de contaminacion del aire
-    """
-    MLFLOW_RUN_ID = "d01a7a84488d4849a048119fa83734a3"
-    input_df = pd.DataFrame(jsonable_encoder(input_data.inputs))
-
-    logger.info(f"Making prediction on inputs: {input_data.inputs}")
-    results = make_prediction(input_data=input_df.replace({np.nan: None}),run_id=MLFLOW_RUN_ID)
-    errors = results.get("errors")
+def _raise_for_errors(errors: Any) -> None:
     if errors:
         # Acepta dict/list directo
         if isinstance(errors, (dict, list)):
@@ -53,11 +62,258 @@ async def predict(input_data: schemas.MultipleDataInputs) -> Any:
                 raise HTTPException(status_code=400, detail=json.loads(s))
             except Exception:
                 raise HTTPException(status_code=400, detail=s)
-    
-    logger.info(f"Prediction results: {results.get('predictions')}")
+
+
+def _predict_columns(columns: dict) -> dict:
+    """Ruta rápida: columnas -> features en línea -> matriz float32 -> modelo."""
+    # Importación diferida: /health y / no cargan mlflow/sklearn
+    from calidad_aire.predict import load_compiled_model, make_fast_prediction
+
+    # Se lee una vez: un cambio de modelo en caliente no mezcla modelos dentro de un lote
+    run_id = current_run_id()
+    with metrics.stage("features"):
+        model_columns = build_model_columns(columns)
+    with metrics.stage("model_load"):
+        try:
+            load_compiled_model(run_id)
+        except Exception:
+            pass  # make_fast_prediction devuelve el error en "errors"
+
+    def predict_rows(model_input: dict) -> dict:
+        n_rows = len(next(iter(model_input.values()))) if model_input else 0
+        metrics.MODEL_BATCH_ROWS.observe(n_rows)
+        with metrics.stage("predict"):
+            return make_fast_prediction(columns=model_input, run_id=run_id)
+
+    cache = get_prediction_cache()
+    if cache is None:
+        results = predict_rows(model_columns)
+    else:
+        # Solo las filas que no están en cache llegan al modelo
+        results = cache.predict(run_id, model_columns, predict_rows)
+    _raise_for_errors(results.get("errors"))
+    profiling.mark("first_predict")
 
     # Si no hay errores, devuelve predicciones
     return {
         "predictions": results.get("predictions"),
         "version": results.get("version"),
     }
+
+def _log_sample(n_rows: int, first_row: Any, results: dict) -> None:
+    """Registra un resumen de una fracción de las peticiones (el payload completo es caro)."""
+    if random.random() >= settings.PREDICT_LOG_SAMPLE_RATE:
+        return
+    predictions = results.get("predictions") or []
+    logger.info(
+        f"Predicción de {n_rows} filas; primera fila: {first_row}; "
+        f"primeras predicciones: {predictions[:5]}"
+    )
+
+async def _predict_batched(columns: dict, n_rows: int) -> dict:
+    """Predice con el modelo servido y, si hay candidato en sombra, le encola el mismo lote."""
+    run_id = current_run_id()
+    t0 = time.perf_counter()
+    results = await _predict_served(columns, n_rows)
+    shadow = get_shadow()
+    if shadow is not None:
+        # No bloquea: si la cola está llena el lote se descarta para la sombra
+        shadow.submit(columns, results["predictions"], run_id, time.perf_counter() - t0)
+    return results
+
+async def _predict_served(columns: dict, n_rows: int) -> dict:
+    """Filas de la tabla de pronósticos se responden sin modelo; el resto va a `_predict_model`."""
+    table = get_forecast_table()
+    if table is None or table.run_id != current_run_id():
+        return await _predict_model(columns, n_rows)
+    found, predictions = table.lookup(columns, n_rows)
+    if found.all():
+        return {"predictions": predictions.tolist(), "version": None}
+    if not found.any():
+        return await _predict_model(columns, n_rows)
+    missing = (~found).nonzero()[0].tolist()
+    results = await _predict_model(take_rows(columns, missing), len(missing))
+    predictions[missing] = results["predictions"]
+    return dict(results, predictions=predictions.tolist())
+
+async def _predict_model(columns: dict, n_rows: int) -> dict:
+    """Peticiones pequeñas pasan por el micro-batcher; las grandes van directo al pool."""
+    batcher = get_batcher(_predict_columns)
+    if batcher is None or n_rows >= batcher.max_rows:
+        return await run_inference(_predict_columns, columns)
+    return await batcher.submit(columns, n_rows)
+
+# Ruta para realizar las predicciones
+@api_router.post("/predict", response_model=schemas.PredictionResults, status_code=200)
+async def predict(input_data: schemas.MultipleDataInputs, request: Request) -> Any:
+    """
+    Prediccion usando el modelo de contaminacion del aire
+    """
+    request.state.handler_start = time.perf_counter()
+    n_rows = len(input_data.inputs)
+    metrics.REQUEST_ROWS.observe(n_rows, path=metrics.route_label(request.scope))
+    async with admitted(n_rows):
+        results = await _predict_batched(rows_to_columns(input_data.inputs), n_rows)
+    request.state.handler_end = time.perf_counter()
+    _log_sample(n_rows, input_data.inputs[0] if n_rows else None, results)
+
+    return results
+
+# Ruta para lotes grandes en formato columnar (una lista por columna)
+@api_router.post("/predict/columnar", response_model=schemas.PredictionResults, status_code=200)
+async def predict_columnar(input_data: schemas.ColumnarDataInputs, request: Request) -> Any:
+    """
+    Prediccion por lotes con el payload validado por columna
+    """
+    request.state.handler_start = time.perf_counter()
+    columns = input_data.dict(by_alias=True)
+    if columns.get("Diametro aerodinamico") is None:
+        columns.pop("Diametro aerodinamico", None)
+    n_rows = len(columns["Municipio"])
+    metrics.REQUEST_ROWS.observe(n_rows, path=metrics.route_label(request.scope))
+
+    async with admitted(n_rows):
+        results = await _predict_batched(columns, n_rows)
+    request.state.handler_end = time.perf_counter()
+    _log_sample(n_rows, None, results)
+    return results
+
+# Ruta de pronóstico por grilla: estaciones x rango de fechas en una sola petición
+@api_router.post("/predict/grid", response_model=schemas.GridPredictionResults, status_code=200)
+async def predict_grid(input_data: schemas.GridForecastInputs, request: Request) -> Any:
+    """
+    Prediccion para todas las combinaciones municipio x estacion en un rango de fechas
+    """
+    request.state.handler_start = time.perf_counter()
+    n_days = (input_data.end - input_data.start).days + 1
+    n_combos = len(input_data.municipios) * len(input_data.estaciones) * len(input_data.diametros or [None])
+    n_rows = n_combos * n_days
+    if n_rows > settings.GRID_MAX_ROWS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"La grilla tiene {n_rows} filas; el máximo es {settings.GRID_MAX_ROWS}",
+        )
+    metrics.REQUEST_ROWS.observe(n_rows, path=metrics.route_label(request.scope))
+
+    columns, combos, fechas = expand_grid(
+        input_data.municipios, input_data.estaciones, input_data.diametros, input_data.start, input_data.end
+    )
+    async with admitted(n_rows):
+        results = await _predict_batched(columns, n_rows)
+    predictions = results.get("predictions") or []
+    series = [
+        {
+            "Municipio": municipio,
+            "Estacion": estacion,
+            "Diametro aerodinamico": diametro,
+            "predictions": predictions[i * n_days:(i + 1) * n_days],
+        }
+        for i, (municipio, estacion, diametro) in enumerate(combos)
+    ]
+    request.state.handler_end = time.perf_counter()
+    _log_sample(n_rows, None, results)
+    return {"errors": None, "fechas": fechas, "series": series}
+
+# Ruta para scoring masivo en streaming (NDJSON o Arrow IPC), por bloques
+@api_router.post("/predict/stream", status_code=200)
+async def predict_stream(request: Request) -> bulk.BodyStreamingResponse:
+    """
+    Prediccion masiva: lee el cuerpo por bloques y devuelve las predicciones en streaming
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    async def predict_chunk(columns: dict) -> dict:
+        return await run_inference(_predict_columns, columns)
+
+    if content_type == bulk.NDJSON:
+        stream = bulk.stream_ndjson(request.stream(), predict_chunk, settings.BULK_CHUNK_ROWS)
+    elif content_type == bulk.ARROW_STREAM and bulk.has_pyarrow():
+        stream = bulk.stream_arrow(request.stream(), predict_chunk, settings.BULK_CHUNK_ROWS)
+    else:
+        accepted = [bulk.NDJSON] + ([bulk.ARROW_STREAM] if bulk.has_pyarrow() else [])
+        raise HTTPException(status_code=415, detail=f"Content-Type no soportado. Opciones: {accepted}")
+
+    # Un stream tiene a lo sumo un bloque en el modelo: se admite una vez, cobrando un bloque,
+    # y el cupo se libera al terminar la respuesta (el 503 llega antes de empezar a enviar)
+    controller = get_admission()
+    if controller is None:
+        return bulk.BodyStreamingResponse(stream, media_type=content_type)
+    rows = await controller.acquire(settings.BULK_CHUNK_ROWS)
+    return bulk.BodyStreamingResponse(
+        stream, media_type=content_type, on_close=functools.partial(controller.release, rows)
+    )
+
+def metrics_text() -> str:
+    """Métricas en formato Prometheus, con los contadores de caches y del micro-batcher."""
+    values = []
+    cache = get_prediction_cache()
+    if cache is not None:
+        stats = cache.stats()
+        values += [
+            ("prediction_cache_hits_total", "Filas servidas desde el cache de predicciones", stats["hits"], "counter"),
+            ("prediction_cache_misses_total", "Filas que no estaban en el cache", stats["misses"], "counter"),
+            ("prediction_cache_size", "Filas en el cache de predicciones", stats["size"], "gauge"),
+        ]
+    # Solo si el modelo ya se usó: /metrics no debe importar mlflow/sklearn
+    predict_module = sys.modules.get("calidad_aire.predict")
+    if predict_module is not None:
+        stats = predict_module.model_cache_stats()
+        values += [
+            ("model_cache_hits_total", "Búsquedas del modelo resueltas en memoria", stats["hits"], "counter"),
+            ("model_cache_misses_total", "Búsquedas del modelo que lo cargaron", stats["misses"], "counter"),
+        ]
+    table = get_forecast_table()
+    if table is not None:
+        stats = table.stats()
+        values += [
+            ("forecast_table_hits_total", "Filas respondidas desde la tabla de pronósticos", stats["hits"], "counter"),
+            ("forecast_table_misses_total", "Filas que no estaban en la tabla", stats["misses"], "counter"),
+            ("forecast_table_rows", "Filas en la tabla de pronósticos", stats["size"], "gauge"),
+        ]
+    batcher = get_batcher(_predict_columns)
+    if batcher is not None:
+        values += [
+            ("microbatch_batches_total", "Lotes enviados por el micro-batcher", batcher.batches, "counter"),
+            ("microbatch_rows_total", "Filas agrupadas por el micro-batcher", batcher.batched_rows, "counter"),
+        ]
+    admission = get_admission()
+    if admission is not None:
+        stats = admission.stats()
+        values += [
+            ("admission_queue_depth", "Peticiones esperando cupo de admisión", stats["queue_depth"], "gauge"),
+            ("admission_inflight_rows", "Filas admitidas en curso", stats["inflight_rows"], "gauge"),
+            ("admission_inflight_requests", "Peticiones admitidas en curso", stats["inflight_requests"], "gauge"),
+            ("admission_admitted_total", "Peticiones admitidas", stats["admitted"], "counter"),
+            ("admission_rejected_total", "Peticiones rechazadas con 503 por saturación", stats["rejected"], "counter"),
+        ]
+    shadow = get_shadow()
+    if shadow is not None:
+        stats = shadow.stats()
+        values += [
+            ("shadow_batches_enqueued_total", "Lotes encolados para el modelo en sombra", stats["enqueued"], "counter"),
+            ("shadow_batches_skipped_total", "Lotes fuera de la muestra de la sombra", stats["skipped"], "counter"),
+            ("shadow_batches_dropped_total", "Lotes descartados con la cola de sombra llena", stats["dropped"], "counter"),
+            ("shadow_batches_completed_total", "Lotes predichos y registrados por la sombra", stats["completed"], "counter"),
+            ("shadow_batches_failed_total", "Lotes en los que falló el modelo en sombra", stats["failed"], "counter"),
+            ("shadow_queue_depth", "Lotes pendientes en la cola de sombra", stats["depth"], "gauge"),
+        ]
+    return metrics.render([metrics.gauge_lines(*value) for value in values])
+
+# Ruta para registrar mediciones nuevas en el feature store en línea
+@api_router.post("/measurements", response_model=schemas.IngestResults, status_code=200)
+def ingest_measurements(input_data: schemas.MultipleMeasurements) -> Any:
+    """
+    Actualiza incrementalmente los lags/rollings de cada serie
+    """
+    import pandas as pd
+
+    measurements_df = pd.DataFrame(jsonable_encoder(input_data.measurements))
+    # Se publica en FEATURE_STORE_PATH: los demás workers lo releen (ver app_api.serving)
+    ingested = ingest_into_feature_store(measurements_df)
+    store = get_feature_store()
+    table = get_forecast_table()
+    if table is not None and ingested:
+        # Los pronósticos precalculados de esas series ya no reflejan sus lags
+        table.invalidate(measurements_df.reindex(columns=store.group_cols).itertuples(index=False))
+
+    return {"ingested": ingested, "series": len(store)}
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app_api.config import settings
+from app_api.inference import run_inference
+
+# Petición pendiente: (columnas, nº de filas, futuro del llamador)
+_Pending = Tuple[Dict[str, Sequence], int, "asyncio.Future[Any]"]
+
+
+def merge_columns(requests: List[Tuple[Dict[str, Sequence], int]]) -> Dict[str, list]:
+    """Concatena columnas de varias peticiones; las columnas ausentes se rellenan con None."""
+    names: Dict[str, None] = {}
+    for columns, _ in requests:
+        names.update(dict.fromkeys(columns))
+    merged: Dict[str, list] = {name: [] for name in names}
+    for columns, n_rows in requests:
+        for name in names:
+            values = columns.get(name)
+            merged[name].extend(values if values is not None else [None] * n_rows)
+    return merged
+
+
+class MicroBatcher:
+    """
+    Agrupa las peticiones que llegan dentro de una ventana corta (o hasta `max_rows`
+    filas) en una sola llamada al modelo y reparte las predicciones a cada llamador.
+
+    `handler` recibe columnas (nombre -> valores) y devuelve un dict con
+    "predictions" y "version"; corre en el pool de inferencia. Si el lote falla,
+    cada petición se reintenta por separado para que el error llegue solo a la
+    petición que lo causó.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, list]], dict],
+        max_wait_ms: float = 2.0,
+        max_rows: int = 256,
+    ):
+        self.handler = handler
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._pending: List[_Pending] = []
+        self._rows = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.batched_rows = 0
+
+    async def submit(self, columns: Dict[str, Sequence], n_rows: int) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((columns, n_rows, future))
+        self._rows += n_rows
+        if self._rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._rows = self._pending, [], 0
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[_Pending]) -> None:
+        self.batches += 1
+        self.batched_rows += sum(n for _, n, _ in batch)
+        try:
+            merged = merge_columns([(columns, n) for columns, n, _ in batch])
+            results = await run_inference(self.handler, merged)
+        except Exception as e:
+            if len(batch) == 1:
+                _, _, future = batch[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            await asyncio.gather(*(self._run([item]) for item in batch))
+            return
+
+        predictions = results.get("predictions") or []
+        offset = 0
+        for _, n_rows, future in batch:
+            if not future.done():
+                future.set_result(
+                    dict(results, predictions=predictions[offset:offset + n_rows])
+                )
+            offset += n_rows
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+def get_batcher(handler: Callable[[Dict[str, list]], dict]) -> Optional[MicroBatcher]:
+    """Batcher del proceso (None si BATCH_WINDOW_MS <= 0)."""
+    global _batcher
+    if settings.BATCH_WINDOW_MS <= 0:
+        return None
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            handler, max_wait_ms=settings.BATCH_WINDOW_MS, max_rows=settings.BATCH_MAX_ROWS
+        )
+    return _batcher
@@ -0,0 +1,227 @@
+"""
+Scoring masivo en streaming (NDJSON o Arrow IPC).
+
+El cuerpo de la petición se lee a medida que llega, se reagrupa en bloques de
+tamaño fijo y cada bloque se predice y se envía de vuelta antes de leer el
+siguiente: la memoria del servidor depende del tamaño del bloque, no del lote.
+
+- NDJSON: una fila `DataInputSchema` por línea; la respuesta es una línea
+  `{"prediction": ...}` por fila, en el mismo orden. Un error corta el stream con
+  una línea `{"error": ...}`.
+- Arrow IPC (formato stream): record batches con las columnas de
+  `ColumnarDataInputs`; la respuesta es un stream Arrow con la columna
+  `prediction` por bloque. Un error corta el stream (se registra en el log).
+"""
+import asyncio
+import functools
+import importlib.util
+import io
+import json
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send
+
+from app_api import schemas
+from app_api.serving import rows_to_columns
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+NDJSON = "application/x-ndjson"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+Predictor = Callable[[Dict[str, list]], Awaitable[dict]]
+
+
+@functools.lru_cache(maxsize=None)
+def has_pyarrow() -> bool:
+    """Arrow es opcional: sin pyarrow solo se acepta NDJSON. Se comprueba sin importarlo."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse cuyo generador sigue leyendo el cuerpo de la petición.
+
+    La implementación base escucha desconexiones con `receive()` en paralelo y
+    descartaría los mensajes con el cuerpo; aquí una desconexión se detecta al
+    fallar el envío.
+
+    `on_close` se llama siempre al terminar la respuesta, también si el cliente se
+    desconecta antes de pedir el primer bloque (el generador nunca arranca y su
+    `finally` no se ejecutaría).
+    """
+
+    def __init__(self, *args: Any, on_close: Optional[Callable[[], None]] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+        if self.background is not None:
+            await self.background()
+
+
+# =========================
+# NDJSON
+# =========================
+
+async def _ndjson_objects(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+async def _score_rows(rows: List[schemas.DataInputSchema], predict: Predictor) -> str:
+    results = await predict(rows_to_columns(rows))
+    return "".join(json.dumps({"prediction": p}) + "\n" for p in results["predictions"])
+
+
+async def stream_ndjson(
+    chunks: AsyncIterator[bytes], predict: Predictor, chunk_rows: int
+) -> AsyncIterator[str]:
+    rows: List[schemas.DataInputSchema] = []
+    try:
+        async for obj in _ndjson_objects(chunks):
+            rows.append(schemas.DataInputSchema.parse_obj(obj))
+            if len(rows) >= chunk_rows:
+                yield await _score_rows(rows, predict)
+                rows = []
+        if rows:
+            yield await _score_rows(rows, predict)
+    except (ValueError, ValidationError) as e:  # JSON inválido o fila que no valida
+        yield json.dumps({"error": str(e)}) + "\n"
+    except HTTPException as e:
+        yield json.dumps({"error": e.detail}) + "\n"
+
+
+# =========================
+# Arrow IPC (stream)
+# =========================
+
+class _ChunkReader(io.RawIOBase):
+    """
+    Archivo de solo lectura sobre el cuerpo de la petición, para el lector IPC de pyarrow.
+
+    El lector corre en un hilo; cada `read` que agota los bytes pendientes pide el
+    siguiente bloque al event loop y espera a que llegue. El cuerpo se consume a medida
+    que pyarrow lo necesita, sin acumularlo.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._chunks = chunks
+        self._loop = loop
+        self._pending = memoryview(b"")
+        self._eof = False
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+    def _fill(self) -> bool:
+        """Espera el siguiente bloque no vacío; False al terminar el cuerpo."""
+        while not self._pending and not self._eof:
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            except StopAsyncIteration:
+                self._eof = True
+            else:
+                self._pending = memoryview(chunk)
+        return bool(self._pending)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        # pyarrow espera `size` bytes salvo al final del cuerpo: no se devuelven lecturas cortas
+        out = bytearray()
+        while (size < 0 or len(out) < size) and self._fill():
+            n = len(self._pending) if size < 0 else min(size - len(out), len(self._pending))
+            out += self._pending[:n]
+            self._pending = self._pending[n:]
+        return bytes(out)
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _next_batch(reader: "pa.ipc.RecordBatchStreamReader") -> Optional["pa.RecordBatch"]:
+    # StopIteration no puede cruzar un Future: el fin del stream se devuelve como None
+    try:
+        return reader.read_next_batch()
+    except StopIteration:
+        return None
+
+
+async def _arrow_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator["pa.RecordBatch"]:
+    """
+    Record batches del stream IPC a medida que llegan, decodificados por pyarrow.
+
+    `RecordBatchStreamReader` procesa los mensajes de esquema, diccionario (también
+    los delta) y record batch; corre en el pool por defecto del loop, no en el de
+    inferencia, porque se bloquea esperando la red.
+    """
+    import pyarrow.ipc as ipc
+
+    loop = asyncio.get_running_loop()
+    source = _ChunkReader(chunks, loop)
+    reader = await loop.run_in_executor(None, ipc.open_stream, source)
+    while True:
+        batch = await loop.run_in_executor(None, _next_batch, reader)
+        if batch is None:
+            return
+        yield batch
+
+
+async def stream_arrow(
+    chunks: AsyncIterator[bytes], predict: Predictor, chunk_rows: int
+) -> AsyncIterator[bytes]:
+    # pyarrow se importa con el primer stream Arrow, no al importar la app
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    out_schema = pa.schema([("prediction", pa.float64())])
+    sink = io.BytesIO()
+    writer = ipc.new_stream(sink, out_schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    yield drain()
+    try:
+        async for batch in _arrow_batches(chunks):
+            for offset in range(0, batch.num_rows, chunk_rows):
+                piece = batch.slice(offset, chunk_rows)
+                columns = schemas.ColumnarDataInputs.parse_obj(piece.to_pydict()).dict(by_alias=True)
+                if columns.get("Diametro aerodinamico") is None:
+                    columns.pop("Diametro aerodinamico", None)
+                results = await predict(columns)
+                writer.write_batch(
+                    pa.record_batch([pa.array(results["predictions"], pa.float64())], schema=out_schema)
+                )
+                yield drain()
+    # ArrowInvalid es un ValueError, ArrowKeyError un KeyError y un cuerpo truncado un OSError
+    except (pa.ArrowException, KeyError, OSError, ValueError, ValidationError, HTTPException) as e:
+        logger.warning(f"Stream Arrow interrumpido: {getattr(e, 'detail', e)}")
+        return
+    writer.close()
+    yield drain()
@@ -1,7 +1,7 @@
 import logging
 import sys
 from types import FrameType
-from typing import List, cast
+from typing import List, Optional, cast
 
 from loguru import logger
 from pydantic import AnyHttpUrl, BaseSettings
@@ -28,6 +28,53 @@ class Settings(BaseSettings):
 
     PROJECT_NAME: str = "Air Pollution API"
 
+    # Modelo servido (corrida de MLflow); se carga al iniciar la API
+    MLFLOW_RUN_ID: str = "d01a7a84488d4849a048119fa83734a3"
+    # Cambio de modelo en caliente (ver app_api.model_watcher): archivo puntero con el
+    # run id, o alias del registro de MLflow; se consultan cada MODEL_WATCH_INTERVAL s
+    MODEL_POINTER_FILE: Optional[str] = None
+    MODEL_REGISTRY_NAME: Optional[str] = None
+    MODEL_ALIAS: str = "champion"
+    MODEL_WATCH_INTERVAL: float = 30.0
+    # Precarga del modelo en un hilo: el startup termina sin esperar la descarga
+    WARM_UP_IN_BACKGROUND: bool = False
+    # Hilos del pool de inferencia por worker (ver app_api.inference)
+    INFERENCE_THREADS: int = 4
+    # Hilos de XGBoost por predicción; 0 reparte los núcleos entre workers e INFERENCE_THREADS
+    MODEL_THREADS: int = 0
+    # Micro-batching de /predict: ventana de espera (0 lo desactiva) y tope de filas
+    BATCH_WINDOW_MS: float = 2.0
+    BATCH_MAX_ROWS: int = 256
+    # Cache de predicciones por fila (0 lo desactiva) y su expiración en segundos
+    PREDICTION_CACHE_SIZE: int = 100_000
+    PREDICTION_CACHE_TTL: float = 3600.0
+    # Filas por bloque en /predict/stream
+    BULK_CHUNK_ROWS: int = 2048
+    # Tope de filas (combinaciones x días) de /predict/grid
+    GRID_MAX_ROWS: int = 500_000
+    # Tabla de pronósticos precalculados (ver `python -m app_api.forecast_table`); None la desactiva
+    FORECAST_TABLE_DIR: Optional[str] = None
+    # Control de admisión de las rutas de predicción (ver app_api.admission): filas y
+    # peticiones en curso por worker (ADMISSION_MAX_ROWS=0 lo desactiva), cola de espera
+    # acotada y plazo en segundos; al saturarse responde 503 con Retry-After
+    ADMISSION_MAX_ROWS: int = 20_000
+    ADMISSION_MAX_REQUESTS: int = 32
+    ADMISSION_QUEUE_SIZE: int = 128
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_RETRY_AFTER: int = 1
+    # Modelo en sombra (ver app_api.shadow): None la desactiva; fracción de lotes que se
+    # evalúan, hilos de XGBoost del candidato, cola acotada y log SQLite
+    SHADOW_RUN_ID: Optional[str] = None
+    SHADOW_SAMPLE_RATE: float = 0.1
+    SHADOW_MODEL_THREADS: int = 1
+    SHADOW_QUEUE_SIZE: int = 64
+    SHADOW_LOG_PATH: str = "data/processed/shadow_log.sqlite"
+    # Fracción de peticiones de /predict que se registran en el log (solo un resumen)
+    PREDICT_LOG_SAMPLE_RATE: float = 0.01
+
+    # Feature store en línea (ver `python -m calidad_aire.feature_store`)
+    FEATURE_STORE_PATH: Optional[str] = "data/processed/feature_store.json"
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,363 @@
+"""
+Tabla de pronósticos precalculados para las consultas "próximos N días de la estación X".
+
+Un job programado (p. ej. cron cada noche, después de actualizar el feature store)
+predice todas las series conocidas x los próximos N días con el modelo activo:
+
+    python -m app_api.forecast_table --days 14
+
+y escribe en `FORECAST_TABLE_DIR`:
+
+- forecast-<versión>.keys.npy: claves int64 ordenadas, (id de serie << 32) | ordinal del día
+- forecast-<versión>.values.npy: predicción float32 de cada clave
+- forecast.json: run_id, series (id -> Municipio, Estacion, Diametro aerodinamico) y los
+  nombres de los .npy vigentes. Se escribe al final: los lectores nunca ven una versión a medias.
+
+Cada versión tiene nombre propio (fecha y sufijo aleatorio) y todos los archivos se
+escriben en un temporal y se publican con `os.replace`: un build nunca reescribe los
+arrays que un worker tiene mapeados.
+
+La API abre los arrays con `np.load(mmap_mode="r")` (las páginas las comparte el SO
+entre workers) y resuelve cada fila con una búsqueda binaria (`np.searchsorted`).
+Solo las filas que no están en la tabla llegan al modelo.
+
+Cada worker revisa el mtime de forecast.json a lo sumo una vez por
+`CHECK_INTERVAL` segundos al consultar la tabla y reabre la versión nueva cuando el
+job la publica. Las series invalidadas por `/measurements` se agregan a
+`forecast-<versión>.stale` (una por línea), que los demás workers leen en esa misma
+revisión: dejan de servir esas series desde la tabla.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+META_FILE = "forecast.json"
+# Segundos entre revisiones de forecast.json y del archivo de series invalidadas
+CHECK_INTERVAL = 1.0
+# Nombres fijos: `calendar.day_name` depende del locale
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+SeriesKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def _normalize(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def take_rows(columns: Dict[str, Sequence], idx: Sequence[int]) -> Dict[str, list]:
+    return {name: [values[i] for i in idx] for name, values in columns.items()}
+
+
+class ForecastTable:
+    """Lector de la tabla: búsqueda binaria vectorizada sobre los arrays mapeados en memoria."""
+
+    def __init__(self, directory: Path):
+        # numpy se importa al abrir una tabla: importar la app no lo carga
+        import numpy as np
+
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / META_FILE).read_text(encoding="utf-8"))
+        self.run_id: str = meta["run_id"]
+        self.version: str = meta["version"]
+        self.start = date.fromisoformat(meta["start"])
+        self.days: int = meta["days"]
+        self.keys = np.load(self.directory / meta["keys"], mmap_mode="r")
+        self.values = np.load(self.directory / meta["values"], mmap_mode="r")
+        self._series: Dict[SeriesKey, int] = {
+            tuple(key): i for i, key in enumerate(meta["series"])
+        }
+        # Series con mediciones ingeridas después de construir la tabla: van al modelo.
+        # Se comparten entre workers con un archivo de solo anexado por versión
+        self._stale: set = set()
+        self._stale_path = self.directory / f"forecast-{self.version}.stale"
+        self._stale_offset = 0
+        self._lock = threading.Lock()
+        self.sync_stale()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def invalidate(self, keys: Iterable[SeriesKey]) -> None:
+        """Marca series cuyo estado cambió (p. ej. por /measurements) como no servibles desde la tabla."""
+        series_ids = set()
+        for key in keys:
+            key = tuple(_normalize(k) for k in key)
+            for candidate in (key, key[:2] + (None,)):
+                series_id = self._series.get(candidate)
+                if series_id is not None:
+                    series_ids.add(series_id)
+        with self._lock:
+            series_ids -= self._stale
+            self._stale |= series_ids
+        if series_ids:
+            # Una sola escritura en modo anexar: las líneas de distintos workers no se mezclan
+            try:
+                with open(self._stale_path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{i}\n" for i in sorted(series_ids)))
+            except OSError as e:
+                logger.warning(f"No se pudo registrar series invalidadas en {self._stale_path}: {e}")
+
+    def sync_stale(self) -> None:
+        """Agrega las series invalidadas por otros workers desde la última lectura."""
+        try:
+            with open(self._stale_path, "rb") as f:
+                f.seek(self._stale_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Solo líneas completas: una escritura en curso se lee en la próxima revisión
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return
+        with self._lock:
+            self._stale.update(int(line) for line in complete.split())
+            self._stale_offset += len(complete)
+
+    def _row_key(self, municipio, estacion, diametro, anio, mes, dia, dia_semana) -> int:
+        series_id = self._series.get((_normalize(municipio), _normalize(estacion), _normalize(diametro)))
+        if series_id is None or series_id in self._stale:
+            return -1
+        try:
+            day = date(anio, mes, dia)
+        except (TypeError, ValueError):
+            return -1
+        # La tabla se calculó con el día de la semana real de la fecha
+        if dia_semana != DAY_NAMES[day.weekday()]:
+            return -1
+        return (series_id << 32) | day.toordinal()
+
+    def lookup(self, columns: Dict[str, Sequence], n_rows: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(encontradas, predicciones) por fila; las no encontradas quedan en NaN."""
+        import numpy as np
+
+        none = [None] * n_rows
+        rows = zip(
+            columns.get("Municipio", none),
+            columns.get("Estacion", none),
+            columns.get("Diametro aerodinamico") or none,
+            columns.get("Año", none),
+            columns.get("Mes", none),
+            columns.get("Dia", none),
+            columns.get("DiaSemana", none),
+        )
+        query = np.fromiter((self._row_key(*row) for row in rows), dtype=np.int64, count=n_rows)
+        pos = np.searchsorted(self.keys, query)
+        pos = np.minimum(pos, len(self.keys) - 1)
+        found = (query >= 0) & (self.keys[pos] == query)
+        predictions = np.where(found, self.values[pos], np.nan)
+        hits = int(found.sum())
+        with self._lock:
+            self.hits += hits
+            self.misses += n_rows - hits
+        return found, predictions
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+
+_table: Optional[ForecastTable] = None
+# Directorio y corrida de la última carga, mtime de su forecast.json y hora de la última revisión
+_directory: Optional[str] = None
+_run_id: Optional[str] = None
+_meta_mtime: Optional[int] = None
+_checked_at = 0.0
+_refresh_lock = threading.Lock()
+
+
+def get_forecast_table() -> Optional[ForecastTable]:
+    """Tabla vigente; si el job publicó otra versión desde la última revisión, se reabre."""
+    if _directory is not None and time.monotonic() - _checked_at >= CHECK_INTERVAL:
+        _refresh()
+    return _table
+
+
+def _meta_mtime_of(directory: str) -> Optional[int]:
+    try:
+        return (Path(directory) / META_FILE).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _refresh() -> None:
+    global _checked_at
+    # Una sola revisión a la vez; las demás peticiones siguen con la tabla actual
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        _checked_at = time.monotonic()
+        if _meta_mtime_of(_directory) != _meta_mtime:
+            try:
+                load_forecast_table(_directory, _run_id)
+            except Exception as e:
+                logger.warning(f"No se pudo reabrir la tabla de pronósticos en {_directory}: {e}")
+        elif _table is not None:
+            _table.sync_stale()
+    finally:
+        _refresh_lock.release()
+
+
+def load_forecast_table(directory: Optional[str], run_id: str) -> None:
+    """Abre la tabla si existe y es del modelo servido; si no, todo va al modelo."""
+    global _table, _directory, _run_id, _meta_mtime, _checked_at
+    _directory, _run_id = directory, run_id
+    _checked_at = time.monotonic()
+    _meta_mtime = _meta_mtime_of(directory) if directory else None
+    if _meta_mtime is None:
+        _table = None
+        return
+    table = ForecastTable(Path(directory))
+    if table.run_id != run_id:
+        logger.warning(
+            f"Tabla de pronósticos de la corrida {table.run_id}, se sirve {run_id}: no se usa"
+        )
+        _table = None
+        return
+    _table = table
+    logger.info(
+        f"Tabla de pronósticos {table.version} cargada: {len(table)} filas desde {table.start} ({table.days} días)"
+    )
+
+
+# =========================
+# Job de construcción
+# =========================
+
+def _series_keys(group_cols: List[str], tails) -> List[SeriesKey]:
+    """Series del feature store y, para estaciones con una sola serie, la clave sin diámetro."""
+    keys = [tuple(_normalize(v) for v in row) for row in tails[group_cols].itertuples(index=False)]
+    by_station: Dict[Tuple, List[SeriesKey]] = {}
+    for key in keys:
+        by_station.setdefault(key[:2], []).append(key)
+    extra = [
+        station + (None,)
+        for station, station_series in by_station.items()
+        if len(station_series) == 1 and station_series[0][2] is not None
+    ]
+    return keys + extra
+
+
+def _save_array(path: Path, array: "np.ndarray") -> None:
+    """`np.save` a un temporal y `os.replace`: el nombre final solo existe completo."""
+    import numpy as np
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def build_forecast_table(
+    directory: Path,
+    run_id: str,
+    feature_store_path: str,
+    days: int = 14,
+    start: Optional[date] = None,
+) -> dict:
+    """Predice todas las series x `days` días desde `start` y publica una nueva versión."""
+    import numpy as np
+
+    from calidad_aire.predict import make_fast_prediction
+
+    from app_api.serving import build_model_columns, get_feature_store, load_feature_store
+
+    load_feature_store(feature_store_path)
+    store = get_feature_store()
+    series = _series_keys(store.group_cols, store.tails())
+    if not series:
+        raise ValueError(f"El feature store {feature_store_path} no tiene series")
+    start = start or date.today()
+    dates = [start + timedelta(days=i) for i in range(days)]
+
+    columns = {
+        "Municipio": [s[0] for s in series for _ in dates],
+        "Estacion": [s[1] for s in series for _ in dates],
+        "Diametro aerodinamico": [s[2] for s in series for _ in dates],
+        "Año": [d.year for _ in series for d in dates],
+        "Mes": [d.month for _ in series for d in dates],
+        "Dia": [d.day for _ in series for d in dates],
+        "DiaSemana": [DAY_NAMES[d.weekday()] for _ in series for d in dates],
+    }
+    results = make_fast_prediction(columns=build_model_columns(columns), run_id=run_id)
+    if results.get("errors"):
+        raise RuntimeError(f"Falló la predicción de la tabla: {results['errors']}")
+
+    series_ids = np.repeat(np.arange(len(series), dtype=np.int64), days)
+    ordinals = np.tile(np.array([d.toordinal() for d in dates], dtype=np.int64), len(series))
+    keys = (series_ids << 32) | ordinals
+    values = np.asarray(results["predictions"], dtype=np.float32)
+    order = np.argsort(keys, kind="stable")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # Único aunque dos builds coincidan en el segundo: nunca se reescribe un .npy que
+    # algún worker tenga mapeado en memoria
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    keys_file, values_file = f"forecast-{version}.keys.npy", f"forecast-{version}.values.npy"
+    _save_array(directory / keys_file, keys[order])
+    _save_array(directory / values_file, values[order])
+    meta = {
+        "version": version,
+        "run_id": run_id,
+        "start": start.isoformat(),
+        "days": days,
+        "series": [list(s) for s in series],
+        "keys": keys_file,
+        "values": values_file,
+    }
+    tmp = directory / f"{META_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, directory / META_FILE)
+
+    # Se conserva la versión anterior más reciente: un worker puede tenerla aún mapeada.
+    # Se ordena por mtime (el sufijo aleatorio no ordena builds del mismo segundo)
+    previous = {
+        p.name.split(".")[0]: p.stat().st_mtime_ns
+        for p in directory.glob("forecast-*.keys.npy")
+        if p.name != keys_file
+    }
+    for old in sorted(previous, key=previous.get)[:-1]:
+        for path in directory.glob(f"{old}.*"):
+            path.unlink(missing_ok=True)
+    return {"version": version, "rows": len(keys), "series": len(series)}
+
+
+def main() -> None:
+    from app_api.config import settings
+
+    parser = argparse.ArgumentParser(description="Precalcula la tabla de pronósticos de la API.")
+    parser.add_argument("--days", type=int, default=14, help="Días hacia adelante desde --start")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="Primer día (por defecto, hoy)")
+    parser.add_argument("--output", default=settings.FORECAST_TABLE_DIR, help="Directorio de la tabla")
+    parser.add_argument("--run-id", default=settings.MLFLOW_RUN_ID)
+    parser.add_argument("--feature-store", default=settings.FEATURE_STORE_PATH)
+    args = parser.parse_args()
+    if not args.output:
+        parser.error("Falta --output (o FORECAST_TABLE_DIR)")
+
+    t0 = time.perf_counter()
+    report = build_forecast_table(Path(args.output), args.run_id, args.feature_store, args.days, args.start)
+    print(
+        f"Tabla {report['version']}: {report['rows']} filas ({report['series']} series x {args.days} días) "
+        f"en {time.perf_counter() - t0:.1f}s -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
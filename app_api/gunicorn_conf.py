@@ -0,0 +1,48 @@
+"""
+Configuración de gunicorn para producción (varios workers uvicorn).
+
+    gunicorn -c app_api/gunicorn_conf.py app_api.main:app
+
+Con `preload_app` el maestro importa la app y carga el modelo (y su versión
+compilada) una sola vez antes de hacer fork: los workers heredan esas páginas de
+memoria y las comparten copy-on-write en vez de cargar cada uno su copia.
+
+Por defecto corre un worker por núcleo (hasta MAX_DEFAULT_WORKERS); WEB_CONCURRENCY
+lo fija. El feature store en línea se comparte por `FEATURE_STORE_PATH`: un
+`POST /measurements` lo reescribe y los demás workers lo releen (ver
+`app_api.serving`).
+"""
+import gc
+import multiprocessing
+import os
+
+MAX_DEFAULT_WORKERS = 8
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), MAX_DEFAULT_WORKERS)))
+# Los workers reparten los hilos del modelo según este valor (ver app_api.inference.model_threads)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    """En el maestro, antes del fork: carga el modelo y congela el heap para el GC."""
+    from app_api.model_watcher import resolve_target, served_model
+    from calidad_aire.predict import warm_up
+
+    try:
+        # El mismo modelo que activará cada worker: su carga será un acierto de cache
+        run_id = (resolve_target() or served_model()).run_id
+        warm_up(run_id)
+        server.log.info(f"Modelo {run_id} precargado en el maestro")
+    except Exception as e:
+        server.log.warning(f"No se pudo precargar el modelo en el maestro: {e}")
+
+    # Los objetos ya creados pasan a la generación permanente: el GC de los workers
+    # no los recorre y no ensucia (copia) sus páginas de memoria
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,52 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app_api.config import settings
+
+# Pool acotado para la inferencia bloqueante (features + modelo): el event loop
+# sigue atendiendo peticiones mientras XGBoost/numpy trabajan (liberan el GIL).
+# Se crea en el primer uso, así cada worker de gunicorn tiene el suyo tras el fork.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.INFERENCE_THREADS, thread_name_prefix="inference"
+                )
+    return _executor
+
+
+async def run_inference(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Ejecuta `func` en el pool de inferencia sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def model_threads() -> int:
+    """
+    Hilos del modelo por predicción (`n_jobs` de XGBoost).
+
+    Con `n_jobs=-1` cada una de las INFERENCE_THREADS predicciones concurrentes de
+    cada worker usaría todos los núcleos; por defecto se reparten entre ambos.
+    """
+    if settings.MODEL_THREADS > 0:
+        return settings.MODEL_THREADS
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    return max(1, (os.cpu_count() or 1) // (workers * settings.INFERENCE_THREADS))
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -1,21 +1,29 @@
+# Debe importarse primero: marca el inicio para STARTUP_PROFILE
+from app_api import profiling
+
+import threading
 from typing import Any
 
 from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from loguru import logger
 
-from app_api.api import api_router
+from app_api import metrics
+from app_api.admission import AdmissionMiddleware
+from app_api.api import api_router, metrics_text
 from app_api.config import settings, setup_app_logging
+from app_api.inference import shutdown_executor
+from app_api.serving import load_feature_store
+from app_api.shadow import get_shadow, shutdown_shadow
 import os
-import mlflow
 from dotenv import load_dotenv
 
 # Cargar variables de entorno de Railway (o de un .env en local)
 load_dotenv()
 
-# Configuración explícita de MLflow
-mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI"))
+# MLflow (y el resto de dependencias del modelo) se importa al cargar el modelo:
+# el tracking URI se toma de MLFLOW_TRACKING_URI en calidad_aire.artifact_store
 
 # Si usas usuario y contraseña
 if os.getenv("MLFLOW_TRACKING_USERNAME") and os.getenv("MLFLOW_TRACKING_PASSWORD"):
@@ -34,6 +42,69 @@ app = FastAPI(
 
 root_router = APIRouter()
 
+def _warm_up() -> None:
+    from app_api.model_watcher import current_run_id, load_initial_model, start_watcher
+
+    try:
+        served = load_initial_model()
+        logger.info(f"Modelo {served.run_id} cargado en memoria")
+        profiling.mark("model_loaded")
+    except Exception as e:
+        logger.warning(f"No se pudo precargar el modelo {current_run_id()}: {e}")
+    # El sondeo del puntero/alias arranca aunque la carga inicial falle
+    start_watcher()
+
+# Carga anticipada del modelo para que la primera predicción no pague la descarga.
+# En segundo plano, /health y / responden mientras tanto y /predict espera la carga.
+@app.on_event("startup")
+def warm_up_model() -> None:
+    from app_api.model_watcher import check_alias_support
+
+    # Una configuración que no puede funcionar detiene el arranque en vez de quedar en un warning
+    check_alias_support()
+    if settings.WARM_UP_IN_BACKGROUND:
+        threading.Thread(target=_warm_up, name="model-warm-up", daemon=True).start()
+    else:
+        _warm_up()
+
+# Estado por serie para completar lags/rollings en línea
+@app.on_event("startup")
+def load_online_features() -> None:
+    load_feature_store(settings.FEATURE_STORE_PATH)
+    profiling.mark("startup_complete")
+
+# Modelo candidato en sombra: su hilo carga el modelo sin demorar el startup
+@app.on_event("startup")
+def start_shadow_model() -> None:
+    shadow = get_shadow()
+    if shadow is not None:
+        logger.info(f"Modelo en sombra {shadow.run_id}; registro en {shadow.log_path}")
+
+# Pronósticos precalculados para las consultas de los próximos días
+@app.on_event("startup")
+def open_forecast_table() -> None:
+    from app_api.forecast_table import load_forecast_table
+    from app_api.model_watcher import current_run_id
+
+    try:
+        load_forecast_table(settings.FORECAST_TABLE_DIR, current_run_id())
+    except Exception as e:
+        logger.warning(f"No se pudo abrir la tabla de pronósticos en {settings.FORECAST_TABLE_DIR}: {e}")
+
+@app.on_event("shutdown")
+def stop_model_watcher() -> None:
+    from app_api.model_watcher import stop_watcher
+
+    stop_watcher()
+
+@app.on_event("shutdown")
+def stop_inference_pool() -> None:
+    shutdown_executor()
+
+@app.on_event("shutdown")
+def stop_shadow_model() -> None:
+    shutdown_shadow()
+
 # Cuerpo de la respuesta en la raíz
 @root_router.get("/")
 def index(request: Request) -> Any:
@@ -51,10 +122,21 @@ def index(request: Request) -> Any:
 
     return HTMLResponse(content=body)
 
+# Métricas del proceso en formato de texto de Prometheus
+@root_router.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    return Response(content=metrics_text(), media_type=metrics.CONTENT_TYPE)
+
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 app.include_router(root_router)
 
+# Tope de peticiones en curso (antes de leer el cuerpo); queda dentro de las métricas
+app.add_middleware(AdmissionMiddleware, prefix=f"{settings.API_V1_STR}/predict")
+
+# Latencia, estado y etapas de validación/serialización de las rutas de predicción
+app.add_middleware(metrics.MetricsMiddleware, prefix=f"{settings.API_V1_STR}/predict")
+
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
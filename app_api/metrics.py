@@ -0,0 +1,211 @@
+"""
+Métricas del servicio en formato de texto de Prometheus (sin dependencias externas).
+
+- Contadores e histogramas en memoria del proceso, protegidos por un lock; cada
+  observación es una búsqueda binaria y una suma, sin costo apreciable por petición.
+- `MetricsMiddleware` (ASGI puro) mide la latencia total y el estado de las rutas
+  de predicción, y deriva las etapas de validación y serialización con las marcas
+  que deja el handler en `request.state`.
+- `stage(nombre)` cronometra las etapas internas (features, carga del modelo, predicción).
+
+Con varios workers de gunicorn cada proceso expone sus propias métricas: Prometheus
+las distingue por instancia al hacer scrape a cada worker.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labelnames: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # Por serie: conteos por bucket (no acumulados, el último es +Inf), suma y total
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(key, list(counts), total[0]) for key, (counts, total) in sorted(self._series.items())]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def gauge_lines(name: str, documentation: str, value: float, kind: str = "gauge") -> List[str]:
+    """Métrica de un solo valor leída al momento del scrape (p. ej. contadores de caches)."""
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+
+
+# =========================
+# Métricas del servicio
+# =========================
+
+REQUESTS = Counter("api_requests_total", "Peticiones a las rutas de predicción", ["path", "status"])
+REQUEST_LATENCY = Histogram(
+    "api_request_latency_seconds", "Latencia total de la petición", LATENCY_BUCKETS, ["path"]
+)
+REQUEST_ROWS = Histogram("api_request_rows", "Filas por petición de predicción", ROW_BUCKETS, ["path"])
+MODEL_BATCH_ROWS = Histogram(
+    "model_batch_rows", "Filas por llamada al modelo (tras micro-batching y cache)", ROW_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "predict_stage_seconds", "Duración por etapa de la predicción", LATENCY_BUCKETS, ["stage"]
+)
+
+
+_route_paths: Dict[object, str] = {}
+
+
+def route_label(scope: Scope) -> str:
+    """
+    Plantilla de la ruta que atendió la petición (p. ej. `/api/v1/predict`), u `other`.
+
+    El path crudo no sirve de etiqueta: cualquier URL bajo el prefijo (404, rutas
+    inventadas) crearía una serie nueva. El router deja el endpoint en el scope;
+    la plantilla se busca una vez por endpoint entre las rutas del router.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "other")
+    endpoint, router = scope.get("endpoint"), scope.get("router")
+    if endpoint is None or router is None:
+        return "other"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        path = next(
+            (r.path for r in getattr(router, "routes", ()) if getattr(r, "endpoint", None) is endpoint), "other"
+        )
+        _route_paths[endpoint] = path
+    return path
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=name)
+
+
+class MetricsMiddleware:
+    """
+    Mide las peticiones cuyo path empieza por `prefix`, etiquetadas con la plantilla
+de la ruta (`route_label`): los paths que no corresponden a una ruta van a `other`.
+
+    Si el handler deja `request.state.handler_start`/`handler_end`, registra también
+    las etapas `validation` (lectura y validación del cuerpo, antes del handler) y
+    `serialization` (validación del response_model, JSON y envío, después del handler).
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        state = scope.setdefault("state", {})
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            t_end = time.perf_counter()
+            path = route_label(scope)
+            REQUESTS.inc(path=path, status=status or 500)
+            REQUEST_LATENCY.observe(t_end - t0, path=path)
+            handler_start, handler_end = state.get("handler_start"), state.get("handler_end")
+            if handler_start is not None:
+                STAGE_SECONDS.observe(handler_start - t0, stage="validation")
+            if handler_end is not None:
+                STAGE_SECONDS.observe(t_end - handler_end, stage="serialization")
+
+
+def render(extra: Sequence[List[str]] = ()) -> str:
+    lines: List[str] = []
+    for metric in (REQUESTS, REQUEST_LATENCY, REQUEST_ROWS, MODEL_BATCH_ROWS, STAGE_SECONDS):
+        lines.extend(metric.render())
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
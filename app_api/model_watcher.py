@@ -0,0 +1,170 @@
+"""
+Modelo servido y cambio en caliente sin reinicio.
+
+El modelo activo es una referencia inmutable (`ServedModel`) que las peticiones leen
+una vez al empezar. Un hilo en segundo plano consulta cada `MODEL_WATCH_INTERVAL`
+segundos el destino configurado:
+
+- `MODEL_POINTER_FILE`: archivo local con el run id (texto plano o JSON
+  `{"run_id": ..., "version": ...}`), p. ej. escrito por el pipeline de despliegue;
+- `MODEL_REGISTRY_NAME` + `MODEL_ALIAS`: alias del registro de modelos de MLflow
+  (requiere MLflow >= 2.3; con una versión anterior el arranque falla).
+
+Si cambia, carga y calienta el nuevo modelo (artefacto, pyfunc y versión compilada)
+en ese hilo, fuera del camino de las peticiones, y solo entonces reemplaza la
+referencia. Si la carga falla se sigue sirviendo el modelo anterior.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from loguru import logger
+
+from app_api.config import settings
+
+
+class ServedModel(NamedTuple):
+    run_id: str
+    # Versión del registro, la del archivo puntero o None si viene de MLFLOW_RUN_ID
+    version: Optional[str]
+    source: str
+    loaded_at: float
+
+
+_served = ServedModel(settings.MLFLOW_RUN_ID, None, "settings", time.time())
+
+
+def served_model() -> ServedModel:
+    return _served
+
+
+def current_run_id() -> str:
+    return _served.run_id
+
+
+def resolve_target() -> Optional[ServedModel]:
+    """Modelo que debería estar activo según el puntero o el alias (None si no hay fuente)."""
+    if settings.MODEL_POINTER_FILE:
+        text = Path(settings.MODEL_POINTER_FILE).read_text(encoding="utf-8").strip()
+        if text.startswith("{"):
+            data = json.loads(text)
+            run_id, version = data["run_id"], data.get("version")
+        else:
+            run_id, version = text, None
+        return ServedModel(run_id, None if version is None else str(version), "pointer", 0.0)
+
+    if settings.MODEL_REGISTRY_NAME:
+        from mlflow.tracking import MlflowClient
+
+        from calidad_aire.config.core import config
+
+        client = MlflowClient(tracking_uri=os.getenv("MLFLOW_TRACKING_URI") or config.mlflow_tracking_uri)
+        model_version = client.get_model_version_by_alias(settings.MODEL_REGISTRY_NAME, settings.MODEL_ALIAS)
+        return ServedModel(model_version.run_id, str(model_version.version), "alias", 0.0)
+    return None
+
+
+def activate(target: ServedModel) -> ServedModel:
+    """Calienta `target` y lo deja activo; las peticiones en curso terminan con el anterior."""
+    global _served
+    from calidad_aire.predict import limit_model_threads, warm_up
+
+    from app_api.forecast_table import load_forecast_table
+    from app_api.inference import model_threads
+
+    t0 = time.perf_counter()
+    warm_up(target.run_id)
+    limit_model_threads(target.run_id, model_threads())
+    previous, _served = _served, target._replace(loaded_at=time.time())
+    try:
+        # La tabla de pronósticos solo se usa si es de la corrida activa
+        load_forecast_table(settings.FORECAST_TABLE_DIR, target.run_id)
+    except Exception as e:
+        logger.warning(f"No se pudo abrir la tabla de pronósticos para {target.run_id}: {e}")
+    logger.info(
+        f"Modelo activo: {previous.run_id} -> {target.run_id} "
+        f"({target.source} {target.version or ''}, calentado en {time.perf_counter() - t0:.2f}s)"
+    )
+    return _served
+
+
+def check_alias_support() -> None:
+    """Falla al arrancar si se pide un alias y la versión de MLflow no los soporta (< 2.3)."""
+    if settings.MODEL_POINTER_FILE or not settings.MODEL_REGISTRY_NAME:
+        return
+    import mlflow
+    from mlflow.tracking import MlflowClient
+
+    if not hasattr(MlflowClient, "get_model_version_by_alias"):
+        raise RuntimeError(
+            f"MODEL_REGISTRY_NAME requiere alias del registro de modelos (MLflow >= 2.3); "
+            f"instalado: mlflow {mlflow.__version__}"
+        )
+
+
+def load_initial_model() -> ServedModel:
+    """Al arrancar: activa el modelo del puntero/alias si hay, si no el de MLFLOW_RUN_ID."""
+    try:
+        target = resolve_target()
+    except Exception as e:
+        logger.warning(f"No se pudo consultar el modelo a servir; se usa {_served.run_id}: {e}")
+        target = None
+    return activate(target or _served)
+
+
+class ModelWatcher(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="model-watcher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._failed: Optional[ServedModel] = None
+
+    def check(self) -> None:
+        try:
+            target = resolve_target()
+        except Exception as e:
+            logger.warning(f"No se pudo consultar el modelo a servir: {e}")
+            return
+        if target is None or (target.run_id, target.version) == (_served.run_id, _served.version):
+            return
+        try:
+            activate(target)
+            self._failed = None
+        except Exception as e:
+            # Se reintenta en cada ciclo, pero el error se registra una vez por destino
+            if self._failed != target:
+                logger.error(
+                    f"No se pudo cargar el modelo {target.run_id}; se sigue sirviendo {_served.run_id}: {e}"
+                )
+                self._failed = target
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_watcher: Optional[ModelWatcher] = None
+
+
+def start_watcher() -> None:
+    """Arranca el sondeo si hay puntero o alias configurado."""
+    global _watcher
+    configured = settings.MODEL_POINTER_FILE or settings.MODEL_REGISTRY_NAME
+    if not configured or settings.MODEL_WATCH_INTERVAL <= 0:
+        return
+    if _watcher is None:
+        _watcher = ModelWatcher(settings.MODEL_WATCH_INTERVAL)
+        _watcher.start()
+
+
+def stop_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
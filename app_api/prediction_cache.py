@@ -0,0 +1,119 @@
+import math
+import sys
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+from cachetools import TTLCache
+
+from app_api.config import settings
+
+
+def _normalize(value):
+    # NaN != NaN: se normaliza a None para que la clave sea estable
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+def _is_array(values: Sequence) -> bool:
+    # Si numpy no está importado no puede haber arrays: no se importa solo para comprobarlo
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def _as_list(values: Sequence) -> list:
+    return values.tolist() if _is_array(values) else list(values)
+
+
+def _take(values: Sequence, idx: List[int]):
+    if _is_array(values):
+        return values[idx]
+    return [values[i] for i in idx]
+
+
+class PredictionCache:
+    """
+    Cache de predicciones por fila con expiración (TTL) y expulsión LRU.
+
+    La clave es (run_id, fila de entrada del modelo normalizada): las columnas de la
+    petición más sus lags/medias móviles del feature store. Así una medición nueva
+    que cambia las features de una serie no devuelve predicciones viejas.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @staticmethod
+    def row_keys(run_id: str, columns: Dict[str, Sequence], n_rows: int) -> List[Hashable]:
+        names = sorted(columns)
+        normalized = [[_normalize(v) for v in _as_list(columns[name])] for name in names]
+        signature = (run_id, tuple(names))
+        return [(signature, row) for row in zip(*normalized)] if names else [(signature, ())] * n_rows
+
+    def predict(
+        self,
+        run_id: str,
+        columns: Dict[str, Sequence],
+        predict_fn: Callable[[Dict[str, Sequence]], dict],
+    ) -> dict:
+        """Resuelve las filas cacheadas y llama a `predict_fn` solo con las faltantes."""
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        keys = self.row_keys(run_id, columns, n_rows)
+        predictions: List[Optional[float]] = [None] * n_rows
+        missing: List[int] = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._cache.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    predictions[i] = value
+            self.hits += n_rows - len(missing)
+            self.misses += len(missing)
+
+        results: dict = {"predictions": predictions, "run_id": run_id, "errors": None}
+        if not missing:
+            return results
+
+        sub_columns = {name: _take(values, missing) for name, values in columns.items()}
+        computed = predict_fn(sub_columns)
+        if computed.get("errors"):
+            return computed
+        with self._lock:
+            for i, value in zip(missing, computed["predictions"]):
+                predictions[i] = value
+                self._cache[keys[i]] = value
+        results.update({k: v for k, v in computed.items() if k != "predictions"})
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+_prediction_cache: Optional[PredictionCache] = None
+_init_lock = threading.Lock()
+
+
+def get_prediction_cache() -> Optional[PredictionCache]:
+    """Cache del proceso (None si PREDICTION_CACHE_SIZE <= 0)."""
+    global _prediction_cache
+    if settings.PREDICTION_CACHE_SIZE <= 0:
+        return None
+    if _prediction_cache is None:
+        with _init_lock:
+            if _prediction_cache is None:
+                _prediction_cache = PredictionCache(
+                    maxsize=settings.PREDICTION_CACHE_SIZE, ttl=settings.PREDICTION_CACHE_TTL
+                )
+    return _prediction_cache
@@ -0,0 +1,218 @@
+"""
+Perfilado del arranque en frío de la API.
+
+Dos formas de uso:
+
+- CLI: ``python -m app_api.profiling`` mide, en procesos nuevos, el costo de
+  importación por módulo (``-X importtime``), el tiempo desde que arranca el
+  servidor hasta la primera respuesta exitosa de ``/predict`` y el RSS pico.
+- Variable de entorno: con ``STARTUP_PROFILE=1`` el propio servidor registra en
+  el log el tiempo hasta terminar el startup y hasta la primera predicción, con
+  el RSS pico en cada hito.
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Referencia de tiempo: este módulo se importa primero en app_api.main
+_T0 = time.perf_counter()
+_marked: Dict[str, float] = {}
+
+PROFILE_ENV = "STARTUP_PROFILE"
+SAMPLE_PAYLOAD = {
+    "inputs": [
+        {
+            "Municipio": "PEREIRA",
+            "Estacion": "U.T.P.",
+            "Año": 2025,
+            "Mes": 10,
+            "Dia": 15,
+            "DiaSemana": "Wednesday",
+        }
+    ]
+}
+
+
+def enabled() -> bool:
+    return os.getenv(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def peak_rss_mb() -> float:
+    """RSS pico del proceso actual (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def mark(event: str) -> None:
+    """Registra (una sola vez) el tiempo transcurrido hasta `event` si el perfilado está activo."""
+    if not enabled() or event in _marked:
+        return
+    elapsed = time.perf_counter() - _T0
+    _marked[event] = elapsed
+    from loguru import logger
+
+    logger.info(f"[startup-profile] {event}: {elapsed:.3f}s desde la importación, RSS pico {peak_rss_mb():.1f} MB")
+
+
+# =========================
+# Costo de importación por módulo
+# =========================
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Filas de ``-X importtime``: módulo, tiempo propio y acumulado (µs)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+            rows.append({
+                "module": module.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            })
+        except ValueError:
+            continue
+    return rows
+
+
+def import_profile(module: str = "app_api.main") -> List[dict]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falló la importación de {module}:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def by_package(rows: List[dict]) -> Dict[str, int]:
+    """Tiempo propio agregado por paquete de primer nivel (µs)."""
+    totals: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        totals[row["module"].split(".")[0]] += row["self_us"]
+    return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+# =========================
+# Arranque en frío del servidor
+# =========================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_peak_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def cold_start_profile(
+    app: str = "app_api.main:app",
+    predict_path: str = "/api/v1/predict",
+    payload: Optional[dict] = None,
+    timeout: float = 120.0,
+) -> dict:
+    """Arranca el servidor y mide el tiempo hasta la primera respuesta 200 de `/predict`."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{predict_path}"
+    body = json.dumps(payload or SAMPLE_PAYLOAD).encode("utf-8")
+
+    t0 = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    report = {"first_predict_s": None, "first_connect_s": None, "peak_rss_mb": None, "status": None}
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if server.poll() is not None:
+                report["status"] = f"el servidor terminó con código {server.returncode}"
+                break
+            request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    report["status"] = response.status
+                    if report["first_connect_s"] is None:
+                        report["first_connect_s"] = time.perf_counter() - t0
+                    if response.status == 200:
+                        report["first_predict_s"] = time.perf_counter() - t0
+                        break
+            except urllib.error.HTTPError as e:
+                report["status"] = e.code
+                if report["first_connect_s"] is None:
+                    report["first_connect_s"] = time.perf_counter() - t0
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.05)
+        report["peak_rss_mb"] = _proc_peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perfil de arranque en frío de la API.")
+    parser.add_argument("--module", default="app_api.main", help="Módulo cuya importación se mide")
+    parser.add_argument("--top", type=int, default=20, help="Módulos más costosos a mostrar")
+    parser.add_argument("--skip-server", action="store_true", help="Solo mide importaciones")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON")
+    args = parser.parse_args()
+
+    rows = import_profile(args.module)
+    top_level = [r for r in rows if r["module"] == args.module]
+    report = {
+        "import_total_s": (top_level[-1]["cumulative_us"] / 1e6) if top_level else None,
+        "top_modules": sorted(rows, key=lambda r: r["self_us"], reverse=True)[: args.top],
+        "by_package_s": {k: v / 1e6 for k, v in list(by_package(rows).items())[: args.top]},
+    }
+    if not args.skip_server:
+        report["server"] = cold_start_profile(timeout=args.timeout)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"Importación de {args.module}: {report['import_total_s']:.3f}s")
+    print("\nPor paquete (tiempo propio):")
+    for package, seconds in report["by_package_s"].items():
+        print(f"  {package:<30} {seconds:8.3f}s")
+    print(f"\nMódulos más costosos (top {args.top}):")
+    for row in report["top_modules"]:
+        print(f"  {row['module']:<50} {row['self_us'] / 1e3:9.1f} ms  (acum. {row['cumulative_us'] / 1e3:.1f} ms)")
+    if "server" in report:
+        server = report["server"]
+        print("\nServidor:")
+        print(f"  primera conexión:           {server['first_connect_s']}")
+        print(f"  primera predicción exitosa: {server['first_predict_s']}")
+        print(f"  RSS pico:                   {server['peak_rss_mb']} MB")
+        print(f"  último estado:              {server['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,10 @@
+from .feature_store import IngestResults, MultipleMeasurements
 from .health import Health
-from .predict import MultipleDataInputs, PredictionResults
+from .predict import (
+    ColumnarDataInputs,
+    DataInputSchema,
+    GridForecastInputs,
+    GridPredictionResults,
+    MultipleDataInputs,
+    PredictionResults,
+)
@@ -0,0 +1,40 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+# Medición observada de una serie (Municipio, Estacion, Diametro aerodinamico)
+class MeasurementSchema(BaseModel):
+    Municipio: str
+    Estacion: str
+    Diametro_aerodinamico: Optional[str] = Field(None, alias="Diametro aerodinamico")
+    Fecha: date
+    Medicion: float
+
+    class Config:
+        allow_population_by_field_name = True
+
+# Esquema para mediciones múltiples
+class MultipleMeasurements(BaseModel):
+    measurements: List[MeasurementSchema]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "measurements": [
+                    {
+                        "Municipio": "PEREIRA",
+                        "Estacion": "U.T.P.",
+                        "Diametro aerodinamico": "PM10",
+                        "Fecha": "2025-10-14",
+                        "Medicion": 31.5
+                    }
+                ]
+            }
+        }
+
+# Resultado de la ingesta en el feature store
+class IngestResults(BaseModel):
+    ingested: int
+    series: int
@@ -4,4 +4,9 @@ from pydantic import BaseModel
 class Health(BaseModel):
     name: str
     api_version: str
+    # Versión del registro (o run id) del modelo que se está sirviendo
     model_version: str
+    model_run_id: str
+    # "settings" (MLFLOW_RUN_ID), "pointer" o "alias"
+    model_source: str
+    model_loaded_at: float
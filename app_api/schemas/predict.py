@@ -1,16 +1,24 @@
+from datetime import date
 from typing import Any, List, Optional
 
-from pydantic import BaseModel,Field
+from pydantic import BaseModel,Field, root_validator
 #from model.processing.validation import DataInputSchema
 
 class DataInputSchema(BaseModel):
     Municipio: Optional[str]
     Estacion: Optional[str]
+    # Identifica la serie en el feature store (opcional si la estación tiene una sola serie;
+    # en estaciones con varios contaminantes, sin él los lags/medias móviles van en NaN).
+    # Los lags son los de la siguiente medición de la serie, para cualquier fecha futura
+    Diametro_aerodinamico: Optional[str] = Field(None, alias="Diametro aerodinamico")
     Año: Optional[int]
     Mes: Optional[int]
     Dia: Optional[int]
     DiaSemana: Optional[str]
 
+    class Config:
+        allow_population_by_field_name = True
+
 # Esquema de los resultados de predicción
 class PredictionResults(BaseModel):
     errors: Optional[Any]
@@ -27,6 +35,7 @@ class MultipleDataInputs(BaseModel):
                     {
                         "Municipio": "PEREIRA",
                         "Estacion": "U.T.P.",
+                        "Diametro aerodinamico": "PM10",
                         "Año": 2025,
                         "Mes": 10,
                         "Dia": 15,
@@ -35,3 +44,74 @@ class MultipleDataInputs(BaseModel):
                 ]
             }
         }
+
+# Esquema columnar para lotes grandes: una lista por columna, validada por columna
+class ColumnarDataInputs(BaseModel):
+    Municipio: List[Optional[str]]
+    Estacion: List[Optional[str]]
+    Diametro_aerodinamico: Optional[List[Optional[str]]] = Field(None, alias="Diametro aerodinamico")
+    Año: List[Optional[int]]
+    Mes: List[Optional[int]]
+    Dia: List[Optional[int]]
+    DiaSemana: List[Optional[str]]
+
+    @root_validator(skip_on_failure=True)
+    def same_length(cls, values):
+        lengths = {name: len(col) for name, col in values.items() if col is not None}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"Todas las columnas deben tener la misma longitud: {lengths}")
+        return values
+
+    class Config:
+        allow_population_by_field_name = True
+        schema_extra = {
+            "example": {
+                "Municipio": ["PEREIRA", "PEREIRA"],
+                "Estacion": ["U.T.P.", "U.T.P."],
+                "Diametro aerodinamico": ["PM10", "PM10"],
+                "Año": [2025, 2025],
+                "Mes": [10, 10],
+                "Dia": [15, 16],
+                "DiaSemana": ["Wednesday", "Thursday"]
+            }
+        }
+
+# Pronóstico por grilla: estaciones x rango de fechas, expandido en el servidor
+class GridForecastInputs(BaseModel):
+    municipios: List[str] = Field(..., min_items=1)
+    estaciones: List[str] = Field(..., min_items=1)
+    # Opcional: si se da, la grilla también cruza por diámetro aerodinámico
+    diametros: Optional[List[str]] = None
+    start: date
+    end: date
+
+    @root_validator(skip_on_failure=True)
+    def ordered_range(cls, values):
+        if values["end"] < values["start"]:
+            raise ValueError(f"end ({values['end']}) es anterior a start ({values['start']})")
+        return values
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "municipios": ["PEREIRA"],
+                "estaciones": ["U.T.P.", "Centro"],
+                "start": "2025-10-15",
+                "end": "2025-10-31"
+            }
+        }
+
+class GridSeries(BaseModel):
+    Municipio: str
+    Estacion: str
+    Diametro_aerodinamico: Optional[str] = Field(None, alias="Diametro aerodinamico")
+    predictions: List[Optional[float]]
+
+    class Config:
+        allow_population_by_field_name = True
+
+# Resultado de la grilla: las fechas una sola vez y una serie de predicciones por combinación
+class GridPredictionResults(BaseModel):
+    errors: Optional[Any]
+    fechas: List[date]
+    series: List[GridSeries]
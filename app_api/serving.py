@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+
+try:  # lock entre procesos para las escrituras del feature store (solo POSIX)
+    import fcntl
+
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from calidad_aire.feature_store import OnlineFeatureStore
+
+# Estado compartido del servicio de predicción: feature store en línea con la
+# cola reciente de cada serie (ver calidad_aire.feature_store). Se crea al usarse
+# para no importar numpy/pandas al importar la app.
+#
+# Con varios workers el archivo FEATURE_STORE_PATH es la fuente común: cada
+# `/measurements` relee el archivo si otro worker lo cambió, ingiere y lo vuelve a
+# escribir (atómico, bajo un lock de archivo), y los demás workers releen el archivo
+# cuando cambia su mtime, revisándolo a lo sumo una vez por FEATURE_STORE_CHECK_INTERVAL
+# segundos. Un worker puede servir lags de hasta ese intervalo de antigüedad.
+_feature_store: Optional["OnlineFeatureStore"] = None
+FEATURE_STORE_CHECK_INTERVAL = 1.0
+# Archivo del store, mtime de la versión en memoria y hora de la última revisión
+_store_path: Optional[str] = None
+_store_mtime: Optional[int] = None
+_store_checked_at = 0.0
+_store_lock = threading.Lock()
+
+# Columnas que solo identifican la serie y no entran al modelo
+SERIES_ONLY_COLS = ["Diametro aerodinamico"]
+
+
+def get_feature_store() -> "OnlineFeatureStore":
+    """Store vigente; si otro worker reescribió el archivo desde la última revisión, se relee."""
+    global _feature_store
+    if _store_path is not None and time.monotonic() - _store_checked_at >= FEATURE_STORE_CHECK_INTERVAL:
+        # Una sola revisión a la vez; las demás peticiones siguen con el store actual
+        if _store_lock.acquire(blocking=False):
+            try:
+                _sync_feature_store()
+            finally:
+                _store_lock.release()
+    if _feature_store is None:
+        from calidad_aire.feature_store import OnlineFeatureStore
+
+        _feature_store = OnlineFeatureStore()
+    return _feature_store
+
+
+def _mtime_of(path: Optional[str]) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def _sync_feature_store() -> None:
+    """Relee el archivo si cambió desde la versión en memoria (llamar con `_store_lock`)."""
+    global _feature_store, _store_mtime, _store_checked_at
+    _store_checked_at = time.monotonic()
+    mtime = _mtime_of(_store_path)
+    if mtime is None or mtime == _store_mtime:
+        return
+    from calidad_aire.feature_store import OnlineFeatureStore
+
+    try:
+        _feature_store = OnlineFeatureStore.load(Path(_store_path))
+        _store_mtime = mtime
+    except Exception as e:
+        logger.warning(f"No se pudo releer el feature store de {_store_path}: {e}")
+
+
+def load_feature_store(path: Optional[str]) -> None:
+    """Carga el feature store desde disco; si no existe se sirve con features en NaN."""
+    global _store_path, _store_mtime
+    with _store_lock:
+        _store_path, _store_mtime = path, None
+        if not path or not Path(path).is_file():
+            logger.warning(f"Feature store no encontrado en {path}; lags/rollings irán en NaN")
+            return
+        _sync_feature_store()
+    logger.info(f"Feature store cargado: {len(get_feature_store())} series")
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Lock exclusivo entre procesos sobre `<path>.lock` (sin fcntl solo el de hilos)."""
+    if not HAS_FCNTL:
+        yield
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def ingest_into_feature_store(df: "pd.DataFrame") -> int:
+    """
+    Ingiere mediciones en el store y, si tiene archivo, lo publica para los demás workers.
+
+    Bajo el lock de archivo se parte de la última versión escrita por cualquier
+    worker, así ninguna ingesta concurrente se pierde.
+    """
+    global _store_mtime
+    if _store_path is None:
+        return get_feature_store().ingest(df)
+    with _store_lock, _file_lock(_store_path):
+        _sync_feature_store()
+        store = get_feature_store()
+        ingested = store.ingest(df)
+        if ingested:
+            store.save(Path(_store_path))
+            _store_mtime = _mtime_of(_store_path)
+    return ingested
+
+
+def rows_to_columns(rows: List[BaseModel]) -> Dict[str, list]:
+    """Transpone filas validadas por pydantic a columnas (por alias), sin DataFrame."""
+    if not rows:
+        return {}
+    fields = type(rows[0]).__fields__
+    return {field.alias: [getattr(row, name) for row in rows] for name, field in fields.items()}
+
+
+def build_model_columns(columns: Dict[str, Sequence]) -> Dict[str, Sequence]:
+    """Completa las columnas de la petición con los lags/rollings de su serie."""
+    store = get_feature_store()
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    features = store.feature_matrix(columns, n_rows)
+    model_columns = {c: v for c, v in columns.items() if c not in SERIES_ONLY_COLS}
+    for j, name in enumerate(store.feature_cols):
+        model_columns[name] = features[:, j]
+    return model_columns
+
+
+def expand_grid(
+    municipios: Sequence[str],
+    estaciones: Sequence[str],
+    diametros: Optional[Sequence[str]],
+    start: date,
+    end: date,
+) -> Tuple[Dict[str, list], List[Tuple[Optional[str], ...]], list]:
+    """
+    Expande (municipio x estación [x diámetro]) x días en columnas del modelo, sin
+    bucles por fila. Las filas quedan ordenadas por combinación y luego por fecha.
+
+    Devuelve (columnas, combinaciones, fechas).
+    """
+    import numpy as np
+    import pandas as pd
+
+    dates = pd.date_range(start, end, freq="D")
+    n_days = len(dates)
+    combos = [
+        (m, e, d)
+        for m in municipios
+        for e in estaciones
+        for d in (diametros or [None])
+    ]
+    n_combos = len(combos)
+
+    columns: Dict[str, list] = {
+        "Municipio": np.repeat(np.array([c[0] for c in combos], dtype=object), n_days).tolist(),
+        "Estacion": np.repeat(np.array([c[1] for c in combos], dtype=object), n_days).tolist(),
+        "Año": np.tile(dates.year.to_numpy(), n_combos).tolist(),
+        "Mes": np.tile(dates.month.to_numpy(), n_combos).tolist(),
+        "Dia": np.tile(dates.day.to_numpy(), n_combos).tolist(),
+        "DiaSemana": np.tile(dates.day_name().to_numpy(dtype=object), n_combos).tolist(),
+    }
+    if diametros:
+        columns["Diametro aerodinamico"] = np.repeat(
+            np.array([c[2] for c in combos], dtype=object), n_days
+        ).tolist()
+    return columns, combos, list(dates.date)
@@ -0,0 +1,241 @@
+"""
+Evaluación en sombra de un modelo candidato con el tráfico real.
+
+La API responde con el modelo servido y, después, encola el mismo lote para un hilo
+en segundo plano que lo predice con `SHADOW_RUN_ID` y registra las predicciones
+pareadas y los tiempos en una base SQLite de solo inserción (`SHADOW_LOG_PATH`):
+
+- shadow_batches: un registro por lote (corridas, filas, segundos de cada modelo, error)
+- shadow_predictions: una fila por predicción (llaves de la fila, primaria, sombra)
+
+La petición solo paga un `put_nowait` en una cola acotada: si el hilo no da abasto
+la cola se llena y los lotes nuevos se descartan (se cuentan en /metrics), nunca
+se espera.
+
+El candidato corre en el mismo worker y compite por CPU con el modelo servido: solo
+se evalúa una fracción `SHADOW_SAMPLE_RATE` de los lotes, y su regresor se limita a
+`SHADOW_MODEL_THREADS` hilos (si es la misma corrida que la servida, comparte el
+modelo en memoria y conserva los hilos del servido).
+
+Las features de la sombra se calculan en el hilo con el feature store del momento;
+si entre tanto llegan mediciones de la serie los lags pueden diferir.
+
+Para comparar:
+
+    sqlite3 shadow.sqlite "select avg(abs(primary_prediction - shadow_prediction))
+                           from shadow_predictions"
+"""
+import queue
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app_api.config import settings
+
+# Lote encolado: (columnas de la petición, predicciones primarias, run id primario, segundos primarios)
+_Job = Tuple[Dict[str, Sequence], List[float], str, float]
+
+# Llaves de la fila que se guardan junto a cada par de predicciones
+KEY_COLUMNS = ("Municipio", "Estacion", "Diametro aerodinamico", "Año", "Mes", "Dia")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_batches (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    primary_run_id TEXT NOT NULL,
+    shadow_run_id TEXT NOT NULL,
+    n_rows INTEGER NOT NULL,
+    primary_seconds REAL NOT NULL,
+    shadow_seconds REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS shadow_predictions (
+    batch_id INTEGER NOT NULL REFERENCES shadow_batches(id),
+    row INTEGER NOT NULL,
+    municipio TEXT,
+    estacion TEXT,
+    diametro TEXT,
+    anio INTEGER,
+    mes INTEGER,
+    dia INTEGER,
+    primary_prediction REAL,
+    shadow_prediction REAL
+);
+"""
+
+
+class ShadowEvaluator:
+    """Cola acotada + un hilo que predice con el candidato y escribe en SQLite."""
+
+    def __init__(
+        self, run_id: str, log_path: str, max_queue: int = 64, sample_rate: float = 1.0, threads: int = 1
+    ):
+        self.run_id = run_id
+        self.log_path = Path(log_path)
+        self.sample_rate = sample_rate
+        self.threads = threads
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="shadow-model", daemon=True)
+        self.enqueued = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self._thread.start()
+
+    def submit(
+        self, columns: Dict[str, Sequence], predictions: List[float], primary_run_id: str, seconds: float
+    ) -> bool:
+        """Encola el lote sin bloquear; False si queda fuera de la muestra o la cola está llena."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.skipped += 1
+            return False
+        try:
+            self._queue.put_nowait((columns, predictions, primary_run_id, seconds))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo; los lotes que no alcancen a procesarse se pierden."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # =========================
+    # Hilo de la sombra
+    # =========================
+
+    def _connect(self) -> sqlite3.Connection:
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.log_path)
+        # WAL: se puede consultar el log mientras la API escribe
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _run(self) -> None:
+        from calidad_aire.predict import limit_model_threads, make_fast_prediction, warm_up
+
+        from app_api.model_watcher import current_run_id
+        from app_api.serving import build_model_columns
+
+        try:
+            # Se carga aquí: la primera petición no espera al candidato
+            warm_up(self.run_id)
+            if self.run_id != current_run_id():
+                limit_model_threads(self.run_id, self.threads)
+        except Exception as e:
+            logger.error(f"No se pudo cargar el modelo en sombra {self.run_id}: {e}")
+        conn = self._connect()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            columns, primary, primary_run_id, primary_seconds = job
+            t0 = time.perf_counter()
+            try:
+                results = make_fast_prediction(columns=build_model_columns(columns), run_id=self.run_id)
+                error = results.get("errors")
+                shadow = results.get("predictions") or []
+            except Exception as e:
+                error, shadow = repr(e), []
+            shadow_seconds = time.perf_counter() - t0
+            try:
+                self._write(conn, columns, primary, shadow, primary_run_id, primary_seconds, shadow_seconds, error)
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo registrar el lote en sombra: {e}")
+            if error:
+                self.failed += 1
+            else:
+                self.completed += 1
+        conn.close()
+
+    def _write(
+        self,
+        conn: sqlite3.Connection,
+        columns: Dict[str, Sequence],
+        primary: List[float],
+        shadow: List[float],
+        primary_run_id: str,
+        primary_seconds: float,
+        shadow_seconds: float,
+        error,
+    ) -> None:
+        n_rows = len(primary)
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO shadow_batches "
+                "(ts, primary_run_id, shadow_run_id, n_rows, primary_seconds, shadow_seconds, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), primary_run_id, self.run_id, n_rows, primary_seconds, shadow_seconds,
+                 str(error) if error else None),
+            )
+            if error:
+                return
+            none = [None] * n_rows
+            keys = [columns.get(name) if columns.get(name) is not None else none for name in KEY_COLUMNS]
+            conn.executemany(
+                "INSERT INTO shadow_predictions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (cursor.lastrowid, i, *(_plain(k[i]) for k in keys), primary[i], shadow[i])
+                    for i in range(n_rows)
+                ),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "enqueued": self.enqueued,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "depth": self.depth(),
+        }
+
+
+def _plain(value):
+    """Convierte escalares de numpy a tipos de Python para sqlite3."""
+    return value.item() if hasattr(value, "item") else value
+
+
+_evaluator: Optional[ShadowEvaluator] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_shadow() -> Optional[ShadowEvaluator]:
+    """Evaluador del proceso (se crea en el primer uso, después del fork); None si no hay candidato."""
+    global _evaluator
+    if not settings.SHADOW_RUN_ID:
+        return None
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                _evaluator = ShadowEvaluator(
+                    settings.SHADOW_RUN_ID,
+                    settings.SHADOW_LOG_PATH,
+                    settings.SHADOW_QUEUE_SIZE,
+                    sample_rate=settings.SHADOW_SAMPLE_RATE,
+                    threads=settings.SHADOW_MODEL_THREADS,
+                )
+    return _evaluator
+
+
+def shutdown_shadow() -> None:
+    global _evaluator
+    with _evaluator_lock:
+        if _evaluator is not None:
+            _evaluator.close()
+            _evaluator = None
@@ -0,0 +1,304 @@
+"""
+Benchmark por etapa de las rutas de preparación, entrenamiento e inferencia.
+
+Genera un dataset sintético (ver `benchmarks.synthetic`) en un directorio temporal,
+apunta `CALIDAD_AIRE_DATA_DIR` a él y mide tiempo y memoria pico de:
+
+    load_dataset (frío: parseo del CSV; caliente: copia Parquet cacheada)
+    add_group_time_features, temporal_train_holdout_split, build_feature_matrices
+    air_quality_pipe.fit y predict con lotes de 1 / 100 / 10k filas
+
+Los tiempos y la memoria se miden en pasadas separadas: tracemalloc intercepta cada
+asignación y inflaba los tiempos de las etapas con muchos objetos pequeños. La pasada
+de tiempos corre sin instrumentación. La de memoria corre en un subproceso nuevo
+(la memoria que el proceso ya reservó no se vería como crecimiento), ejecuta cada
+etapa una vez y muestrea el RSS en un hilo: pico durante la etapa menos el RSS al
+empezar, con resolución `RSS_SAMPLE_INTERVAL`, incluidas las asignaciones de NumPy y
+XGBoost. El subproceso fija los umbrales de malloc (`MEMORY_PASS_ENV`) para que la
+memoria liberada vuelva al sistema entre etapas. `--no-memory` omite esa pasada.
+
+Cada corrida se agrega a un historial JSON junto con el commit actual, y se compara
+con la última corrida con los mismos parámetros para ver regresiones por etapa.
+
+Uso:
+    python -m benchmarks.bench_hot_paths --stations 40 --years 3
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic import make_station_dataset, write_dataset
+
+BATCH_SIZES = [1, 100, 10_000]
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "history.json"
+# Una etapa se marca como regresión si es un 20% más lenta y al menos 1 ms más lenta
+# (en las etapas muy cortas el ruido domina la razón)
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.001
+RSS_SAMPLE_INTERVAL = 0.002
+# glibc: sin umbral dinámico de mmap y devolviendo la memoria libre al sistema
+MEMORY_PASS_ENV = {"MALLOC_MMAP_THRESHOLD_": "131072", "MALLOC_TRIM_THRESHOLD_": "131072"}
+
+Measure = Callable[[str, Callable[[], Any], int], Any]
+
+
+def current_rss_mb() -> Optional[float]:
+    """RSS actual del proceso (MB) desde /proc; None fuera de Linux."""
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssPeak(threading.Thread):
+    """Muestrea el RSS del proceso mientras corre una etapa y guarda el máximo."""
+
+    def __init__(self, start_mb: float):
+        super().__init__(name="rss-peak", daemon=True)
+        self.peak_mb = start_mb
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(RSS_SAMPLE_INTERVAL):
+            self.peak_mb = max(self.peak_mb, current_rss_mb() or 0.0)
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak_mb, current_rss_mb() or 0.0)
+
+
+def _timed(stages: Dict[str, dict]) -> Measure:
+    """Pasada de tiempos: ejecuta `func` `repeats` veces y guarda la mediana (s)."""
+
+    def measure(name: str, func: Callable[[], Any], repeats: int = 1) -> Any:
+        timings = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - t0)
+        stages[name] = {"seconds": round(median(timings), 6), "peak_mb": None}
+        return result
+
+    return measure
+
+
+def _peak_memory(stages: Dict[str, dict]) -> Measure:
+    """Pasada de memoria: ejecuta `func` una vez y guarda el pico de RSS sobre el inicial (MB)."""
+
+    def measure(name: str, func: Callable[[], Any], repeats: int = 1) -> Any:
+        gc.collect()
+        start = current_rss_mb()
+        if start is None:
+            return func()
+        sampler = RssPeak(start)
+        sampler.start()
+        try:
+            result = func()
+        finally:
+            peak = sampler.stop()
+        stages[name] = {"peak_mb": round(peak - start, 2)}
+        return result
+
+    return measure
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_stages(measure: Measure, args, config, date_col: str) -> Dict[str, int]:
+    """Corre las etapas en orden pasando cada una por `measure`; devuelve el conteo de filas."""
+    from calidad_aire.pipeline import build_pipeline
+    from calidad_aire.processing.data_manager import (
+        add_group_time_features,
+        build_feature_matrices,
+        load_dataset,
+        temporal_train_holdout_split,
+    )
+
+    measure("load_dataset_cold", load_dataset, 1)
+    df = measure("load_dataset_warm", load_dataset, args.repeats)
+    featurized = measure("add_group_time_features", lambda: add_group_time_features(df.copy()), args.repeats)
+    train_df, holdout_df, _ = measure(
+        "temporal_train_holdout_split", lambda: temporal_train_holdout_split(featurized), args.repeats
+    )
+    matrices = measure("build_feature_matrices", lambda: build_feature_matrices(train_df, holdout_df), args.repeats)
+    X_train, y_train, X_holdout = matrices[0], matrices[1], matrices[2]
+    X_train = X_train.drop(columns=[date_col])
+    X_holdout = X_holdout.drop(columns=[date_col])
+
+    pipe = build_pipeline(config.pipeline_variant)
+    if args.n_estimators:
+        pipe.set_params(model__n_estimators=args.n_estimators)
+    measure("fit", lambda: pipe.fit(X_train, y_train), 1)
+
+    for size in BATCH_SIZES:
+        batch = X_holdout.sample(n=size, replace=len(X_holdout) < size, random_state=0)
+        measure(f"predict_{size}", lambda: pipe.predict(batch), args.repeats)
+    return {"dataset": len(df), "train": len(X_train), "holdout": len(X_holdout)}
+
+
+def run_suite(args, memory: bool = False) -> Dict[str, dict]:
+    """Mide cada etapa (tiempos, o memoria con `memory`) sobre un dataset sintético temporal."""
+    stages: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-calidad-aire-") as data_dir:
+        # DATA_DIR se resuelve al importar la config: fijarlo antes de importar el paquete
+        os.environ["CALIDAD_AIRE_DATA_DIR"] = data_dir
+        from calidad_aire.config.core import config
+        from calidad_aire.processing.data_manager import column_setting
+
+        df = make_station_dataset(
+            n_stations=args.stations,
+            n_years=args.years,
+            pollutants=args.pollutants,
+            seed=args.seed,
+        )
+        write_dataset(df, Path(data_dir) / config.data_file)
+        date_col = column_setting("DATE_COL")
+
+        measure = _peak_memory(stages) if memory else _timed(stages)
+        stages["_rows"] = run_stages(measure, args, config, date_col)
+    return stages
+
+
+def run_memory_pass(argv: List[str]) -> Dict[str, Optional[float]]:
+    """Pico de RSS por etapa (MB), medido en un subproceso con los mismos argumentos."""
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_hot_paths", *argv, "--memory-pass"],
+        env={**os.environ, **MEMORY_PASS_ENV},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # La última línea es el JSON; antes pueden venir avisos del pipeline
+    stages = json.loads(out.stdout.strip().splitlines()[-1])
+    return {stage: result["peak_mb"] for stage, result in stages.items() if not stage.startswith("_")}
+
+
+# =========================
+# Historial
+# =========================
+
+def load_history(path: Path) -> List[dict]:
+    if not path.is_file():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def previous_run(history: List[dict], params: dict) -> Optional[dict]:
+    """Última corrida del historial con los mismos parámetros."""
+    for entry in reversed(history):
+        if entry.get("params") == params:
+            return entry
+    return None
+
+
+def compare(current: Dict[str, dict], previous: Optional[dict]) -> Dict[str, Optional[float]]:
+    """Razón tiempo actual / anterior por etapa (None si no hay referencia)."""
+    ratios: Dict[str, Optional[float]] = {}
+    for stage, result in current.items():
+        if stage.startswith("_"):
+            continue
+        before = (previous or {}).get("stages", {}).get(stage)
+        ratios[stage] = (
+            round(result["seconds"] / before["seconds"], 3)
+            if before and before.get("seconds")
+            else None
+        )
+    return ratios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=40)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--pollutants", nargs="+", default=["PM10", "PM2.5"])
+    parser.add_argument("--n-estimators", type=int, default=None, help="Sobrescribe n_estimators del modelo")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="Historial JSON de corridas")
+    parser.add_argument("--no-memory", action="store_true", help="Omite la pasada de memoria (RSS)")
+    parser.add_argument("--memory-pass", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--no-save", action="store_true", help="No agrega la corrida al historial")
+    args = parser.parse_args()
+
+    params = {
+        "stations": args.stations,
+        "years": args.years,
+        "pollutants": args.pollutants,
+        "n_estimators": args.n_estimators,
+        "repeats": args.repeats,
+        "seed": args.seed,
+        # Las corridas anteriores medían los tiempos bajo tracemalloc: no son comparables
+        "timing": "untraced",
+    }
+    if args.memory_pass:
+        print(json.dumps(run_suite(args, memory=True)))
+        return
+
+    stages = run_suite(args)
+    if not args.no_memory:
+        for stage, peak_mb in run_memory_pass(sys.argv[1:]).items():
+            stages[stage]["peak_mb"] = peak_mb
+    history = load_history(args.history)
+    ratios = compare(stages, previous_run(history, params))
+
+    rows = stages.pop("_rows")
+    print(f"Dataset sintético: {rows['dataset']} filas (train {rows['train']}, holdout {rows['holdout']})")
+    print(f"{'etapa':<30}{'tiempo (ms)':>14}{'pico RSS (MB)':>15}{'vs anterior':>14}")
+    for stage, result in stages.items():
+        ratio = ratios.get(stage)
+        regressed = (
+            ratio is not None
+            and ratio >= REGRESSION_RATIO
+            and result["seconds"] * (1 - 1 / ratio) >= REGRESSION_MIN_SECONDS
+        )
+        flag = "  <- regresión" if regressed else ""
+        peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+        print(
+            f"{stage:<30}{result['seconds'] * 1000:>14.2f}{peak:>15}"
+            f"{(f'{ratio:.2f}x' if ratio is not None else '-'):>14}{flag}"
+        )
+    # ru_maxrss está en KiB en Linux
+    max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(f"RSS máximo del proceso: {max_rss_mb} MB")
+
+    if not args.no_save:
+        history.append({
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "params": params,
+            "rows": rows,
+            "stages": stages,
+            "max_rss_mb": max_rss_mb,
+        })
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2)
+        print(f"Corrida agregada a {args.history} ({len(history)} en total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark de las variantes del pipeline XGB (dense / sparse / categorical).
+
+Cada variante corre en un proceso aparte sobre el mismo dataset sintético y reporta
+tiempo de entrenamiento, latencia de predicción por tamaño de lote y memoria pico.
+
+Los tiempos se toman sin instrumentar; la memoria se mide en otro proceso nuevo que
+entrena y predice una vez, muestreando el RSS como `bench_hot_paths` (pico sobre el
+RSS antes de entrenar) y con el RSS máximo del proceso. `--no-memory` omite esa pasada.
+
+Uso:
+    python -m benchmarks.bench_pipeline_variants --stations 40 --years 3
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import time
+from statistics import median
+
+from benchmarks.bench_hot_paths import MEMORY_PASS_ENV, RssPeak, current_rss_mb
+from benchmarks.synthetic import make_station_dataset
+
+BATCH_SIZES = [1, 100, 10_000]
+
+
+def _prepare(args):
+    from calidad_aire.processing.data_manager import (
+        DATE_COL,
+        TARGET_COL,
+        add_group_time_features,
+        build_feature_matrices,
+        temporal_train_holdout_split,
+    )
+
+    df = make_station_dataset(n_stations=args.stations, n_years=args.years, seed=args.seed)
+    df = df.dropna(subset=[TARGET_COL]).sort_values(DATE_COL).reset_index(drop=True)
+    df = add_group_time_features(df)
+    train_df, holdout_df, _ = temporal_train_holdout_split(df)
+    X_train, y_train, X_holdout, _, _, _ = build_feature_matrices(train_df, holdout_df)
+    return X_train.drop(columns=[DATE_COL]), y_train, X_holdout.drop(columns=[DATE_COL])
+
+
+def _batches(X_holdout):
+    return {
+        size: X_holdout.sample(n=size, replace=len(X_holdout) < size, random_state=0) for size in BATCH_SIZES
+    }
+
+
+def _run_variant(variant: str, args, queue) -> None:
+    """Pasada de tiempos: entrenamiento y mediana de `repeats` predicciones por lote."""
+    from calidad_aire.pipeline import build_pipeline
+
+    X_train, y_train, X_holdout = _prepare(args)
+    pipe = build_pipeline(variant)
+    if args.n_estimators:
+        pipe.set_params(model__n_estimators=args.n_estimators)
+
+    t0 = time.perf_counter()
+    pipe.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+
+    latency_ms = {}
+    for size, batch in _batches(X_holdout).items():
+        timings = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            pipe.predict(batch)
+            timings.append((time.perf_counter() - t0) * 1000)
+        latency_ms[str(size)] = round(median(timings), 3)
+
+    queue.put({
+        "variant": variant,
+        "train_rows": len(X_train),
+        "fit_s": round(fit_s, 3),
+        "predict_ms": latency_ms,
+    })
+
+
+def _measure_variant_memory(variant: str, args, queue) -> None:
+    """Pasada de memoria: entrena y predice cada lote una vez muestreando el RSS."""
+    from calidad_aire.pipeline import build_pipeline
+
+    X_train, y_train, X_holdout = _prepare(args)
+    batches = _batches(X_holdout)
+    pipe = build_pipeline(variant)
+    if args.n_estimators:
+        pipe.set_params(model__n_estimators=args.n_estimators)
+
+    gc.collect()
+    start = current_rss_mb()
+    sampler = RssPeak(start or 0.0)
+    sampler.start()
+    pipe.fit(X_train, y_train)
+    for batch in batches.values():
+        pipe.predict(batch)
+    peak = sampler.stop()
+
+    queue.put({
+        "peak_rss_mb": round(peak - start, 1) if start is not None else None,
+        # ru_maxrss está en KiB en Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+def _collect(variant: str, proc, queue, timeout: float) -> dict:
+    """Espera el resultado del hijo; si muere o se pasa del plazo, reporta la variante como fallida."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1.0)
+        except queue_module.Empty:
+            pass
+        if not proc.is_alive():
+            # Pudo dejar el resultado justo antes de terminar
+            try:
+                return queue.get(timeout=1.0)
+            except queue_module.Empty:
+                return {"variant": variant, "error": f"el proceso terminó con código {proc.exitcode}"}
+        if time.monotonic() > deadline:
+            proc.terminate()
+            return {"variant": variant, "error": f"sin resultado tras {timeout:.0f} s"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", nargs="+", default=["dense", "sparse", "categorical"])
+    parser.add_argument("--stations", type=int, default=40)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--n-estimators", type=int, default=None, help="Sobrescribe n_estimators del modelo")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", default=None, help="Archivo JSON para guardar los resultados")
+    parser.add_argument("--no-memory", action="store_true", help="Omite la pasada de memoria")
+    parser.add_argument("--timeout", type=float, default=1800, help="Segundos máximos por variante")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+
+    def run(target, variant: str) -> dict:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=target, args=(variant, args, queue))
+        proc.start()
+        result = _collect(variant, proc, queue, args.timeout)
+        proc.join()
+        return result
+
+    results = []
+    for variant in args.variants:
+        result = run(_run_variant, variant)
+        if "error" not in result and not args.no_memory:
+            # Los umbrales de malloc se leen al arrancar el proceso hijo
+            saved = {k: os.environ.get(k) for k in MEMORY_PASS_ENV}
+            os.environ.update(MEMORY_PASS_ENV)
+            try:
+                memory = run(_measure_variant_memory, variant)
+            finally:
+                for k, v in saved.items():
+                    if v is None:
+                        os.environ.pop(k, None)
+                    else:
+                        os.environ[k] = v
+            if "error" in memory:
+                result["memory_error"] = memory["error"]
+            else:
+                result.update(memory)
+        results.append(result)
+
+    def mb(value) -> str:
+        return "-" if value is None else f"{value:.1f}"
+
+    header = f"{'variante':<12}{'fit (s)':>9}" + "".join(f"{f'pred {b} (ms)':>18}" for b in BATCH_SIZES)
+    print(header + f"{'pico RSS (MB)':>15}{'RSS máx (MB)':>14}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['variant']:<12}FALLÓ: {r['error']}")
+            continue
+        print(
+            f"{r['variant']:<12}{r['fit_s']:>9.2f}"
+            + "".join(f"{r['predict_ms'][str(b)]:>18.2f}" for b in BATCH_SIZES)
+            + f"{mb(r.get('peak_rss_mb')):>15}{mb(r.get('max_rss_mb')):>14}"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Prueba de carga de la API (`app_api.main:app`) contra un MLflow local en archivos.
+
+1. Si no se pasa `--run-id`, entrena un modelo pequeño sobre un dataset sintético
+   (ver `benchmarks.synthetic`) y lo registra en un store `file://` temporal, junto
+   con el feature store en línea de ese histórico.
+2. Arranca el servidor (gunicorn con `app_api/gunicorn_conf.py` o uvicorn) con
+   `MLFLOW_TRACKING_URI`, `MLFLOW_RUN_ID` y `FEATURE_STORE_PATH` apuntando ahí.
+3. Lanza peticiones a `/api/v1/predict` con la concurrencia y la mezcla de tamaños
+   de lote pedidas y reporta throughput, latencia p50/p95/p99, tasa de error y RSS
+   de cada worker.
+
+Las peticiones salen de un conjunto fijo de filas: con el cache de predicciones
+(`PREDICTION_CACHE_SIZE`) activo la corrida pronto mide aciertos de cache. Usar
+`--no-cache` para medir el servicio del modelo.
+
+`--shadow` entrena además un candidato (otra semilla) y lo evalúa en sombra
+(`SHADOW_RUN_ID`) con la fracción `--shadow-sample-rate` de los lotes, para medir
+cuánto le cuesta al p99 del modelo servido.
+
+Uso:
+    python -m benchmarks.load_test --concurrency 32 --duration 30 --mix 1:0.8,100:0.15,1000:0.05
+    python -m benchmarks.load_test --server uvicorn --workers 1 --run-id <RUN_ID> \\
+        --tracking-uri file:///ruta/mlruns
+    python -m benchmarks.load_test --no-cache --shadow --shadow-sample-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic import make_station_dataset, write_dataset
+
+# Cliente HTTP asíncrono (viene con el TestClient de FastAPI)
+try:
+    import httpx
+
+    HAS_HTTPX = True
+except Exception:
+    HAS_HTTPX = False
+
+# psutil es opcional: sin él, el RSS se lee de /proc (solo Linux)
+try:
+    import psutil
+
+    HAS_PSUTIL = True
+except Exception:
+    HAS_PSUTIL = False
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PREDICT_PATH = "/api/v1/predict"
+
+
+# =========================
+# Modelo y feature store locales
+# =========================
+
+def train_local_model(work_dir: Path, args) -> Tuple[str, str, Optional[str], Path]:
+    """Entrena sobre datos sintéticos y registra el modelo (y el candidato con `--shadow`).
+
+    Devuelve (tracking_uri, run_id, shadow_run_id, feature_store).
+    """
+    data_dir = work_dir / "data"
+    # DATA_DIR se resuelve al importar la config: fijarlo antes de importar el paquete
+    os.environ["CALIDAD_AIRE_DATA_DIR"] = str(data_dir)
+    import mlflow
+    import mlflow.sklearn
+
+    from calidad_aire.config.core import config
+    from calidad_aire.feature_store import OnlineFeatureStore
+    from calidad_aire.pipeline import build_pipeline
+    from calidad_aire.processing.data_manager import column_setting, load_dataset, prepare_datasets
+
+    df = make_station_dataset(n_stations=args.stations, n_years=args.years, seed=args.seed)
+    write_dataset(df, data_dir / config.data_file)
+
+    data = prepare_datasets()
+    date_col = data["date_col"]
+    X_train = data["X_train"].drop(columns=[date_col])
+    tracking_uri = (work_dir / "mlruns").as_uri()
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment("load_test")
+
+    def fit_and_log(run_name: str, seed: int) -> str:
+        pipe = build_pipeline(config.pipeline_variant)
+        pipe.set_params(model__n_estimators=args.n_estimators, model__random_state=seed)
+        pipe.fit(X_train, data["y_train"])
+        with mlflow.start_run(run_name=run_name) as run:
+            mlflow.sklearn.log_model(
+                sk_model=pipe,
+                artifact_path="model",
+                input_example=X_train.head(1).astype({c: str for c in data["feature_cols_cat"]}),
+            )
+        return run.info.run_id
+
+    run_id = fit_and_log("load_test_model", args.seed)
+    shadow_run_id = fit_and_log("load_test_shadow", args.seed + 1) if args.shadow else None
+
+    feature_store = work_dir / "feature_store.json"
+    OnlineFeatureStore.from_history(
+        load_dataset(),
+        group_cols=column_setting("CAT_GROUP"),
+        date_col=date_col,
+        target_col=column_setting("TARGET_COL"),
+    ).save(feature_store)
+    return tracking_uri, run_id, shadow_run_id, feature_store
+
+
+def sample_rows(n_stations: int, n_years: int, seed: int) -> List[dict]:
+    """Filas de petición sobre las series del dataset sintético (fechas posteriores al histórico)."""
+    df = make_station_dataset(n_stations=n_stations, n_years=1, seed=seed).head(5000)
+    dates = df["Fecha"] + np.timedelta64(365 * n_years, "D")
+    return [
+        {
+            "Municipio": m,
+            "Estacion": e,
+            "Diametro aerodinamico": d,
+            "Año": int(f.year),
+            "Mes": int(f.month),
+            "Dia": int(f.day),
+            "DiaSemana": f.day_name(),
+        }
+        for m, e, d, f in zip(df["Municipio"], df["Estacion"], df["Diametro aerodinamico"], dates)
+    ]
+
+
+# =========================
+# Servidor
+# =========================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    if args.server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", str(REPO_ROOT / "app_api" / "gunicorn_conf.py"),
+               "app_api.main:app"]
+        env = {**env, "PORT": str(port), "WEB_CONCURRENCY": str(args.workers)}
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app_api.main:app", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, env=env, cwd=REPO_ROOT)
+
+
+def wait_ready(url: str, payload: dict, server: subprocess.Popen, timeout: float) -> None:
+    """Espera a la primera respuesta 200 de /predict (modelo cargado)."""
+    t0 = time.perf_counter()
+    with httpx.Client(timeout=timeout) as client:
+        while time.perf_counter() - t0 < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"El servidor terminó con código {server.returncode}")
+            try:
+                if client.post(url, json=payload).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+    raise TimeoutError(f"El servidor no respondió 200 en {timeout}s")
+
+
+def _proc_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _children(pid: int) -> List[int]:
+    if HAS_PSUTIL:
+        try:
+            return [c.pid for c in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+class RssSampler(threading.Thread):
+    """Muestrea periódicamente el RSS del maestro y de cada worker; guarda el máximo por pid."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_mb: Dict[int, float] = {}
+        self._stop_event = threading.Event()
+
+    def sample(self) -> None:
+        for pid in [self.pid] + _children(self.pid):
+            if HAS_PSUTIL:
+                try:
+                    rss = psutil.Process(pid).memory_info().rss / 2**20
+                except psutil.Error:
+                    continue
+            else:
+                rss = _proc_rss_mb(pid)
+                if rss is None:
+                    continue
+            self.peak_mb[pid] = max(self.peak_mb.get(pid, 0.0), rss)
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+# =========================
+# Generador de carga
+# =========================
+
+def parse_mix(spec: str) -> Tuple[List[int], List[float]]:
+    """'1:0.8,100:0.2' -> ([1, 100], [0.8, 0.2])"""
+    sizes, weights = [], []
+    for item in spec.split(","):
+        size, weight = item.split(":")
+        sizes.append(int(size))
+        weights.append(float(weight))
+    return sizes, weights
+
+
+async def drive(url: str, rows: List[dict], args) -> dict:
+    sizes, weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    rows_ok = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def user(client: "httpx.AsyncClient") -> None:
+        nonlocal rows_ok
+        while time.perf_counter() < deadline:
+            size = rng.choices(sizes, weights)[0]
+            start = rng.randrange(len(rows))
+            batch = [rows[(start + i) % len(rows)] for i in range(size)]
+            t0 = time.perf_counter()
+            try:
+                response = await client.post(url, json={"inputs": batch})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - t0)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                rows_ok += size
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    total = sum(statuses.values())
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "rows_per_second": round(rows_ok / elapsed, 1),
+        "latency_ms": {
+            f"p{q}": round(float(np.percentile(lat_ms, q)), 2) if total else None for q in (50, 95, 99)
+        },
+        "error_rate": round(1 - statuses.get("200", 0) / total, 4) if total else None,
+        "statuses": statuses,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de carga")
+    parser.add_argument("--mix", default="1:0.8,100:0.15,1000:0.05", help="tamaño:peso de los lotes")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Desactiva el cache de predicciones del servidor (PREDICTION_CACHE_SIZE=0)")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Entrena un candidato y lo evalúa en sombra (SHADOW_RUN_ID)")
+    parser.add_argument("--shadow-sample-rate", type=float, default=None,
+                        help="SHADOW_SAMPLE_RATE del servidor (por defecto el de la config)")
+    parser.add_argument("--run-id", default=None, help="Usa un modelo ya registrado en vez de entrenar uno")
+    parser.add_argument("--tracking-uri", default=None, help="Store de MLflow del --run-id")
+    parser.add_argument("--feature-store", type=Path, default=None)
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON")
+    args = parser.parse_args()
+    if not HAS_HTTPX:
+        parser.error("La prueba de carga requiere httpx")
+    if args.run_id and not args.tracking_uri:
+        parser.error("--run-id requiere --tracking-uri")
+    if args.shadow and args.run_id:
+        parser.error("--shadow entrena su propio candidato: no se combina con --run-id")
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as tmp:
+        work_dir = Path(tmp)
+        if args.run_id:
+            tracking_uri, run_id, shadow_run_id, feature_store = (
+                args.tracking_uri, args.run_id, None, args.feature_store
+            )
+        else:
+            print("Entrenando modelo sintético en un store MLflow local...")
+            tracking_uri, run_id, shadow_run_id, feature_store = train_local_model(work_dir, args)
+
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT / "src"), str(REPO_ROOT),
+                                                        os.getenv("PYTHONPATH")])),
+            "MLFLOW_TRACKING_URI": tracking_uri,
+            "MLFLOW_RUN_ID": run_id,
+            "MODEL_STORE_DIR": str(work_dir / "model_store"),
+            "FEATURE_STORE_PATH": str(feature_store or work_dir / "feature_store.json"),
+        }
+        if args.no_cache:
+            env["PREDICTION_CACHE_SIZE"] = "0"
+        if shadow_run_id:
+            env["SHADOW_RUN_ID"] = shadow_run_id
+            env["SHADOW_LOG_PATH"] = str(work_dir / "shadow_log.sqlite")
+            if args.shadow_sample_rate is not None:
+                env["SHADOW_SAMPLE_RATE"] = str(args.shadow_sample_rate)
+        rows = sample_rows(args.stations, args.years, args.seed)
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}{PREDICT_PATH}"
+
+        server = start_server(args, port, env)
+        try:
+            wait_ready(url, {"inputs": rows[:1]}, server, args.timeout)
+            sampler = RssSampler(server.pid)
+            sampler.start()
+            report = asyncio.run(drive(url, rows, args))
+            sampler.stop()
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    report.update({
+        "server": args.server,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "prediction_cache": not args.no_cache,
+        "shadow_sample_rate": (
+            (args.shadow_sample_rate if args.shadow_sample_rate is not None else "config") if args.shadow else None
+        ),
+        "rss_mb": {
+            ("maestro" if pid == server.pid else str(pid)): round(mb, 1)
+            for pid, mb in sampler.peak_mb.items()
+        },
+    })
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    cache = "sin cache de predicciones" if args.no_cache else "con cache de predicciones"
+    print(f"\n{args.server} x{args.workers}, {args.concurrency} clientes, mezcla {args.mix}, {cache}")
+    if args.shadow:
+        print(f"  modelo en sombra, muestra: {report['shadow_sample_rate']}")
+    print(f"  peticiones:     {report['requests']} en {report['seconds']}s")
+    print(f"  throughput:     {report['requests_per_second']} req/s, {report['rows_per_second']} filas/s")
+    lat = report["latency_ms"]
+    print(f"  latencia (ms):  p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}")
+    print(f"  tasa de error:  {report['error_rate']}  {report['statuses']}")
+    print("  RSS pico (MB):  " + ", ".join(f"{k}={v}" for k, v in report["rss_mb"].items()))
+
+
+if __name__ == "__main__":
+    main()
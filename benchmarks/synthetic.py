@@ -0,0 +1,69 @@
+"""
+Generador de datasets sintéticos con el esquema de `Calidad_del_Aire_enriquecido.csv`.
+
+Permite escalar el número de estaciones, años y contaminantes para medir las rutas
+de preparación, entrenamiento e inferencia sin datos reales ni red.
+"""
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+MUNICIPIOS = ["PEREIRA", "DOSQUEBRADAS", "LA VIRGINIA", "SANTA ROSA DE CABAL"]
+
+
+def make_station_dataset(
+    n_stations: int = 8,
+    n_years: int = 3,
+    pollutants: Sequence[str] = ("PM10", "PM2.5"),
+    start: str = "2019-01-01",
+    missing_frac: float = 0.3,
+    seed: int = 13,
+) -> pd.DataFrame:
+    """Mediciones diarias por (Municipio, Estacion, Diametro aerodinamico).
+
+    Cada serie tiene nivel propio, estacionalidad anual y semanal y ruido; se
+    eliminan al azar `missing_frac` de los días para imitar huecos de monitoreo.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=365 * n_years, freq="D")
+    n_series = n_stations * len(pollutants)
+
+    station_idx = np.repeat(np.arange(n_stations), len(pollutants))
+    pollutant_idx = np.tile(np.arange(len(pollutants)), n_stations)
+    level = rng.uniform(15, 45, n_series) / (1 + pollutant_idx)
+
+    day_of_year = dates.dayofyear.to_numpy()
+    weekday = dates.dayofweek.to_numpy()
+    seasonal = 8 * np.sin(2 * np.pi * day_of_year / 365.25) + 3 * (weekday < 5)
+    values = level[:, None] + seasonal[None, :] + rng.normal(0, 5, (n_series, len(dates)))
+    values = np.clip(values, 0, None).round(2)
+
+    keep = rng.random((n_series, len(dates))) >= missing_frac
+    series_rows, date_rows = np.nonzero(keep)
+
+    fechas = dates[date_rows]
+    stations = station_idx[series_rows]
+    df = pd.DataFrame({
+        "Municipio": np.array(MUNICIPIOS, dtype=object)[stations % len(MUNICIPIOS)],
+        "Estacion": np.array([f"Estacion {i:03d}" for i in range(n_stations)], dtype=object)[stations],
+        "Fecha": fechas,
+        "Diametro aerodinamico": np.array(pollutants, dtype=object)[pollutant_idx[series_rows]],
+        "Medicion": values[series_rows, date_rows],
+    })
+    df["Dia"] = fechas.day
+    df["Mes"] = fechas.month
+    df["Año"] = fechas.year
+    df["DiaSemana"] = fechas.day_name()
+    return df.sort_values("Fecha", kind="stable").reset_index(drop=True)
+
+
+def write_dataset(df: pd.DataFrame, path: Path) -> Path:
+    """Escribe el dataset como el CSV procesado (fechas en formato AAAA-MM-DD)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out = df.copy()
+    out["Fecha"] = out["Fecha"].dt.strftime("%Y-%m-%d")
+    out.to_csv(path, index=False)
+    return path
@@ -0,0 +1,174 @@
+"""
+Almacén local de artefactos de modelo, direccionado por contenido.
+
+El artefacto `model` de una corrida se descarga una sola vez desde MLflow y se
+guarda en disco bajo el hash SHA-256 de su contenido:
+
+    <raiz>/objects/<digest>/          copia inmutable del artefacto
+    <raiz>/manifests/<digest>.json    hash de cada archivo del artefacto
+    <raiz>/refs/<run_id>              digest asociado a la corrida
+
+Los arranques posteriores resuelven la corrida desde `refs/` y cargan el modelo
+desde disco sin contactar el servidor de tracking.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from calidad_aire.config.core import config
+from calidad_aire.fileutil import set_published_mode
+
+MODEL_STORE_ENV = "MODEL_STORE_DIR"
+DEFAULT_STORE_DIR = Path.home() / ".cache" / "calidad_aire" / "models"
+_CHUNK_SIZE = 1 << 20
+
+
+class ArtifactIntegrityError(RuntimeError):
+    """El contenido en disco no coincide con el checksum registrado."""
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tree_manifest(root: Path) -> Dict[str, str]:
+    """Hash por archivo (ruta relativa en formato posix -> sha256)."""
+    return {
+        p.relative_to(root).as_posix(): _file_sha256(p)
+        for p in sorted(root.rglob("*"))
+        if p.is_file()
+    }
+
+
+def _tree_digest(manifest: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for rel_path in sorted(manifest):
+        digest.update(f"{rel_path}\0{manifest[rel_path]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    set_published_mode(tmp)
+    os.replace(tmp, path)
+
+
+class ArtifactStore:
+    """Copia local y verificada de los artefactos `model` de MLflow."""
+
+    def __init__(self, root: Optional[Path] = None):
+        if root is None:
+            root = Path(os.getenv(MODEL_STORE_ENV) or DEFAULT_STORE_DIR)
+        self.root = Path(root)
+
+    def _ref_path(self, run_id: str) -> Path:
+        return self.root / "refs" / run_id
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest
+
+    def _manifest_path(self, digest: str) -> Path:
+        return self.root / "manifests" / f"{digest}.json"
+
+    def resolve(self, run_id: str) -> Optional[str]:
+        """Digest del artefacto de la corrida si ya está materializado."""
+        ref = self._ref_path(run_id)
+        if not ref.is_file():
+            return None
+        digest = ref.read_text(encoding="utf-8").strip()
+        if not self._object_path(digest).is_dir() or not self._manifest_path(digest).is_file():
+            return None
+        return digest
+
+    def verify(self, digest: str) -> None:
+        """Recalcula los hashes del artefacto y los compara con su manifiesto."""
+        manifest = json.loads(self._manifest_path(digest).read_text(encoding="utf-8"))
+        actual = _tree_manifest(self._object_path(digest))
+        if actual != manifest or _tree_digest(actual) != digest:
+            raise ArtifactIntegrityError(
+                f"El artefacto {digest} en {self.root} no coincide con su checksum."
+            )
+
+    def _download(self, run_id: str) -> str:
+        import mlflow  # solo hace falta si la corrida no está en el almacén
+
+        load_dotenv()
+        mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI") or config.mlflow_tracking_uri)
+
+        tmp_root = self.root / "tmp"
+        tmp_root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=tmp_root))
+        try:
+            local = Path(
+                mlflow.artifacts.download_artifacts(
+                    artifact_uri=f"runs:/{run_id}/model", dst_path=str(staging)
+                )
+            )
+            manifest = _tree_manifest(local)
+            digest = _tree_digest(manifest)
+
+            target = self._object_path(digest)
+            if not target.is_dir():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                set_published_mode(local)
+                try:
+                    os.replace(local, target)
+                except OSError:
+                    # Otro proceso materializó el mismo contenido en paralelo
+                    if not target.is_dir():
+                        raise
+            _atomic_write_text(self._manifest_path(digest), json.dumps(manifest, indent=2))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        _atomic_write_text(self._ref_path(run_id), digest)
+        return digest
+
+    def materialize(self, run_id: str, verify: bool = True) -> Path:
+        """
+        Ruta local del artefacto `model` de la corrida.
+
+        Solo descarga desde MLflow si la corrida no está en el almacén o si la copia
+        local está corrupta.
+        """
+        digest = self.resolve(run_id)
+        if digest is not None and verify:
+            try:
+                self.verify(digest)
+            except ArtifactIntegrityError:
+                shutil.rmtree(self._object_path(digest), ignore_errors=True)
+                digest = None
+        if digest is None:
+            digest = self._download(run_id)
+        return self._object_path(digest)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Materializa en disco el artefacto `model` de corridas de MLflow."
+    )
+    parser.add_argument("run_ids", nargs="+", help="Run IDs de MLflow")
+    parser.add_argument("--store", type=Path, default=None, help="Raíz del almacén local")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.store)
+    for run_id in args.run_ids:
+        print(f"{run_id} -> {store.materialize(run_id)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Scoring por lotes de archivos grandes (CSV o Parquet) sin pasar por la API.
+
+El archivo se lee por bloques en el proceso principal, que los limpia y featuriza
+con la misma lógica de `data_manager` (lags/rollings por serie). La historia de
+cada serie se arrastra de un bloque al siguiente con un `OnlineFeatureStore`, así
+los lags cruzan los bordes de bloque. Los bloques se predicen en un pool de
+procesos que cargan el modelo una sola vez y cada uno escribe su parte Parquet.
+
+Uso:
+    python -m calidad_aire.batch_score datos.csv salida/ --run-id <RUN_ID>
+
+El archivo debe venir en orden cronológico (como el dataset procesado); las filas
+sin todos sus lags/rollings se descartan igual que en entrenamiento.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, List, Optional, Set
+
+import pandas as pd
+
+from calidad_aire.feature_store import OnlineFeatureStore
+from calidad_aire.predict import load_model, warm_up
+from calidad_aire.processing.data_manager import (
+    clean_dataset,
+    column_setting,
+    feature_columns,
+)
+from calidad_aire.processing.dataset_cache import FLOAT32_COLS
+from calidad_aire.processing.incremental import featurize_with_tails
+
+# Parquet es opcional para la entrada, pero obligatorio para la salida
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+# =========================
+# Lectura por bloques
+# =========================
+
+def read_chunks(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Bloques de `chunk_rows` filas de un CSV o Parquet, sin cargar el archivo completo."""
+    if path.suffix.lower() in (".parquet", ".pq"):
+        if not HAS_PYARROW:
+            raise RuntimeError("Leer Parquet requiere pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def featurized_chunks(
+    path: Path,
+    chunk_rows: int,
+    history: OnlineFeatureStore,
+    lags: List[int],
+    rolls: List[int],
+) -> Iterator[pd.DataFrame]:
+    """Bloques limpios y featurizados; `history` se actualiza con cada bloque."""
+    date_col, target_col = column_setting("DATE_COL"), column_setting("TARGET_COL")
+    last_date, warned = None, False
+    for chunk in read_chunks(path, chunk_rows):
+        # Mismos tipos que el dataset cacheado con el que se entrenó: los lags en
+        # float64 pueden caer al otro lado de un umbral del árbol
+        for col in FLOAT32_COLS:
+            if col in chunk.columns:
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype("float32")
+        chunk = clean_dataset(chunk)
+        if chunk.empty:
+            continue
+        if not warned and last_date is not None and chunk[date_col].iloc[0] < last_date:
+            print(
+                f"[WARN] Bloque con fechas anteriores a {last_date}: el archivo no está en orden "
+                "cronológico y los lags de esas filas no coincidirán con los de entrenamiento."
+            )
+            warned = True
+        last_date = max(last_date, chunk[date_col].iloc[-1]) if last_date is not None else chunk[date_col].iloc[-1]
+
+        featurized = featurize_with_tails(chunk, history, lags, rolls)
+        history.ingest(chunk, date_col=date_col, target_col=target_col)
+        if not featurized.empty:
+            yield featurized.reset_index(drop=True)
+
+
+# =========================
+# Workers (un modelo por proceso)
+# =========================
+
+_worker_run_id: Optional[str] = None
+
+
+def _init_worker(run_id: str) -> None:
+    global _worker_run_id
+    _worker_run_id = run_id
+    warm_up(run_id)
+
+
+def _score_part(
+    index: int,
+    frame: pd.DataFrame,
+    model_cols: List[str],
+    output_dir: str,
+    partition_by: List[str],
+) -> int:
+    predictions = load_model(_worker_run_id).predict(frame[model_cols])
+    out = frame.copy()
+    out["prediction"] = predictions
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    if partition_by:
+        pq.write_to_dataset(
+            table,
+            output_dir,
+            partition_cols=partition_by,
+            basename_template=f"part-{index:05d}-{{i}}.parquet",
+        )
+    else:
+        pq.write_table(table, Path(output_dir) / f"part-{index:05d}.parquet")
+    return len(out)
+
+
+# =========================
+# Orquestación
+# =========================
+
+def score_file(
+    input_path: Path,
+    output_dir: Path,
+    run_id: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: Optional[int] = None,
+    partition_by: Optional[List[str]] = None,
+    history_path: Optional[Path] = None,
+    lags: Optional[List[int]] = None,
+    rolls: Optional[List[int]] = None,
+) -> dict:
+    """
+    Predice `input_path` por bloques en paralelo y escribe las partes en `output_dir`.
+
+    `history_path` es un feature store guardado (ver `feature_store`) con la cola de
+    cada serie previa al archivo; sin él, las primeras filas de cada serie se descartan.
+    Devuelve filas leídas/escritas, partes, segundos y filas por segundo.
+    """
+    if not HAS_PYARROW:
+        raise RuntimeError("El scoring por lotes escribe Parquet y requiere pyarrow")
+    if lags is None:
+        lags = [1, 7, 30]
+    if rolls is None:
+        rolls = [7, 30]
+    workers = workers or os.cpu_count() or 1
+    partition_by = list(partition_by or [])
+
+    cat_group = column_setting("CAT_GROUP")
+    if history_path is not None:
+        history = OnlineFeatureStore.load(history_path)
+        if history.group_cols != cat_group or history.lags != lags or history.rolls != rolls:
+            raise ValueError(
+                f"El feature store {history_path} no coincide con las series/lags/rollings pedidos"
+            )
+    else:
+        history = OnlineFeatureStore(group_cols=cat_group, lags=lags, rolls=rolls)
+
+    num_cols, cat_cols = feature_columns(lags, rolls)
+    model_cols = num_cols + cat_cols
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    rows_in = rows_out = parts = 0
+    pending: Set[Future] = set()
+
+    def collect(done: Set[Future]) -> None:
+        nonlocal rows_out
+        for future in done:
+            rows_out += future.result()
+        elapsed = time.perf_counter() - t0
+        print(f"[batch] {rows_out} filas predichas en {elapsed:.1f}s ({rows_out / elapsed:,.0f} filas/s)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(run_id,)) as pool:
+        for frame in featurized_chunks(input_path, chunk_rows, history, lags, rolls):
+            rows_in += len(frame)
+            # Como mucho dos bloques en cola por worker: memoria acotada
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(_score_part, parts, frame, model_cols, str(output_dir), partition_by))
+            parts += 1
+        if pending:
+            collect(wait(pending)[0])
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "rows_featurized": rows_in,
+        "rows_scored": rows_out,
+        "parts": parts,
+        "seconds": elapsed,
+        "rows_per_second": rows_out / elapsed if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scoring por lotes de un CSV/Parquet sin pasar por la API.")
+    parser.add_argument("input", type=Path, help="Archivo CSV o Parquet con las mediciones")
+    parser.add_argument("output", type=Path, help="Directorio de salida (dataset Parquet)")
+    parser.add_argument("--run-id", default=os.getenv("MLFLOW_RUN_ID"), help="Run de MLflow con el modelo")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, nº de CPUs)")
+    parser.add_argument("--partition-by", nargs="*", default=[], help="Columnas de partición, p. ej. Año Mes")
+    parser.add_argument("--history", type=Path, default=None, help="Feature store con la historia previa")
+    args = parser.parse_args()
+    if not args.run_id:
+        parser.error("Falta --run-id (o la variable MLFLOW_RUN_ID)")
+
+    report = score_file(
+        args.input,
+        args.output,
+        args.run_id,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        partition_by=args.partition_by,
+        history_path=args.history,
+    )
+    print(
+        f"{report['rows_scored']} filas en {report['parts']} partes, "
+        f"{report['seconds']:.1f}s ({report['rows_per_second']:,.0f} filas/s) -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,26 @@
+import os
+import threading
 from pathlib import Path
-from typing import List
+from typing import Any, List, Literal, Optional
 import yaml
 from pydantic import BaseModel
 
-ROOT_DIR = Path.cwd() 
+# Rutas relativas al paquete instalado (no al directorio de trabajo). Se pueden
+# sobreescribir con CALIDAD_AIRE_CONFIG y CALIDAD_AIRE_DATA_DIR.
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+CONFIG_DIR = PACKAGE_ROOT
+CONFIG_FILE_PATH = Path(os.getenv("CALIDAD_AIRE_CONFIG") or CONFIG_DIR / 'config.yml')
 
-CONFIG_DIR = ROOT_DIR / 'src' / 'calidad_aire'
-DATA_DIR = ROOT_DIR / 'data' / 'processed'
-CONFIG_FILE_PATH = CONFIG_DIR / 'config.yml'
+
+def _resolve_root_dir() -> Path:
+    # Layout src/: <repo>/src/calidad_aire. Instalado en site-packages no hay repo,
+    # así que se usa el directorio de trabajo como antes.
+    repo_root = PACKAGE_ROOT.parent.parent
+    return repo_root if (repo_root / 'data').is_dir() else Path.cwd()
+
+
+ROOT_DIR = _resolve_root_dir()
+DATA_DIR = Path(os.getenv("CALIDAD_AIRE_DATA_DIR") or ROOT_DIR / 'data' / 'processed')
 
 class AppConfig(BaseModel):
     data_file: str
@@ -18,8 +31,10 @@ class AppConfig(BaseModel):
     random_state: int
     n_estimators: int
     max_depth: int
+    pipeline_variant: Literal['dense', 'sparse', 'categorical'] = 'dense'
     mlflow_experiment_name: str
     mlflow_tracking_uri: str
+    model_cache_size: int = 2
 
 def find_config_file() -> Path:
     if CONFIG_FILE_PATH.is_file():
@@ -38,4 +53,44 @@ def create_and_validate_config(parsed_config: dict = None) -> AppConfig:
         parsed_config = fetch_config_from_yaml()
     return AppConfig(**parsed_config)
 
-config = create_and_validate_config()
\ No newline at end of file
+
+# =========================
+# Acceso perezoso y memoizado
+# =========================
+#
+# Importar el paquete no lee ni valida el YAML: se hace en el primer acceso y se
+# reutiliza sin volver a tocar el archivo (los accesos a `config.X` están en los
+# loops de data_manager y features). Para tomar cambios del YAML, `reload_config()`.
+
+_config_lock = threading.Lock()
+_cached_config: Optional[AppConfig] = None
+
+
+def get_config(reload: bool = False) -> AppConfig:
+    """Configuración validada, leída en el primer uso (o de nuevo con `reload`)."""
+    global _cached_config
+    cached = _cached_config
+    if not reload and cached is not None:
+        return cached
+    with _config_lock:
+        if reload or _cached_config is None:
+            _cached_config = create_and_validate_config(fetch_config_from_yaml(find_config_file()))
+        return _cached_config
+
+
+def reload_config() -> AppConfig:
+    """Vuelve a leer y validar el YAML; los accesos siguientes a `config` ven los cambios."""
+    return get_config(reload=True)
+
+
+class _LazyConfig:
+    """Proxy de `AppConfig`: `config.target` equivale a `get_config().target`."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_config(), name)
+
+    def __repr__(self) -> str:
+        return f"<lazy {get_config()!r}>"
+
+
+config = _LazyConfig()
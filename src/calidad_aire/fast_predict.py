@@ -0,0 +1,126 @@
+"""
+Ruta rápida de inferencia por lotes.
+
+Compila un pipeline entrenado (`ColumnTransformer` con `OneHotEncoder` + resto
+`passthrough`, seguido del regresor) en un constructor de matriz: cada columna
+categórica se mapea a su índice one-hot con un índice hash precalculado y las
+numéricas se copian directo a un arreglo float32 contiguo que va al modelo. Evita
+el DataFrame intermedio, la validación de esquema del wrapper pyfunc y la
+conversión de la salida densa del `ColumnTransformer`.
+
+Las predicciones coinciden con `pipeline.predict`: XGBoost trabaja internamente
+en float32.
+"""
+from typing import Any, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+
+class CompiledPipeline:
+    """Pipeline entrenado reducido a (matriz float32 -> regresor)."""
+
+    def __init__(
+        self,
+        model: Any,
+        input_columns: List[str],
+        categorical: List[tuple],
+        numeric: List[tuple],
+        n_features: int,
+        sparse_output: bool = False,
+    ):
+        self.model = model
+        self.input_columns = input_columns
+        # (columna, índice de categorías, offset en la matriz)
+        self.categorical = categorical
+        # (columna, posición en la matriz)
+        self.numeric = numeric
+        self.n_features = n_features
+        # XGBoost trata los ceros no almacenados de una matriz dispersa como faltantes,
+        # así que se respeta el formato de salida con el que se entrenó
+        self.sparse_output = sparse_output
+
+    def build_matrix(self, columns: Mapping[str, Sequence]) -> np.ndarray:
+        missing = [c for c in self.input_columns if c not in columns]
+        if missing:
+            raise ValueError(f"Faltan columnas para el modelo: {missing}")
+        lengths = {len(columns[c]) for c in self.input_columns}
+        if len(lengths) > 1:
+            raise ValueError(f"Las columnas tienen longitudes distintas: {sorted(lengths)}")
+        n_rows = lengths.pop() if lengths else 0
+
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        rows = np.arange(n_rows)
+        for col, index, offset in self.categorical:
+            codes = index.get_indexer(pd.Index(columns[col], dtype=object))
+            known = codes >= 0  # categorías no vistas: todo en cero (handle_unknown='ignore')
+            X[rows[known], offset + codes[known]] = 1.0
+        for col, position in self.numeric:
+            X[:, position] = np.asarray(columns[col], dtype=np.float32)
+        return X
+
+    def predict(self, columns: Mapping[str, Sequence]) -> np.ndarray:
+        X = self.build_matrix(columns)
+        if self.sparse_output:
+            X = sparse.csr_matrix(X)
+        return self.model.predict(X)
+
+
+def _unwrap_sklearn(model: Any) -> Any:
+    """Pipeline de sklearn dentro de un modelo pyfunc de MLflow (o el mismo objeto)."""
+    impl = getattr(model, "_model_impl", model)
+    return getattr(impl, "sklearn_model", impl)
+
+
+def compile_pipeline(model: Any) -> Optional[CompiledPipeline]:
+    """
+    Compila el pipeline si tiene la forma soportada; si no, devuelve None y el
+    llamador debe usar la ruta genérica (`model.predict(DataFrame)`).
+    """
+    pipe = _unwrap_sklearn(model)
+    if not isinstance(pipe, Pipeline) or len(pipe.steps) != 2:
+        return None
+    pre, regressor = pipe.steps[0][1], pipe.steps[1][1]
+    if not isinstance(pre, ColumnTransformer) or not hasattr(pre, "feature_names_in_"):
+        return None
+
+    input_columns = [str(c) for c in pre.feature_names_in_]
+    categorical, numeric = [], []
+    offset = 0
+    for name, transformer, cols in pre.transformers_:
+        if transformer == "drop":
+            continue
+        col_names = [input_columns[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+        # sklearn >= 1.4 guarda el passthrough ajustado como FunctionTransformer identidad
+        is_passthrough = transformer == "passthrough" or (
+            isinstance(transformer, FunctionTransformer) and transformer.func is None
+        )
+        if is_passthrough:
+            for col in col_names:
+                numeric.append((col, offset))
+                offset += 1
+        elif (
+            isinstance(transformer, OneHotEncoder)
+            and transformer.drop is None
+            and transformer.min_frequency is None
+            and transformer.max_categories is None
+        ):
+            for col, cats in zip(col_names, transformer.categories_):
+                categorical.append((col, pd.Index(cats, dtype=object), offset))
+                offset += len(cats)
+        else:
+            return None
+
+    used = {c for c, *_ in categorical} | {c for c, _ in numeric}
+    return CompiledPipeline(
+        model=regressor,
+        input_columns=[c for c in input_columns if c in used],
+        categorical=categorical,
+        numeric=numeric,
+        n_features=offset,
+        sparse_output=bool(getattr(pre, "sparse_output_", False)),
+    )
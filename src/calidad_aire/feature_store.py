@@ -0,0 +1,280 @@
+"""
+Feature store en línea con el estado reciente de cada serie.
+
+Guarda, por serie (Municipio, Estacion, Diametro aerodinamico), un buffer circular
+con las últimas mediciones y el vector de lags/medias móviles que le corresponde a
+la *siguiente* fila de la serie, con la misma semántica que
+`data_manager.add_group_time_features`. El vector se recalcula al ingerir
+mediciones, de modo que completar una petición es una búsqueda O(1) por fila.
+
+Límites de la consulta:
+
+- El vector no depende de la fecha pedida: cualquier fecha posterior a la última
+  medición (mañana o dentro de varios días) recibe los mismos lags, los de la
+  siguiente fila de la serie. Los días intermedios sin medición no se simulan.
+- Sin Diametro aerodinamico la serie solo se resuelve si la estación tiene una
+  única serie; en estaciones con varios contaminantes las features quedan en NaN.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from calidad_aire.fileutil import set_published_mode
+from calidad_aire.processing.features import segment_time_features
+
+SeriesKey = Tuple[Optional[str], ...]
+
+DEFAULT_LAGS = [1, 7, 30]
+DEFAULT_ROLLS = [7, 30]
+
+
+def _normalize(value: Hashable) -> Optional[str]:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+class _SeriesState:
+    __slots__ = ("buffer", "head", "count", "last_date", "features")
+
+    def __init__(self, capacity: int, n_features: int):
+        self.buffer = np.full(capacity, np.nan)
+        self.head = 0  # posición donde se escribe la próxima medición
+        self.count = 0
+        self.last_date: Optional[pd.Timestamp] = None
+        self.features = np.full(n_features, np.nan)
+
+    def push(self, value: float) -> None:
+        self.buffer[self.head] = value
+        self.head = (self.head + 1) % len(self.buffer)
+        self.count = min(self.count + 1, len(self.buffer))
+
+    def values(self) -> np.ndarray:
+        """Mediciones del buffer en orden cronológico."""
+        ordered = np.roll(self.buffer, -self.head)
+        return ordered[len(ordered) - self.count:]
+
+
+class OnlineFeatureStore:
+    """Estado por serie para completar `lag_*` y `rollmean_*` en el servicio en línea."""
+
+    def __init__(
+        self,
+        group_cols: Sequence[str] = ("Municipio", "Estacion", "Diametro aerodinamico"),
+        lags: Optional[List[int]] = None,
+        rolls: Optional[List[int]] = None,
+    ):
+        self.group_cols = list(group_cols)
+        self.lags = list(lags or DEFAULT_LAGS)
+        self.rolls = list(rolls or DEFAULT_ROLLS)
+        self.feature_cols = [f"lag_{l}" for l in self.lags] + [f"rollmean_{w}" for w in self.rolls]
+        self.capacity = max(self.lags + self.rolls)
+
+        self._series: Dict[SeriesKey, _SeriesState] = {}
+        # Índice por (Municipio, Estacion) para peticiones sin Diametro aerodinamico
+        self._by_station: Dict[SeriesKey, List[SeriesKey]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def _state(self, key: SeriesKey) -> _SeriesState:
+        state = self._series.get(key)
+        if state is None:
+            state = _SeriesState(self.capacity, len(self.feature_cols))
+            self._series[key] = state
+            self._by_station.setdefault(key[:2], []).append(key)
+        return state
+
+    def _refresh(self, state: _SeriesState) -> None:
+        # Se agrega una fila "siguiente" (NaN) y se toman sus features
+        values = np.append(state.values(), np.nan)
+        feats = segment_time_features(
+            values, np.zeros(len(values), dtype=np.int64), self.lags, self.rolls
+        )
+        state.features = np.array([feats[c][-1] for c in self.feature_cols])
+
+    # -------------------------
+    # Ingesta
+    # -------------------------
+
+    def ingest(self, df: pd.DataFrame, date_col: str = "Fecha", target_col: str = "Medicion") -> int:
+        """
+        Agrega mediciones nuevas (en orden cronológico por serie) y recalcula el
+        vector de features solo de las series tocadas. Ignora filas con fecha
+        igual o anterior a la última registrada para su serie: un reintento o una
+        medición duplicada no se cuenta dos veces en los lags y medias móviles.
+        """
+        if df.empty:
+            return 0
+        if date_col in df.columns:
+            df = df.sort_values(date_col, kind="stable")
+            dates = pd.to_datetime(df[date_col], errors="coerce")
+        else:
+            dates = pd.Series(pd.NaT, index=df.index)
+
+        keys = zip(*(df[c] for c in self.group_cols))
+        values = pd.to_numeric(df[target_col], errors="coerce").to_numpy(dtype=np.float64)
+
+        touched = {}
+        added = 0
+        with self._lock:
+            for raw_key, value, date in zip(keys, values, dates):
+                if np.isnan(value):
+                    continue
+                key = tuple(_normalize(k) for k in raw_key)
+                state = self._state(key)
+                if pd.notna(date) and state.last_date is not None and date <= state.last_date:
+                    continue
+                state.push(value)
+                if pd.notna(date):
+                    state.last_date = date
+                touched[key] = state
+                added += 1
+            for state in touched.values():
+                self._refresh(state)
+        return added
+
+    @classmethod
+    def from_history(
+        cls,
+        df: pd.DataFrame,
+        group_cols: Sequence[str] = ("Municipio", "Estacion", "Diametro aerodinamico"),
+        lags: Optional[List[int]] = None,
+        rolls: Optional[List[int]] = None,
+        date_col: str = "Fecha",
+        target_col: str = "Medicion",
+    ) -> "OnlineFeatureStore":
+        """Construye el store con la cola (últimas mediciones) de cada serie del histórico."""
+        store = cls(group_cols=group_cols, lags=lags, rolls=rolls)
+        history = df.dropna(subset=[target_col]).sort_values(date_col, kind="stable")
+        tail = history.groupby(list(group_cols), dropna=False, observed=True).tail(store.capacity)
+        store.ingest(tail, date_col=date_col, target_col=target_col)
+        return store
+
+    # -------------------------
+    # Consulta
+    # -------------------------
+
+    def _lookup(self, key: SeriesKey) -> Optional[_SeriesState]:
+        state = self._series.get(key)
+        if state is None and len(key) == 3 and key[2] is None:
+            # Sin diámetro aerodinámico: solo si la estación tiene una única serie
+            candidates = self._by_station.get(key[:2], [])
+            if len(candidates) == 1:
+                state = self._series[candidates[0]]
+        return state
+
+    def feature_matrix(self, data: Mapping[str, Sequence], n_rows: int) -> np.ndarray:
+        """
+        Matriz (n_rows x features) para columnas `data` (DataFrame o dict nombre -> valores).
+
+        Cada fila recibe el vector de la *siguiente* fila de su serie, sin importar su
+        fecha; las filas sin serie resoluble (desconocida, o sin diámetro en una
+        estación con varias series) quedan en NaN.
+        """
+        columns = [data[c] if c in data else [None] * n_rows for c in self.group_cols]
+        out = np.full((n_rows, len(self.feature_cols)), np.nan)
+        with self._lock:
+            for i, raw_key in enumerate(zip(*columns)):
+                state = self._lookup(tuple(_normalize(k) for k in raw_key))
+                if state is not None:
+                    out[i] = state.features
+        return out
+
+    def features_for(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Columnas de lags/medias móviles para cada fila de `df` (alineadas con su índice).
+
+        Las series desconocidas quedan en NaN, que el modelo (XGBoost) trata como faltante.
+        """
+        out = self.feature_matrix(df, len(df))
+        return pd.DataFrame(out, columns=self.feature_cols, index=df.index)
+
+    def tails(self) -> pd.DataFrame:
+        """Una fila por serie: columnas de grupo, `last_date` y `values` (cola cronológica)."""
+        with self._lock:
+            rows = [
+                list(key) + [state.last_date, state.values().copy()]
+                for key, state in self._series.items()
+            ]
+        return pd.DataFrame(rows, columns=self.group_cols + ["last_date", "values"])
+
+    # -------------------------
+    # Persistencia
+    # -------------------------
+
+    def save(self, path: Path) -> None:
+        with self._lock:
+            payload = {
+                "group_cols": self.group_cols,
+                "lags": self.lags,
+                "rolls": self.rolls,
+                "series": [
+                    {
+                        "key": list(key),
+                        "values": [float(v) for v in state.values()],
+                        "last_date": state.last_date.isoformat() if state.last_date is not None else None,
+                    }
+                    for key, state in self._series.items()
+                ],
+            }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporal con nombre único: dos procesos que guardan a la vez no se pisan el archivo
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+        ) as tmp:
+            json.dump(payload, tmp)
+        try:
+            set_published_mode(tmp.name)
+            os.replace(tmp.name, path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> "OnlineFeatureStore":
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        store = cls(group_cols=payload["group_cols"], lags=payload["lags"], rolls=payload["rolls"])
+        for item in payload["series"]:
+            state = store._state(tuple(item["key"]))
+            for value in item["values"][-store.capacity:]:
+                state.push(value)
+            if item["last_date"]:
+                state.last_date = pd.Timestamp(item["last_date"])
+            store._refresh(state)
+        return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Construye el feature store en línea a partir del dataset procesado."
+    )
+    parser.add_argument("output", type=Path, help="Ruta del archivo JSON del feature store")
+    args = parser.parse_args()
+
+    from calidad_aire.processing.data_manager import (
+        CAT_GROUP,
+        DATE_COL,
+        TARGET_COL,
+        load_dataset,
+    )
+
+    df = load_dataset(columns=CAT_GROUP)
+    store = OnlineFeatureStore.from_history(
+        df, group_cols=CAT_GROUP, date_col=DATE_COL, target_col=TARGET_COL
+    )
+    store.save(args.output)
+    print(f"Feature store con {len(store)} series guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Escritura atómica de archivos compartidos (cache de datos, almacén de modelos, feature store).
+
+`tempfile.mkstemp` y `NamedTemporaryFile` crean el temporal con permisos 0600 y
+`os.replace` los conserva: el archivo publicado solo lo leería su dueño (p. ej. la
+API en un contenedor con otro UID que el job de entrenamiento).
+"""
+import os
+from pathlib import Path
+from typing import Union
+
+# os.umask solo se puede leer cambiándolo: se lee una vez, al importar
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+FILE_MODE = 0o644 & ~_UMASK
+DIR_MODE = 0o755 & ~_UMASK
+
+
+def set_published_mode(path: Union[str, Path]) -> None:
+    """Permisos de un archivo (o directorio) recién creado, antes del `os.replace`."""
+    os.chmod(path, DIR_MODE if os.path.isdir(path) else FILE_MODE)
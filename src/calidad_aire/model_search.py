@@ -0,0 +1,224 @@
+"""
+Motor de búsqueda de hiperparámetros con validación temporal para comparar modelos.
+
+Frente a un `GridSearchCV` por familia de modelos:
+
+- El preprocesamiento compartido (`preprocess`) se ajusta una sola vez por fold y
+  su salida se reutiliza en todos los candidatos de todas las familias (opcionalmente
+  persistida entre corridas con `joblib.Memory`).
+- Los candidatos de todas las familias se reparten en un único pool de procesos, en
+  vez de esperar a que termine cada búsqueda para empezar la siguiente.
+- Las familias con `halving=True` usan successive halving sobre un recurso (por
+  defecto `model__n_estimators`): todos los candidatos se evalúan con poco recurso y
+  solo la mejor fracción `1/factor` pasa a la siguiente ronda. La última ronda usa el
+  valor máximo del recurso en la grilla.
+- El mejor pipeline de cada familia se reentrena una sola vez con todo el train.
+"""
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed, hash as joblib_hash
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import Pipeline
+
+MODEL_PREFIX = "model__"
+
+
+class SearchSpec:
+    """Familia de modelos a comparar: pipeline (`preprocess` + `model`) y su grilla."""
+
+    def __init__(
+        self,
+        name: str,
+        pipeline: Pipeline,
+        param_grid: Dict[str, List[Any]],
+        halving: bool = False,
+        resource: str = "model__n_estimators",
+    ):
+        for key in param_grid:
+            if not key.startswith(MODEL_PREFIX):
+                raise ValueError(f"[{name}] Solo se buscan parámetros del paso 'model': {key}")
+        self.name = name
+        self.pipeline = pipeline
+        self.param_grid = param_grid
+        self.halving = halving and resource in param_grid
+        self.resource = resource
+
+
+class SearchResult:
+    """Resultados por candidato (métricas CV positivas) y mejor pipeline reentrenado."""
+
+    def __init__(self, name: str, candidates: List[Dict[str, Any]]):
+        self.name = name
+        self.candidates = candidates
+        final = [c for c in candidates if c["final"]]
+        self.best_index = candidates.index(min(final, key=lambda c: c["cv_rmse"]))
+        self.best_params = candidates[self.best_index]["params"]
+        self.best_estimator: Optional[Pipeline] = None
+
+    @property
+    def best(self) -> Dict[str, Any]:
+        return self.candidates[self.best_index]
+
+
+def _metrics(y_true, y_pred) -> Dict[str, float]:
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "r2": float(r2_score(y_true, y_pred)),
+    }
+
+
+def _fit_transform_fold(preprocess, X_train, y_train, X_test):
+    fitted = clone(preprocess).fit(X_train, y_train)
+    return fitted.transform(X_train), fitted.transform(X_test)
+
+
+def _fit_and_score(model, params: Dict[str, Any], fold) -> Dict[str, float]:
+    """Ajusta el modelo (sin preprocesamiento) en un fold ya transformado."""
+    Xt_train, y_train, Xt_test, y_test = fold
+    est = clone(model).set_params(**{k[len(MODEL_PREFIX):]: v for k, v in params.items()})
+    # El paralelismo está en el pool de candidatos: un hilo por modelo
+    if "n_jobs" in est.get_params():
+        est.set_params(n_jobs=1)
+    t0 = time.perf_counter()
+    est.fit(Xt_train, y_train)
+    scores = _metrics(y_test, est.predict(Xt_test))
+    scores["fit_time"] = time.perf_counter() - t0
+    return scores
+
+
+def _refit(pipeline: Pipeline, params: Dict[str, Any], X, y) -> Pipeline:
+    return clone(pipeline).set_params(**params).fit(X, y)
+
+
+def _halving_schedule(n_candidates: int, max_resource: int, factor: int, min_resource: int):
+    """Recurso por ronda (creciente) hasta `max_resource`; las rondas bastan para
+    reducir los candidatos a lo sumo a `factor` en la última."""
+    n_rounds = 1 + max(0, math.ceil(math.log(max(n_candidates, 1), factor)) - 1)
+    schedule = [max(min_resource, int(max_resource / factor ** (n_rounds - 1 - r))) for r in range(n_rounds)]
+    return sorted(set(schedule))
+
+
+class SearchEngine:
+    """Ejecuta las búsquedas de varias familias sobre un mismo pool de procesos."""
+
+    def __init__(
+        self,
+        cv,
+        n_jobs: int = -1,
+        factor: int = 3,
+        min_resource: int = 50,
+        cache_dir: Optional[str] = None,
+        verbose: int = 0,
+    ):
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.factor = factor
+        self.min_resource = min_resource
+        self.memory = Memory(cache_dir, verbose=0)
+        self.verbose = verbose
+
+    def _folds(self, specs: List[SearchSpec], X: pd.DataFrame, y: pd.Series):
+        """Salida del preprocesamiento por fold, una vez por preprocesamiento distinto."""
+        fit_transform = self.memory.cache(_fit_transform_fold)
+        splits = list(self.cv.split(X, y))
+        folds_by_key, folds = {}, {}
+        for spec in specs:
+            preprocess = spec.pipeline.steps[0][1]
+            key = joblib_hash(preprocess.get_params(deep=True))
+            if key not in folds_by_key:
+                folds_by_key[key] = []
+                for train_idx, test_idx in splits:
+                    X_tr, X_te = X.iloc[train_idx], X.iloc[test_idx]
+                    y_tr, y_te = y.iloc[train_idx], y.iloc[test_idx]
+                    Xt_tr, Xt_te = fit_transform(preprocess, X_tr, y_tr, X_te)
+                    folds_by_key[key].append((Xt_tr, y_tr.to_numpy(), Xt_te, y_te.to_numpy()))
+            folds[spec.name] = folds_by_key[key]
+        return folds
+
+    def run(self, specs: List[SearchSpec], X: pd.DataFrame, y: pd.Series, refit: bool = True) -> Dict[str, SearchResult]:
+        folds = self._folds(specs, X, y)
+
+        # Estado por familia: candidatos vivos y recurso de cada ronda
+        pending: Dict[str, Dict[str, Any]] = {}
+        for spec in specs:
+            if spec.halving:
+                grid = {k: v for k, v in spec.param_grid.items() if k != spec.resource}
+                params = list(ParameterGrid(grid))
+                schedule = _halving_schedule(
+                    len(params), max(spec.param_grid[spec.resource]), self.factor, self.min_resource
+                )
+            else:
+                params, schedule = list(ParameterGrid(spec.param_grid)), [None]
+            pending[spec.name] = {"spec": spec, "alive": params, "schedule": schedule, "round": 0, "results": []}
+
+        with Parallel(n_jobs=self.n_jobs, verbose=self.verbose) as parallel:
+            # Cada iteración despacha juntas las rondas pendientes de todas las familias
+            while any(state["alive"] for state in pending.values()):
+                jobs, owners = [], []
+                for name, state in pending.items():
+                    if not state["alive"]:
+                        continue
+                    spec = state["spec"]
+                    resource = state["schedule"][state["round"]]
+                    for params in state["alive"]:
+                        cand = dict(params)
+                        if resource is not None:
+                            cand[spec.resource] = resource
+                        for fold in folds[name]:
+                            jobs.append(delayed(_fit_and_score)(spec.pipeline.steps[-1][1], cand, fold))
+                        owners.append((name, cand))
+
+                scores = parallel(jobs)
+                by_family: Dict[str, List[Dict[str, Any]]] = {}
+                n_folds = {name: len(folds[name]) for name in pending}
+                pos = 0
+                for name, cand in owners:
+                    fold_scores = scores[pos:pos + n_folds[name]]
+                    pos += n_folds[name]
+                    state = pending[name]
+                    is_final = state["round"] == len(state["schedule"]) - 1
+                    result = {
+                        "params": cand,
+                        "round": state["round"],
+                        "final": is_final,
+                        "cv_rmse": float(np.mean([s["rmse"] for s in fold_scores])),
+                        "cv_mae": float(np.mean([s["mae"] for s in fold_scores])),
+                        "cv_r2": float(np.mean([s["r2"] for s in fold_scores])),
+                        "mean_fit_time": float(np.mean([s["fit_time"] for s in fold_scores])),
+                    }
+                    state["results"].append(result)
+                    by_family.setdefault(name, []).append(result)
+
+                for name, round_results in by_family.items():
+                    state = pending[name]
+                    if round_results[0]["final"]:
+                        state["alive"] = []
+                        continue
+                    spec = state["spec"]
+                    keep = max(1, math.ceil(len(round_results) / self.factor))
+                    ranked = sorted(round_results, key=lambda r: r["cv_rmse"])[:keep]
+                    state["alive"] = [
+                        {k: v for k, v in r["params"].items() if k != spec.resource} for r in ranked
+                    ]
+                    state["round"] += 1
+
+            results = {name: SearchResult(name, state["results"]) for name, state in pending.items()}
+
+            if refit:
+                # Un único reentrenamiento del mejor pipeline por familia, también en paralelo
+                names = list(results)
+                fitted = parallel(
+                    delayed(_refit)(pending[name]["spec"].pipeline, results[name].best_params, X, y)
+                    for name in names
+                )
+                for name, est in zip(names, fitted):
+                    results[name].best_estimator = est
+
+        return results
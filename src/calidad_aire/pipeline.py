@@ -1,19 +1,16 @@
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from xgboost import XGBRegressor
 from calidad_aire.config.core import config
 
-air_quality_pipe = Pipeline([
-    ('preprocessor', ColumnTransformer(
-        transformers=[
-            ('onehot', 
-             OneHotEncoder(handle_unknown='ignore', sparse_output=False), 
-             config.categorical_features)
-        ],
-        remainder='passthrough'
-    )),
-    ('model', XGBRegressor(
+PIPELINE_VARIANTS = ("dense", "sparse", "categorical")
+
+
+def _xgb_regressor(**extra) -> XGBRegressor:
+    return XGBRegressor(
         reg_alpha=0.1,
         reg_lambda=5.0,
         learning_rate=0.01,
@@ -26,5 +23,77 @@ air_quality_pipe = Pipeline([
         tree_method="hist",
         n_jobs=-1,
         verbosity=0,
-    ))
-])
\ No newline at end of file
+        **extra,
+    )
+
+
+class CategoricalCaster(BaseEstimator, TransformerMixin):
+    """Convierte las columnas categóricas a `category` de pandas con las categorías vistas en fit.
+
+    Permite entregar las categóricas directamente a XGBoost (`enable_categorical=True`)
+    sin expandirlas a one-hot. Las categorías no vistas quedan como faltantes.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = columns
+
+    def fit(self, X: pd.DataFrame, y=None):
+        self.categories_ = {
+            col: sorted(pd.Series(X[col]).dropna().unique().tolist()) for col in self.columns
+        }
+        self.feature_names_in_ = list(X.columns)
+        return self
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        X = X.copy()
+        for col in self.columns:
+            X[col] = pd.Categorical(X[col], categories=self.categories_[col])
+        return X
+
+
+def build_pipeline(variant: str = "dense") -> Pipeline:
+    """Pipeline de entrenamiento según la variante de codificación de categóricas.
+
+    - dense: one-hot denso (comportamiento original).
+    - sparse: one-hot en CSR de punta a punta hasta XGBoost.
+    - categorical: categóricas nativas de XGBoost (`enable_categorical`), sin one-hot.
+    """
+    if variant == "dense":
+        return Pipeline([
+            ('preprocessor', ColumnTransformer(
+                transformers=[
+                    ('onehot',
+                     OneHotEncoder(handle_unknown='ignore', sparse_output=False),
+                     config.categorical_features)
+                ],
+                remainder='passthrough'
+            )),
+            ('model', _xgb_regressor())
+        ])
+    if variant == "sparse":
+        return Pipeline([
+            ('preprocessor', ColumnTransformer(
+                transformers=[
+                    ('onehot',
+                     OneHotEncoder(handle_unknown='ignore', sparse_output=True),
+                     config.categorical_features)
+                ],
+                remainder='passthrough',
+                sparse_threshold=1.0,
+            )),
+            ('model', _xgb_regressor())
+        ])
+    if variant == "categorical":
+        return Pipeline([
+            ('preprocessor', CategoricalCaster(columns=config.categorical_features)),
+            ('model', _xgb_regressor(enable_categorical=True))
+        ])
+    raise ValueError(f"Variante de pipeline desconocida: {variant}. Opciones: {PIPELINE_VARIANTS}")
+
+
+def __getattr__(name: str):
+    # `air_quality_pipe` se construye en el primer acceso (la config no se lee al
+    # importar) y queda en el módulo: los accesos siguientes son el mismo objeto
+    if name == "air_quality_pipe":
+        return globals().setdefault("air_quality_pipe", build_pipeline(config.pipeline_variant))
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
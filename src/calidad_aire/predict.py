@@ -1,20 +1,129 @@
+import threading
+from typing import Any, Dict, Mapping, Optional, Sequence
+
 import pandas as pd
-import mlflow
-from dotenv import load_dotenv
+from cachetools import LRUCache
 
+from calidad_aire.artifact_store import ArtifactStore
 from calidad_aire.config.core import config
+from calidad_aire.fast_predict import CompiledPipeline, _unwrap_sklearn, compile_pipeline
+
+# Cache de modelos en memoria: evita descargar y deserializar el pipeline en cada
+# predicción. Se indexa por URI del modelo y expulsa el menos usado recientemente.
+# Se crea en el primer uso para no leer la config al importar el módulo.
+_model_cache: Optional[LRUCache] = None
+_cache_lock = threading.Lock()
+_load_locks: Dict[str, threading.Lock] = {}
+_artifact_store = ArtifactStore()
+# Pipelines compilados para la ruta rápida (None si el pipeline no es compatible)
+_compiled_cache: Optional[LRUCache] = None
+# Aciertos/fallos del cache de modelos, una vez por búsqueda (compilado o pyfunc)
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _caches() -> tuple:
+    """(cache de modelos, cache de compilados); llamar con `_cache_lock` tomado."""
+    global _model_cache, _compiled_cache
+    if _model_cache is None:
+        _model_cache = LRUCache(maxsize=config.model_cache_size)
+        _compiled_cache = LRUCache(maxsize=config.model_cache_size)
+    return _model_cache, _compiled_cache
+
+
+def get_model_uri(run_id: str) -> str:
+    """URI del artefacto `model` registrado en la corrida de MLflow."""
+    return f"runs:/{run_id}/model"
+
+
+def _load_lock(model_uri: str) -> threading.Lock:
+    with _cache_lock:
+        return _load_locks.setdefault(model_uri, threading.Lock())
+
+
+def load_model(run_id: str) -> Any:
+    """
+    Devuelve el modelo pyfunc de la corrida, cargándolo solo la primera vez.
+
+    El artefacto se lee del almacén local (ver `artifact_store`); MLflow solo se
+    contacta si la corrida aún no se ha materializado en disco.
+
+    Las cargas concurrentes del mismo modelo se serializan para descargarlo una sola vez;
+    las lecturas de modelos ya cacheados no esperan por cargas de otros modelos.
+    """
+    model_uri = get_model_uri(run_id)
+    with _cache_lock:
+        model = _caches()[0].get(model_uri)
+        _cache_stats["hits" if model is not None else "misses"] += 1
+    if model is not None:
+        return model
+
+    with _load_lock(model_uri):
+        with _cache_lock:
+            model = _caches()[0].get(model_uri)
+        if model is None:
+            # mlflow se importa al cargar el primer modelo, no al importar el módulo
+            import mlflow.pyfunc
+
+            local_path = _artifact_store.materialize(run_id)
+            model = mlflow.pyfunc.load_model(str(local_path))
+            with _cache_lock:
+                _caches()[0][model_uri] = model
+    return model
+
+
+def load_compiled_model(run_id: str) -> Optional[CompiledPipeline]:
+    """Versión compilada del modelo de la corrida para la ruta rápida por lotes."""
+    model_uri = get_model_uri(run_id)
+    with _cache_lock:
+        compiled_cache = _caches()[1]
+        if model_uri in compiled_cache:
+            _cache_stats["hits"] += 1
+            return compiled_cache[model_uri]
+    compiled = compile_pipeline(load_model(run_id))
+    with _cache_lock:
+        _caches()[1][model_uri] = compiled
+    return compiled
+
+
+def warm_up(run_id: str) -> None:
+    """Carga anticipadamente el modelo de la corrida y su versión compilada (p. ej. al iniciar la API)."""
+    load_compiled_model(run_id)
+
+
+def limit_model_threads(run_id: str, n_jobs: int) -> None:
+    """
+    Fija `n_jobs` en los estimadores del modelo de la corrida (p. ej. el regresor XGBoost).
+
+    La versión compilada comparte el mismo regresor, así que el límite aplica a ambas rutas.
+    """
+    estimator = _unwrap_sklearn(load_model(run_id))
+    if not hasattr(estimator, "get_params"):
+        return
+    params = {name: n_jobs for name in estimator.get_params() if name.split("__")[-1] == "n_jobs"}
+    if params:
+        estimator.set_params(**params)
+
+
+def model_cache_stats() -> Dict[str, int]:
+    """Aciertos y fallos acumulados del cache de modelos en memoria."""
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_caches()[0]))
+
+
+def clear_model_cache() -> None:
+    """Vacía el cache de modelos en memoria."""
+    with _cache_lock:
+        for cache in _caches():
+            cache.clear()
+        _load_locks.clear()
+
 
 def make_prediction(*, input_data: pd.DataFrame, run_id: str) -> dict:
     """
     Realiza una predicción usando un modelo entrenado desde MLflow.
     """
-    load_dotenv()
-
-    mlflow.set_tracking_uri(config.mlflow_tracking_uri)
-    
     try:
-        logged_model_uri = f"runs:/{run_id}/model"
-        loaded_model = mlflow.pyfunc.load_model(logged_model_uri)
+        loaded_model = load_model(run_id)
 
         predictions = loaded_model.predict(input_data)
 
@@ -31,4 +140,33 @@ def make_prediction(*, input_data: pd.DataFrame, run_id: str) -> dict:
             "errors": str(e)
         }
 
-    return results
\ No newline at end of file
+    return results
+
+
+def make_fast_prediction(*, columns: Mapping[str, Sequence], run_id: str) -> dict:
+    """
+    Predicción por lotes a partir de columnas (nombre -> valores), sin DataFrame.
+
+    Usa el pipeline compilado cuando es compatible y, si no, la ruta de `make_prediction`.
+    """
+    try:
+        compiled = load_compiled_model(run_id)
+    except Exception as e:
+        return {"predictions": None, "run_id": run_id, "errors": str(e)}
+    if compiled is None:
+        return make_prediction(input_data=pd.DataFrame(columns), run_id=run_id)
+
+    try:
+        results = {
+            "predictions": compiled.predict(columns).tolist(),
+            "run_id": run_id,
+            "errors": None
+        }
+    except Exception as e:
+        results = {
+            "predictions": None,
+            "run_id": run_id,
+            "errors": str(e)
+        }
+
+    return results
@@ -7,63 +7,97 @@ import numpy as np
 import pandas as pd
 
 from calidad_aire.config.core import DATA_DIR, config
+from calidad_aire.processing.dataset_cache import read_dataset
+from calidad_aire.processing.features import compute_group_time_features
 
 
 # =========================
 # Defaults (lee de config si existen)
 # =========================
-DATE_COL: str = getattr(config, "date_col", "Fecha")
-TARGET_COL: str = getattr(config, "target", "Medicion")
-CAT_GROUP: List[str] = getattr(
-    config, "cat_group", ["Municipio", "Estacion", "Diametro aerodinamico"]
-)
-CAT_COLS: List[str] = getattr(
-    config,
-    "categorical_features",
-    ["Municipio", "Estacion", "Diametro aerodinamico", "DiaSemana"],
-)
-NUM_COLS: List[str] = getattr(config, "numeric_features", ["Dia", "Mes", "Año"])
+# Se resuelven al usarse (no al importar el módulo). `from data_manager import TARGET_COL`
+# sigue funcionando gracias al `__getattr__` del módulo.
+_COLUMN_SETTINGS = {
+    "DATE_COL": ("date_col", "Fecha"),
+    "TARGET_COL": ("target", "Medicion"),
+    "CAT_GROUP": ("cat_group", ["Municipio", "Estacion", "Diametro aerodinamico"]),
+    "CAT_COLS": (
+        "categorical_features",
+        ["Municipio", "Estacion", "Diametro aerodinamico", "DiaSemana"],
+    ),
+    "NUM_COLS": ("numeric_features", ["Dia", "Mes", "Año"]),
+}
+
+
+def column_setting(name: str):
+    """Valor de DATE_COL, TARGET_COL, CAT_GROUP, CAT_COLS o NUM_COLS según la config."""
+    key, default = _COLUMN_SETTINGS[name]
+    return getattr(config, key, default)
+
+
+def __getattr__(name: str):
+    if name in _COLUMN_SETTINGS:
+        return column_setting(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # =========================
 # 1) Carga y limpieza base
 # =========================
 
-def load_dataset() -> pd.DataFrame:
+def load_dataset(
+    columns: Optional[List[str]] = None, min_date: Optional[pd.Timestamp] = None
+) -> pd.DataFrame:
     """Carga el dataset desde DATA_DIR/config y realiza limpieza base mínima.
 
     - Verifica existencia del archivo
-    - Parseo robusto de fecha y orden cronológico
+    - Lee la copia Parquet cacheada (ver `dataset_cache`), con proyección de `columns`
+      y, si se da `min_date`, solo las filas desde esa fecha
+    - Parseo robusto de fecha y orden cronológico (estable: a igual fecha se
+      conserva el orden del archivo)
     - Target a numérico y drop de NaN
     """
+    date_col, target_col = column_setting("DATE_COL"), column_setting("TARGET_COL")
     file_path: Path = DATA_DIR / config.data_file
     if not file_path.exists():
         raise FileNotFoundError(
             f"No existe el CSV en {file_path}. Ajusta DATA_DIR o config.data_file."
         )
 
-    df = pd.read_csv(file_path)
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + [date_col, target_col]))
+    try:
+        df = read_dataset(file_path, date_col=date_col, columns=columns, min_date=min_date)
+    except (KeyError, ValueError) as e:
+        raise ValueError(f"No se pudieron leer las columnas {columns} de {file_path}: {e}")
+
+    return clean_dataset(df)
+
+
+def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """Limpieza base de `load_dataset` sobre un frame ya leído (p. ej. un bloque de un archivo)."""
+    date_col, target_col = column_setting("DATE_COL"), column_setting("TARGET_COL")
 
     # Fecha
-    if DATE_COL not in df.columns:
+    if date_col not in df.columns:
         raise ValueError(
-            f"Columna de fecha '{DATE_COL}' no encontrada. Columnas: {list(df.columns)}"
+            f"Columna de fecha '{date_col}' no encontrada. Columnas: {list(df.columns)}"
         )
-    df[DATE_COL] = pd.to_datetime(df[DATE_COL], errors="coerce")
-    if df[DATE_COL].isna().all():
-        raise ValueError(f"No se pudo parsear '{DATE_COL}' a datetime.")
-    df = df.sort_values(DATE_COL).reset_index(drop=True)
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+    if df[date_col].isna().all():
+        raise ValueError(f"No se pudo parsear '{date_col}' a datetime.")
+    df = df.sort_values(date_col, kind="stable").reset_index(drop=True)
 
     # Target numérico + drop NaN
-    if TARGET_COL not in df.columns:
+    if target_col not in df.columns:
         raise ValueError(
-            f"Target '{TARGET_COL}' no encontrado. Columnas: {list(df.columns)}"
+            f"Target '{target_col}' no encontrado. Columnas: {list(df.columns)}"
         )
-    df[TARGET_COL] = pd.to_numeric(df[TARGET_COL], errors="coerce")
-    missing_y0 = int(df[TARGET_COL].isna().sum())
+    df[target_col] = pd.to_numeric(df[target_col], errors="coerce")
+    missing_y0 = int(df[target_col].isna().sum())
     if missing_y0:
-        print(f"[WARN] Filas con {TARGET_COL} NaN antes de featurización: {missing_y0}")
-    df = df.dropna(subset=[TARGET_COL]).reset_index(drop=True)
+        print(f"[WARN] Filas con {target_col} NaN antes de featurización: {missing_y0}")
+    df = df.dropna(subset=[target_col]).reset_index(drop=True)
 
     return df
 
@@ -77,32 +111,28 @@ def add_group_time_features(
 ) -> pd.DataFrame:
     """Crea lags y medias móviles del TARGET_COL agrupando por CAT_GROUP.
 
-    Se usa shift(1) en rollings para no mirar el presente.
+    Se usa shift(1) en rollings para no mirar el presente. El cálculo se delega en
+    `features.compute_group_time_features` (sin `groupby().apply` por grupo).
     """
+    date_col, target_col = column_setting("DATE_COL"), column_setting("TARGET_COL")
+    cat_group = column_setting("CAT_GROUP")
     if lags is None:
         lags = [1, 7, 30]
     if rolls is None:
         rolls = [7, 30]
 
     # Validación de columnas
-    for col in CAT_GROUP + [TARGET_COL, DATE_COL]:
+    for col in cat_group + [target_col, date_col]:
         if col not in df.columns:
             raise ValueError(f"Falta columna requerida '{col}' para ingeniería temporal.")
 
-    # Lags del target por grupo
-    for lag in lags:
-        df[f"lag_{lag}"] = df.groupby(CAT_GROUP, dropna=False)[TARGET_COL].shift(lag)
-
-    # Rolling mean con shift(1)
-    for w in rolls:
-        df[f"rollmean_{w}"] = (
-            df.groupby(CAT_GROUP, dropna=False)[TARGET_COL]
-            .apply(lambda s: s.shift(1).rolling(w, min_periods=max(3, w // 3)).mean())
-            .reset_index(level=CAT_GROUP, drop=True)
-        )
+    # Lags y rolling mean con shift(1), en una sola pasada vectorizada por serie
+    features = compute_group_time_features(df, cat_group, target_col, lags=lags, rolls=rolls)
+    for col in features.columns:
+        df[col] = features[col]
 
     # Reporte y limpieza de NaN introducidos por lags/rollings
-    cols_req = [TARGET_COL] + [f"lag_{l}" for l in lags] + [f"rollmean_{w}" for w in rolls]
+    cols_req = [target_col] + [f"lag_{l}" for l in lags] + [f"rollmean_{w}" for w in rolls]
     missing_after = df[cols_req].isna().sum().to_dict()
     if any(v > 0 for v in missing_after.values()):
         print("[WARN] NaN tras lags/rollings por columnas:", missing_after)
@@ -125,14 +155,15 @@ def temporal_train_holdout_split(
     - Si el rango temporal >= ~2 años: usa últimos `holdout_days_if_long` días como holdout.
     - Si no, usa el último `holdout_frac_if_short` del dataset.
     """
-    range_days = (df[DATE_COL].max() - df[DATE_COL].min()).days
+    date_col = column_setting("DATE_COL")
+    range_days = (df[date_col].max() - df[date_col].min()).days
     if range_days >= 365 * 2:
-        cutoff = df[DATE_COL].max() - pd.Timedelta(days=holdout_days_if_long)
+        cutoff = df[date_col].max() - pd.Timedelta(days=holdout_days_if_long)
     else:
-        cutoff = df[DATE_COL].quantile(1.0 - holdout_frac_if_short)
+        cutoff = df[date_col].quantile(1.0 - holdout_frac_if_short)
 
-    train_df = df[df[DATE_COL] < cutoff].copy()
-    holdout_df = df[df[DATE_COL] >= cutoff].copy()
+    train_df = df[df[date_col] < cutoff].copy()
+    holdout_df = df[df[date_col] >= cutoff].copy()
     if train_df.empty or holdout_df.empty:
         raise ValueError(
             f"Split vacío. Ajusta cutoff. (cutoff={cutoff}, train={len(train_df)}, holdout={len(holdout_df)})"
@@ -144,6 +175,18 @@ def temporal_train_holdout_split(
 # 4) Construcción de matrices X/y
 # =========================
 
+def feature_columns(
+    lags: Optional[List[int]] = None, rolls: Optional[List[int]] = None
+) -> Tuple[List[str], List[str]]:
+    """Columnas numéricas (incluye lags/rollings) y categóricas que entran al modelo."""
+    if lags is None:
+        lags = [1, 7, 30]
+    if rolls is None:
+        rolls = [7, 30]
+    num_cols, cat_cols = column_setting("NUM_COLS"), column_setting("CAT_COLS")
+    return num_cols + [f"lag_{l}" for l in lags] + [f"rollmean_{w}" for w in rolls], cat_cols
+
+
 def build_feature_matrices(
     train_df: pd.DataFrame,
     holdout_df: pd.DataFrame,
@@ -154,24 +197,24 @@ def build_feature_matrices(
         lags = [1, 7, 30]
     if rolls is None:
         rolls = [7, 30]
+    date_col, target_col = column_setting("DATE_COL"), column_setting("TARGET_COL")
 
-    feature_cols_num = NUM_COLS + [f"lag_{l}" for l in lags] + [f"rollmean_{w}" for w in rolls]
-    feature_cols_cat = CAT_COLS
+    feature_cols_num, feature_cols_cat = feature_columns(lags, rolls)
 
     missing_cols = [
         c
-        for c in feature_cols_cat + feature_cols_num + [TARGET_COL, DATE_COL]
+        for c in feature_cols_cat + feature_cols_num + [target_col, date_col]
         if c not in train_df.columns
     ]
     if missing_cols:
         raise ValueError(f"Faltan columnas tras featurización: {missing_cols}")
 
-    all_feature_cols = feature_cols_num + feature_cols_cat + [DATE_COL]
+    all_feature_cols = feature_cols_num + feature_cols_cat + [date_col]
 
     X_train = train_df[all_feature_cols].copy()
-    y_train = train_df[TARGET_COL].copy()
+    y_train = train_df[target_col].copy()
     X_holdout = holdout_df[all_feature_cols].copy()
-    y_holdout = holdout_df[TARGET_COL].copy()
+    y_holdout = holdout_df[target_col].copy()
 
     if y_train.isna().any() or y_holdout.isna().any():
         raise ValueError(
@@ -185,14 +228,28 @@ def build_feature_matrices(
 # 5) Orquestador end-to-end
 # =========================
 
-def prepare_datasets(lags: Optional[List[int]] = None, rolls: Optional[List[int]] = None) -> Dict[str, object]:
+def prepare_datasets(
+    lags: Optional[List[int]] = None,
+    rolls: Optional[List[int]] = None,
+    incremental: bool = False,
+) -> Dict[str, object]:
     """Pipeline completo de preparación de datos para entrenamiento/evaluación.
 
+    Con `incremental=True` reutiliza el frame featurizado de la corrida anterior y
+    solo calcula features para las filas nuevas (ver `incremental.featurize_incremental`);
+    el split temporal se recorta de nuevo sobre el frame actualizado.
+
     Devuelve un diccionario con: df, train_df, holdout_df, cutoff, X_train, y_train,
     X_holdout, y_holdout, feature_cols_num, feature_cols_cat, DATE_COL, TARGET_COL.
     """
-    df = load_dataset()
-    df = add_group_time_features(df, lags=lags, rolls=rolls)
+    date_col, target_col = column_setting("DATE_COL"), column_setting("TARGET_COL")
+    if incremental:
+        from calidad_aire.processing.incremental import featurize_incremental
+
+        df = featurize_incremental(lags=lags, rolls=rolls)
+    else:
+        df = load_dataset()
+        df = add_group_time_features(df, lags=lags, rolls=rolls)
     train_df, holdout_df, cutoff = temporal_train_holdout_split(df)
     (
         X_train,
@@ -214,6 +271,6 @@ def prepare_datasets(lags: Optional[List[int]] = None, rolls: Optional[List[int]
         "y_holdout": y_holdout,
         "feature_cols_num": feature_cols_num,
         "feature_cols_cat": feature_cols_cat,
-        "date_col": DATE_COL,
-        "target_col": TARGET_COL,
+        "date_col": date_col,
+        "target_col": target_col,
     }
\ No newline at end of file
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import yaml
+
+from calidad_aire.fileutil import set_published_mode
+
+# Parquet/Arrow es opcional: sin pyarrow se vuelve a parsear el CSV
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+
+
+# =========================
+# Cache columnar del dataset procesado
+# =========================
+#
+# La primera lectura parsea el CSV, tipa las columnas y guarda una copia Parquet en
+# <DATA_DIR>/.cache/<nombre>-<md5>.parquet. El md5 es el del puntero DVC del CSV,
+# así que un `dvc pull` con datos nuevos invalida el cache automáticamente.
+
+CACHE_DIRNAME = ".cache"
+# Row groups chicos: las lecturas filtradas por fecha (p. ej. las filas nuevas en
+# `incremental`) saltan los grupos cuyas estadísticas quedan fuera del rango
+ROW_GROUP_SIZE = 64_000
+CATEGORICAL_COLS: List[str] = ["Municipio", "Estacion", "Diametro aerodinamico", "DiaSemana"]
+FLOAT32_COLS: List[str] = ["Medicion"]
+
+
+def _file_md5(path: Path) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_md5(csv_path: Path) -> str:
+    """md5 del CSV según su puntero DVC (`<csv>.dvc`); si no existe o no cuadra el tamaño, lo calcula."""
+    dvc_path = csv_path.with_name(csv_path.name + ".dvc")
+    if dvc_path.is_file():
+        with open(dvc_path, "r", encoding="utf-8") as f:
+            outs = (yaml.safe_load(f) or {}).get("outs") or []
+        for out in outs:
+            if out.get("path") == csv_path.name and out.get("md5"):
+                if out.get("size") in (None, csv_path.stat().st_size):
+                    return str(out["md5"])
+    return _file_md5(csv_path)
+
+
+def cache_path(csv_path: Path, md5: str) -> Path:
+    return csv_path.parent / CACHE_DIRNAME / f"{csv_path.stem}-{md5}.parquet"
+
+
+def parse_csv(csv_path: Path, date_col: str) -> pd.DataFrame:
+    """Parsea el CSV con tipos compactos: fecha datetime64, categóricas y float32."""
+    df = pd.read_csv(csv_path)
+    if date_col in df.columns:
+        df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in FLOAT32_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    return df
+
+
+def _write_cache(df: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_SIZE)
+        set_published_mode(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    # Elimina copias de versiones anteriores del mismo CSV
+    prefix = path.name.rsplit("-", 1)[0] + "-"
+    for old in path.parent.glob(f"{prefix}*.parquet"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def read_dataset(
+    csv_path: Path,
+    date_col: str = "Fecha",
+    columns: Optional[List[str]] = None,
+    min_date: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """
+    Lee el dataset desde el cache Parquet (creándolo si hace falta), proyectando `columns`.
+
+    Con `min_date` solo devuelve filas con `date_col >= min_date`; en Parquet el filtro
+    se empuja al lector y los row groups fuera de rango no se decodifican.
+    """
+    if not HAS_PYARROW:
+        df = parse_csv(csv_path, date_col)
+        if min_date is not None:
+            df = df[df[date_col] >= min_date]
+        return df[columns] if columns is not None else df
+
+    path = cache_path(csv_path, source_md5(csv_path))
+    if not path.is_file():
+        _write_cache(parse_csv(csv_path, date_col), path)
+    filters = [(date_col, ">=", pd.Timestamp(min_date))] if min_date is not None else None
+    return pd.read_parquet(path, columns=columns, filters=filters)
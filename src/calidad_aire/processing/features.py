@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+
+# =========================
+# Motor vectorizado de lags/rollings por serie
+# =========================
+#
+# Las filas se reordenan una sola vez por serie (orden estable, de modo que dentro
+# de cada serie se conserva el orden del DataFrame) y cada serie queda como un
+# segmento contiguo. Los lags son desplazamientos del arreglo completo enmascarados
+# en los bordes de segmento, y todas las medias móviles se calculan en una sola
+# pasada del kernel de rolling de pandas con ventanas recortadas al inicio del
+# segmento. Así el resultado es idéntico bit a bit a
+# `groupby(...).shift(lag)` y `groupby(...).apply(lambda s: s.shift(1).rolling(w).mean())`.
+
+
+def rolling_min_periods(window: int) -> int:
+    """`min_periods` usado para la media móvil de ventana `window`."""
+    return max(3, window // 3)
+
+
+class _ShiftedSegmentWindowIndexer(BaseIndexer):
+    """Ventana [i - w, i) recortada al inicio del segmento de la fila i.
+
+    Equivale a `shift(1).rolling(w)` dentro de cada segmento: la fila actual nunca
+    entra en su propia ventana.
+    """
+
+    def get_window_bounds(
+        self,
+        num_values: int = 0,
+        min_periods: int | None = None,
+        center: bool | None = None,
+        closed: str | None = None,
+        step: int | None = None,
+    ):
+        end = np.arange(num_values, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.segment_start)
+        return start, end
+
+
+def group_segments(df: pd.DataFrame, group_cols: Sequence[str]):
+    """Orden estable por serie y posición de inicio del segmento de cada fila ordenada."""
+    codes = (
+        df.groupby(list(group_cols), dropna=False, sort=False, observed=True)
+        .ngroup()
+        .to_numpy()
+    )
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+
+    n = len(sorted_codes)
+    is_start = np.ones(n, dtype=bool)
+    if n:
+        is_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    segment_start = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+    return order, segment_start.astype(np.int64)
+
+
+def segment_time_features(
+    values: np.ndarray,
+    segment_start: np.ndarray,
+    lags: List[int],
+    rolls: List[int],
+) -> dict:
+    """Lags y medias móviles (con shift(1)) sobre segmentos contiguos ya ordenados."""
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    position = np.arange(n) - segment_start
+
+    out = {}
+    for lag in lags:
+        col = np.full(n, np.nan)
+        if lag < n:
+            col[lag:] = values[: n - lag]
+        col[position < lag] = np.nan
+        out[f"lag_{lag}"] = col
+
+    series = pd.Series(values)
+    for w in rolls:
+        indexer = _ShiftedSegmentWindowIndexer(window_size=w, segment_start=segment_start)
+        out[f"rollmean_{w}"] = (
+            series.rolling(indexer, min_periods=rolling_min_periods(w)).mean().to_numpy()
+        )
+    return out
+
+
+def compute_group_time_features(
+    df: pd.DataFrame,
+    group_cols: Sequence[str],
+    target_col: str,
+    lags: List[int],
+    rolls: List[int],
+) -> pd.DataFrame:
+    """Columnas `lag_*` y `rollmean_*` del target por serie, alineadas con `df`."""
+    order, segment_start = group_segments(df, group_cols)
+    values = df[target_col].to_numpy(dtype=np.float64)[order]
+    sorted_features = segment_time_features(values, segment_start, lags, rolls)
+
+    features = {}
+    for name, col in sorted_features.items():
+        aligned = np.empty_like(col)
+        aligned[order] = col
+        features[name] = aligned
+    return pd.DataFrame(features, index=df.index)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from calidad_aire.config.core import DATA_DIR, config
+from calidad_aire.feature_store import OnlineFeatureStore
+from calidad_aire.processing.data_manager import (
+    CAT_GROUP,
+    DATE_COL,
+    TARGET_COL,
+    add_group_time_features,
+    load_dataset,
+)
+from calidad_aire.processing.dataset_cache import CACHE_DIRNAME, CATEGORICAL_COLS, HAS_PYARROW
+from calidad_aire.processing.features import compute_group_time_features
+
+
+# =========================
+# Featurización incremental
+# =========================
+#
+# Se persiste en <DATA_DIR>/.cache/features/<dataset>-<lags>_<rolls>/:
+#   - part-NNNNN.parquet: el frame ya featurizado, una parte por actualización
+#   - tails-NNNNN.json: cola por serie (últimas mediciones y última fecha), en el
+#     formato de `OnlineFeatureStore`
+#   - meta.json: filas de origen ya procesadas, nº de partes y archivo de colas.
+#     Se escribe al final, así una actualización interrumpida no deja estado a medias.
+#
+# Filas nuevas = filas del dataset cuya fecha es posterior a la última de su serie
+# (o de series nuevas). Sus features se calculan con la cola de la serie como
+# historia, sin recorrer el histórico completo.
+#
+# Costo de una actualización con k filas nuevas sobre N filas:
+#   - detección: lee solo las columnas de serie, fecha y target de la fuente (O(N),
+#     proyección Parquet) y las compara con la última fecha de cada serie;
+#   - las columnas completas se leen solo desde la primera fecha nueva (filtro
+#     empujado al lector Parquet) y la featurización es O(k);
+#   - las filas nuevas se intercalan por fecha en el frame persistido (búsqueda
+#     binaria + una copia, sin reordenar el histórico).
+# El frame devuelto tiene el mismo orden que una construcción completa (orden estable
+# por fecha; a igual fecha, el del archivo) mientras la fuente solo crezca al final.
+
+META_FILE = "meta.json"
+MAX_PARTS = 64  # al superarlo se compactan las partes en una sola
+
+
+def state_dir(lags: List[int], rolls: List[int]) -> Path:
+    key = "-".join(map(str, lags)) + "_" + "-".join(map(str, rolls))
+    return DATA_DIR / CACHE_DIRNAME / "features" / f"{Path(config.data_file).stem}-{key}"
+
+
+def _key_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de grupo como texto (faltantes como None), igual que las claves del store."""
+    keys = df[CAT_GROUP].astype(object)
+    return keys.where(keys.notna(), None).apply(lambda s: s.map(lambda v: v if v is None else str(v)))
+
+
+def _restore_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _write_state(directory: Path, n_source_rows: int, n_parts: int, tails: OnlineFeatureStore) -> None:
+    tails_file = f"tails-{n_parts:05d}.json"
+    tails.save(directory / tails_file)
+    meta = {"n_source_rows": n_source_rows, "n_parts": n_parts, "tails": tails_file}
+    tmp = directory / (META_FILE + ".tmp")
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    tmp.replace(directory / META_FILE)
+    for old in directory.glob("tails-*.json"):
+        if old.name != tails_file:
+            old.unlink(missing_ok=True)
+
+
+def _part_path(directory: Path, i: int) -> Path:
+    return directory / f"part-{i:05d}.parquet"
+
+
+def _merge_by_date(frame: pd.DataFrame, part: pd.DataFrame) -> pd.DataFrame:
+    """
+    Intercala `part` en `frame` (ambos ordenados por fecha) sin reordenar `frame`.
+
+    A igual fecha las filas de `part` quedan después: son posteriores en la fuente.
+    """
+    if part.empty:
+        return frame
+    n, k = len(frame), len(part)
+    # Posición de cada fila nueva entre las existentes
+    pos = np.searchsorted(frame[DATE_COL].to_numpy(), part[DATE_COL].to_numpy(), side="right")
+    take = np.empty(n + k, dtype=np.int64)
+    new_slots = pos + np.arange(k)
+    is_new = np.zeros(n + k, dtype=bool)
+    is_new[new_slots] = True
+    take[new_slots] = n + np.arange(k)
+    take[~is_new] = np.arange(n)
+    merged = pd.concat([frame, part], ignore_index=True).take(take).reset_index(drop=True)
+    return _restore_categoricals(merged)
+
+
+def _read_frame(directory: Path, n_parts: int) -> pd.DataFrame:
+    parts = [pd.read_parquet(_part_path(directory, i)) for i in range(n_parts)]
+    if len(parts) == 1:
+        return _restore_categoricals(parts[0])
+    # Cada parte está ordenada por fecha, pero una serie atrasada puede traer fechas
+    # anteriores a las de la parte previa. El orden estable (timsort) sobre partes ya
+    # ordenadas es una mezcla de corridas, y a igual fecha deja primero la parte anterior
+    df = pd.concat(parts, ignore_index=True)
+    df = df.sort_values(DATE_COL, kind="stable").reset_index(drop=True)
+    return _restore_categoricals(df)
+
+
+def _full_build(directory: Path, lags: List[int], rolls: List[int]) -> pd.DataFrame:
+    df = load_dataset()
+    tails = OnlineFeatureStore.from_history(
+        df, group_cols=CAT_GROUP, lags=lags, rolls=rolls, date_col=DATE_COL, target_col=TARGET_COL
+    )
+    n_source_rows = len(df)
+    featurized = add_group_time_features(df, lags=lags, rolls=rolls)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True, exist_ok=True)
+    featurized.to_parquet(_part_path(directory, 0), index=False)
+    _write_state(directory, n_source_rows, 1, tails)
+    return featurized
+
+
+def _new_rows_mask(df: pd.DataFrame, tails: OnlineFeatureStore) -> np.ndarray:
+    last = tails.tails()[CAT_GROUP + ["last_date"]]
+    merged = _key_frame(df).merge(last, on=CAT_GROUP, how="left")
+    last_date = pd.to_datetime(merged["last_date"])
+    return (last_date.isna() | (df[DATE_COL].to_numpy() > last_date)).to_numpy()
+
+
+def featurize_with_tails(
+    new: pd.DataFrame, tails: OnlineFeatureStore, lags: List[int], rolls: List[int]
+) -> pd.DataFrame:
+    """Features de las filas nuevas usando como historia la cola de cada serie en `tails`.
+
+    `new` debe venir en orden cronológico; las filas sin todos sus lags/rollings se descartan
+    como en `add_group_time_features`.
+    """
+    t = tails.tails()
+    counts = t["values"].map(len).to_numpy()
+    history = t.loc[t.index.repeat(counts), CAT_GROUP].reset_index(drop=True)
+    history[TARGET_COL] = np.concatenate(t["values"].tolist()) if len(t) else np.empty(0)
+
+    current = _key_frame(new).reset_index(drop=True)
+    current[TARGET_COL] = new[TARGET_COL].to_numpy()
+    # Sin historia (primer bloque) no se concatena: pandas avisa que con frames vacíos
+    # cambiará el dtype del resultado
+    combined = pd.concat([history, current], ignore_index=True) if len(history) else current
+    features = compute_group_time_features(combined, CAT_GROUP, TARGET_COL, lags=lags, rolls=rolls)
+
+    new = new.copy()
+    for col in features.columns:
+        new[col] = features[col].to_numpy()[len(history):]
+
+    cols_req = [TARGET_COL] + list(features.columns)
+    missing_after = new[cols_req].isna().sum().to_dict()
+    if any(v > 0 for v in missing_after.values()):
+        print("[WARN] NaN tras lags/rollings por columnas (filas nuevas):", missing_after)
+    return new.dropna(subset=cols_req)
+
+
+def featurize_incremental(
+    lags: Optional[List[int]] = None, rolls: Optional[List[int]] = None
+) -> pd.DataFrame:
+    """Dataset featurizado, recalculando solo las filas agregadas desde la última corrida.
+
+    Si no hay estado previo, o el histórico cambió (filas borradas o agregadas con
+    fecha no posterior a la última de su serie), reconstruye todo.
+    """
+    if lags is None:
+        lags = [1, 7, 30]
+    if rolls is None:
+        rolls = [7, 30]
+    if not HAS_PYARROW:
+        print("[WARN] pyarrow no disponible: featurización completa sin estado incremental.")
+        return add_group_time_features(load_dataset(), lags=lags, rolls=rolls)
+
+    directory = state_dir(lags, rolls)
+    meta_path = directory / META_FILE
+    if not meta_path.is_file():
+        return _full_build(directory, lags, rolls)
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+
+    # Detección con la proyección de serie/fecha/target: no se leen las demás columnas
+    keys = load_dataset(columns=CAT_GROUP)
+    tails = OnlineFeatureStore.load(directory / meta["tails"])
+    mask = _new_rows_mask(keys, tails)
+    n_new = int(mask.sum())
+    if meta["n_source_rows"] + n_new != len(keys):
+        print("[WARN] El histórico cambió respecto al estado incremental; se recalcula completo.")
+        return _full_build(directory, lags, rolls)
+
+    if not all(_part_path(directory, i).is_file() for i in range(meta["n_parts"])):
+        return _full_build(directory, lags, rolls)
+    frame = _read_frame(directory, meta["n_parts"])
+    if n_new == 0:
+        return frame
+
+    # Filas completas solo desde la primera fecha nueva
+    candidates = load_dataset(min_date=keys.loc[mask, DATE_COL].min())
+    new = candidates[_new_rows_mask(candidates, tails)]
+    if len(new) != n_new:
+        print("[WARN] Las filas nuevas no coinciden con la detección; se recalcula completo.")
+        return _full_build(directory, lags, rolls)
+    part = featurize_with_tails(new, tails, lags, rolls)
+    tails.ingest(new, date_col=DATE_COL, target_col=TARGET_COL)
+
+    frame = _merge_by_date(frame, part)
+
+    n_parts = meta["n_parts"]
+    if n_parts >= MAX_PARTS:
+        for i in range(n_parts):
+            _part_path(directory, i).unlink(missing_ok=True)
+        frame.to_parquet(_part_path(directory, 0), index=False)
+        n_parts = 1
+    else:
+        part.to_parquet(_part_path(directory, n_parts), index=False)
+        n_parts += 1
+    _write_state(directory, len(keys), n_parts, tails)
+    return frame
@@ -0,0 +1,122 @@
+"""
+Registro de child runs de MLflow en segundo plano y por lotes.
+
+Loguear cada candidato de una búsqueda con `mlflow.start_run` + `log_params` +
+`log_metrics` + `set_tags` cuesta varias llamadas síncronas al tracking server por
+candidato. `ChildRunLogger` encola los candidatos y un hilo escritor los registra
+con `MlflowClient`: una corrida (`create_run`), un único `log_batch` con params,
+métricas y tags, y el cierre (`set_terminated`). La cola es acotada: si el servidor
+es más lento que el entrenamiento, `log_child_run` bloquea en vez de acumular memoria.
+
+Funciona igual con un tracking store local (`file:///...`) que con uno remoto.
+"""
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID, MLFLOW_RUN_NAME
+
+# Límites por llamada de log_batch en MLflow
+MAX_PARAMS_PER_BATCH = 100
+MAX_TAGS_PER_BATCH = 100
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAM_VALUE_LENGTH = 500
+
+_STOP = object()
+
+
+class ChildRunLogger:
+    """Escritor en segundo plano de child runs (params/métricas/tags) con `log_batch`."""
+
+    def __init__(self, client: Optional[MlflowClient] = None, max_queue: int = 256):
+        self.client = client or MlflowClient()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._errors: List[BaseException] = []
+        self._closed = False
+        self.logged = 0
+        self._thread = threading.Thread(target=self._worker, name="mlflow-child-runs", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "ChildRunLogger":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(raise_errors=exc_type is None)
+
+    def log_child_run(
+        self,
+        experiment_id: str,
+        parent_run_id: str,
+        run_name: str,
+        params: Optional[Mapping[str, Any]] = None,
+        metrics: Optional[Mapping[str, float]] = None,
+        tags: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        """Encola un child run; bloquea solo si la cola está llena."""
+        if self._closed:
+            raise RuntimeError("ChildRunLogger ya fue cerrado")
+        self._queue.put({
+            "experiment_id": experiment_id,
+            "parent_run_id": parent_run_id,
+            "run_name": run_name,
+            "params": dict(params or {}),
+            "metrics": dict(metrics or {}),
+            "tags": dict(tags or {}),
+            "timestamp": int(time.time() * 1000),
+        })
+
+    def flush(self) -> None:
+        """Espera a que se registren todos los child runs encolados."""
+        self._queue.join()
+
+    def close(self, raise_errors: bool = True) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+        if raise_errors and self._errors:
+            raise RuntimeError(f"Fallaron {len(self._errors)} child runs de MLflow") from self._errors[0]
+
+    # -------------------------
+    # Hilo escritor
+    # -------------------------
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write(item)
+                self.logged += 1
+            except Exception as exc:  # se reporta al cerrar
+                self._errors.append(exc)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, item: Dict[str, Any]) -> None:
+        run = self.client.create_run(
+            experiment_id=item["experiment_id"],
+            start_time=item["timestamp"],
+            tags={MLFLOW_PARENT_RUN_ID: item["parent_run_id"], MLFLOW_RUN_NAME: item["run_name"]},
+        )
+        run_id = run.info.run_id
+        ts = item["timestamp"]
+        params = [Param(k, str(v)[:MAX_PARAM_VALUE_LENGTH]) for k, v in item["params"].items()]
+        metrics = [Metric(k, float(v), ts, 0) for k, v in item["metrics"].items()]
+        tags = [RunTag(k, str(v)) for k, v in item["tags"].items()]
+        # Normalmente cabe en una sola llamada; se trocea por los límites de log_batch
+        while params or metrics or tags:
+            self.client.log_batch(
+                run_id,
+                metrics=metrics[:MAX_METRICS_PER_BATCH],
+                params=params[:MAX_PARAMS_PER_BATCH],
+                tags=tags[:MAX_TAGS_PER_BATCH],
+            )
+            params = params[MAX_PARAMS_PER_BATCH:]
+            metrics = metrics[MAX_METRICS_PER_BATCH:]
+            tags = tags[MAX_TAGS_PER_BATCH:]
+        self.client.set_terminated(run_id, status="FINISHED")
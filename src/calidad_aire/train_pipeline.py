@@ -6,7 +6,7 @@ from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from calidad_aire.processing.data_manager import prepare_datasets
 from calidad_aire.config.core import config
 
-from calidad_aire.pipeline import air_quality_pipe
+from calidad_aire.pipeline import build_pipeline
 
 def run_training():
     """
@@ -20,6 +20,7 @@ def run_training():
     if exp_name:
         mlflow.set_experiment(exp_name)
     
+    air_quality_pipe = build_pipeline(config.pipeline_variant)
     data = prepare_datasets()  # puedes pasar lags/rolls si quieres cambiar
     X_train   = data["X_train"].drop(columns=[data["date_col"]])
     y_train   = data["y_train"]
@@ -64,7 +65,8 @@ def run_training():
         mlflow.sklearn.log_model(
             sk_model=air_quality_pipe,
             artifact_path="model",
-            input_example=X_train.head(1),
+            # categóricas como texto para que MLflow infiera la firma del modelo
+            input_example=X_train.head(1).astype({c: str for c in data["feature_cols_cat"]}),
             #registered_model_name="CalidadAireRisaraldaModel"
         )
         
@@ -1,27 +1,24 @@
 # gridsearch_ts_mlflow_calidad_aire.py
 
 import os
-from pathlib import Path
 import numpy as np
 import pandas as pd
 import mlflow
 import mlflow.sklearn
 
-from sklearn.model_selection import GridSearchCV, TimeSeriesSplit
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
-from sklearn.metrics import make_scorer, r2_score, mean_absolute_error
+from sklearn.metrics import r2_score, mean_absolute_error
 
 # >=1.4 (1.6+ eliminó 'squared'): usar root_mean_squared_error si existe
 try:
     from sklearn.metrics import root_mean_squared_error
-    RMSE_SCORER = make_scorer(root_mean_squared_error, greater_is_better=False)
     def rmse(y_true, y_pred): return root_mean_squared_error(y_true, y_pred)
 except Exception:
     from sklearn.metrics import mean_squared_error
-    RMSE_SCORER = make_scorer(lambda yt, yp: mean_squared_error(yt, yp) ** 0.5, greater_is_better=False)
     def rmse(y_true, y_pred): return mean_squared_error(y_true, y_pred) ** 0.5
 
 # Modelos base
@@ -29,6 +26,10 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import Ridge, ElasticNet
 from sklearn.svm import SVR
 
+from calidad_aire.model_search import SearchEngine, SearchSpec
+from calidad_aire.tracking import ChildRunLogger
+from calidad_aire.processing.data_manager import load_dataset, add_group_time_features
+
 # XGBoost opcional
 try:
     from xgboost import XGBRegressor
@@ -38,10 +39,7 @@ except Exception:
 
 
 # =================== CONFIGURACIÓN DE TUS COLUMNAS ===================
-# En local:
-CSV_PATH = Path("data/processed/Calidad_del_Aire_enriquecido.csv")
-# En Docker, usa:
-# CSV_PATH = Path("/app/data/processed/Calidad_del_Aire_enriquecido.csv")
+# El CSV se resuelve desde DATA_DIR/config.data_file (ver calidad_aire.config.core)
 
 DATE_COL   = "Fecha"
 TARGET_COL = "Medicion"
@@ -58,52 +56,15 @@ N_SPLITS = 5   # nº de folds temporales (TimeSeriesSplit)
 # =====================================================================
 
 
-# ============ 1) Carga y orden cronológico ============
-if not CSV_PATH.exists():
-    raise FileNotFoundError(f"No existe el CSV en {CSV_PATH}. Ajusta la ruta.")
-
-df = pd.read_csv(CSV_PATH)
-
-# Parseo robusto de fecha y orden
-df[DATE_COL] = pd.to_datetime(df[DATE_COL], errors="coerce")
-if df[DATE_COL].isna().all():
-    raise ValueError(f"No se pudo parsear '{DATE_COL}' a datetime.")
-df = df.sort_values(DATE_COL).reset_index(drop=True)
-
-if TARGET_COL not in df.columns:
-    raise ValueError(f"Target '{TARGET_COL}' no encontrado. Columnas: {list(df.columns)}")
-
-# ============ 2) Limpieza del target (sin NaN) ============
-# Forzar a numérico y eliminar filas sin target ANTES de featurizar
-df[TARGET_COL] = pd.to_numeric(df[TARGET_COL], errors="coerce")
-missing_y0 = df[TARGET_COL].isna().sum()
-if missing_y0:
-    print(f"[WARN] Filas con {TARGET_COL} NaN antes de featurización: {missing_y0}")
-df = df.dropna(subset=[TARGET_COL]).reset_index(drop=True)
+# ============ 1-2) Carga (cache Parquet tipado) y limpieza del target ============
+# load_dataset lee la copia columnar cacheada, ordena por fecha y elimina target NaN
+df = load_dataset()
 
 # ============ 3) Ingeniería temporal por grupo (evita fuga) ============
-# Lags del target por grupo
+# Lags y rolling means con shift(1) para no mirar el presente
 lags = [1, 7, 30]
-for lag in lags:
-    df[f"lag_{lag}"] = (
-        df.groupby(CAT_GROUP, dropna=False)[TARGET_COL].shift(lag)
-    )
-
-# Rolling means con shift(1) para no mirar el presente
 rolls = [7, 30]
-for w in rolls:
-    df[f"rollmean_{w}"] = (
-        df.groupby(CAT_GROUP, dropna=False)[TARGET_COL]
-          .apply(lambda s: s.shift(1).rolling(w, min_periods=max(3, w//3)).mean())
-          .reset_index(level=CAT_GROUP, drop=True)
-    )
-
-# Elimina NaN generados por lags/rollings (y re-checa target por seguridad)
-cols_req = [TARGET_COL] + [f"lag_{l}" for l in lags] + [f"rollmean_{w}" for w in rolls]
-missing_after = df[cols_req].isna().sum().to_dict()
-if any(v > 0 for v in missing_after.values()):
-    print("[WARN] NaN tras lags/rollings por columnas:", missing_after)
-df = df.dropna(subset=cols_req).reset_index(drop=True)
+df = add_group_time_features(df, lags=lags, rolls=rolls)
 
 # ============ 4) Split por fecha: train vs holdout OUT-OF-TIME ============
 range_days = (df[DATE_COL].max() - df[DATE_COL].min()).days
@@ -204,62 +165,41 @@ if HAS_XGB:
 H_TEST = max(60, int(0.1 * len(X_train)))      # ~10% del train por fold (mín. 60)
 tscv = TimeSeriesSplit(n_splits=N_SPLITS, test_size=H_TEST, gap=0)
 
-scoring = {
-    "rmse": RMSE_SCORER,                                   # minimizar
-    "mae": make_scorer(mean_absolute_error, greater_is_better=False),
-    "r2":  make_scorer(r2_score)                           # maximizar
-}
+# Familias con successive halving sobre n_estimators (el resto: grilla completa)
+HALVING_FAMILIES = {"RandomForest", "XGBRegressor"}
+# Cache opcional en disco del preprocesamiento por fold entre corridas
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR")
 
-# ============ 9) Función para correr Grid + MLflow ============
-def run_grid_ts_and_log(model_name, pipe, grid, experiment=EXPERIMENT_NAME):
+# ============ 9) Función para loguear la búsqueda en MLflow ============
+def log_search_and_holdout(model_name, result, child_logger, experiment=EXPERIMENT_NAME):
     mlflow.set_experiment(experiment)
 
-    gs = GridSearchCV(
-        estimator=pipe,
-        param_grid=grid,
-        scoring=scoring,
-        refit="rmse",                 # mejor = menor RMSE (más negativo)
-        cv=tscv,
-        n_jobs=-1,
-        verbose=0,
-        return_train_score=False,
-    )
-
-    with mlflow.start_run(run_name=f"{model_name}__grid_ts"):
-        # ¡OJO! excluimos 'Fecha' del fit/predict (no entra al ColumnTransformer)
-        gs.fit(X_train.drop(columns=[DATE_COL]), y_train)
-
-        res = gs.cv_results_
-        n = len(res["params"])
-
-        # Log de TODOS los candidatos como child runs
-        for i in range(n):
-            with mlflow.start_run(run_name=f"{model_name}__cand_{i}", nested=True):
-                mlflow.log_params(res["params"][i])
-                mean_rmse = -res["mean_test_rmse"][i]
-                mean_mae  = -res["mean_test_mae"][i]
-                mean_r2   =  res["mean_test_r2"][i]
-                mlflow.log_metrics({"cv_rmse": mean_rmse, "cv_mae": mean_mae, "cv_r2": mean_r2})
-                mlflow.set_tags({
+    with mlflow.start_run(run_name=f"{model_name}__grid_ts") as parent:
+        # TODOS los candidatos (de todas las rondas) como child runs, registrados en
+        # segundo plano con log_batch mientras se evalúa el holdout
+        for i, cand in enumerate(result.candidates):
+            child_logger.log_child_run(
+                experiment_id=parent.info.experiment_id,
+                parent_run_id=parent.info.run_id,
+                run_name=f"{model_name}__cand_{i}",
+                params=cand["params"],
+                metrics={"cv_rmse": cand["cv_rmse"], "cv_mae": cand["cv_mae"], "cv_r2": cand["cv_r2"]},
+                tags={
                     "model_family": model_name,
                     "cv": "TimeSeriesSplit",
-                    "kind": "grid_candidate"
-                })
-
-        # Mejor en CV
-        best_idx    = gs.best_index_
-        best_params = res["params"][best_idx]
-        best_rmse   = -res["mean_test_rmse"][best_idx]
-        best_mae    = -res["mean_test_mae"][best_idx]
-        best_r2     =  res["mean_test_r2"][best_idx]
-
-        mlflow.log_params({f"best__{k}": v for k, v in best_params.items()})
-        mlflow.log_metrics({"best_cv_rmse": best_rmse, "best_cv_mae": best_mae, "best_cv_r2": best_r2})
+                    "kind": "grid_candidate",
+                    "halving_round": cand["round"],
+                },
+            )
+
+        # Mejor en CV (entre los candidatos de la última ronda)
+        best = result.best
+        mlflow.log_params({f"best__{k}": v for k, v in result.best_params.items()})
+        mlflow.log_metrics({"best_cv_rmse": best["cv_rmse"], "best_cv_mae": best["cv_mae"], "best_cv_r2": best["cv_r2"]})
         mlflow.set_tags({"model_family": model_name, "summary": "best_cv_ts"})
 
-        # Reentrena el mejor con TODO el train cronológico
-        best_pipe = gs.best_estimator_
-        best_pipe.fit(X_train.drop(columns=[DATE_COL]), y_train)
+        # El motor ya reentrenó el mejor una sola vez con TODO el train cronológico
+        best_pipe = result.best_estimator
 
         # Holdout OUT-OF-TIME
         yph = best_pipe.predict(X_holdout.drop(columns=[DATE_COL]))
@@ -289,13 +229,20 @@ def run_grid_ts_and_log(model_name, pipe, grid, experiment=EXPERIMENT_NAME):
         preds_df.to_csv(tmp_csv, index=False)
         mlflow.log_artifact(tmp_csv)
 
-        print(f"[{model_name}] best_cv_rmse={best_rmse:.4f} | holdout_rmse={rmse_holdout:.4f} | holdout_r2={r2_holdout:.4f}")
-        return gs
+        print(f"[{model_name}] best_cv_rmse={best['cv_rmse']:.4f} | holdout_rmse={rmse_holdout:.4f} | holdout_r2={r2_holdout:.4f}")
+        return result
 
-# ============ 10) Ejecuta grids ============
+# ============ 10) Ejecuta todas las búsquedas en un único pool ============
 if __name__ == "__main__":
-    for name, pipe in pipelines.items():
-        grid = param_grids.get(name, {})
-        if not grid:
-            continue
-        run_grid_ts_and_log(name, pipe, grid)
\ No newline at end of file
+    specs = [
+        SearchSpec(name, pipe, param_grids[name], halving=name in HALVING_FAMILIES)
+        for name, pipe in pipelines.items()
+        if param_grids.get(name)
+    ]
+    engine = SearchEngine(cv=tscv, n_jobs=-1, cache_dir=SEARCH_CACHE_DIR)
+    # ¡OJO! excluimos 'Fecha' del fit/predict (no entra al ColumnTransformer)
+    results = engine.run(specs, X_train.drop(columns=[DATE_COL]), y_train)
+
+    with ChildRunLogger() as child_logger:
+        for name, result in results.items():
+            log_search_and_holdout(name, result, child_logger)
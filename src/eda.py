@@ -18,6 +18,13 @@ import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from pathlib import Path
+
+# Cache columnar opcional (requiere el paquete calidad_aire instalado)
+try:
+    from calidad_aire.processing.dataset_cache import read_dataset
+except Exception:
+    read_dataset = None
 
 # Rutas base
 BASE = os.path.dirname(os.path.dirname(__file__))
@@ -45,7 +52,11 @@ DIAS_MAP = {
 def load_data() -> pd.DataFrame:
     """Carga el dataset enriquecido si existe; si no, lo crea desde RAW."""
     if os.path.exists(PROCESSED):
-        df = pd.read_csv(PROCESSED)
+        if read_dataset is not None:
+            # copia Parquet cacheada y tipada (ver calidad_aire.processing.dataset_cache)
+            df = read_dataset(Path(PROCESSED))
+        else:
+            df = pd.read_csv(PROCESSED)
         # tipado defensivo por si PROCESSED viene de otro run
         df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
         df["Medicion"] = pd.to_numeric(df["Medicion"], errors="coerce")
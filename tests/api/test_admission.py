@@ -0,0 +1,100 @@
+"""Control de admisión: cola llena, tiempo de espera agotado y cancelación."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app_api.admission import AdmissionController
+
+
+def _controller(**kwargs) -> AdmissionController:
+    options = dict(max_rows=10, max_requests=100, max_queue=1, timeout=5.0, retry_after=3)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def run() -> None:
+        controller = _controller()
+        await controller.acquire(10)
+        queued = asyncio.ensure_future(controller.acquire(4))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await controller.acquire(1)
+        assert exc.value.status_code == 503
+        assert exc.value.headers == {"Retry-After": "3"}
+
+        controller.release(10)
+        assert await queued == 4
+        assert controller.stats() == {
+            "queue_depth": 0, "inflight_rows": 4, "inflight_requests": 0, "admitted": 2, "rejected": 1,
+        }
+
+    asyncio.run(run())
+
+
+def test_timeout_leaves_the_queue_and_wakes_the_next():
+    async def run() -> None:
+        controller = _controller(max_queue=2, timeout=0.05)
+        await controller.acquire(6)
+        # La primera de la cola no cabe; la segunda sí cabría, pero no se adelanta (FIFO)
+        big = asyncio.ensure_future(controller.acquire(8))
+        small = asyncio.ensure_future(controller.acquire(3))
+        with pytest.raises(HTTPException):
+            await big
+        # Al vencer la primera, la siguiente entra sin esperar su propio plazo
+        assert await asyncio.wait_for(small, 0.01) == 3
+        assert controller.inflight_rows == 9
+        assert controller.stats()["queue_depth"] == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_is_removed():
+    async def run() -> None:
+        controller = _controller(max_queue=2)
+        await controller.acquire(10)
+        cancelled = asyncio.ensure_future(controller.acquire(5))
+        waiting = asyncio.ensure_future(controller.acquire(5))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert controller.stats()["queue_depth"] == 1
+
+        controller.release(10)
+        assert await waiting == 5
+        assert controller.inflight_rows == 5
+
+    asyncio.run(run())
+
+
+def test_cancelled_after_admission_releases_rows():
+    async def hold(controller: AdmissionController) -> None:
+        async with controller.admit(4):
+            await asyncio.sleep(0)
+
+    async def run() -> None:
+        controller = _controller()
+        await controller.acquire(10)
+        queued = asyncio.ensure_future(hold(controller))
+        await asyncio.sleep(0)
+        # Se admite y se cancela antes de que la tarea retome: según la versión de Python
+        # la cancelación llega a `acquire` o a la espera dentro de `admit`; en ambos casos
+        # las filas no quedan cobradas
+        controller.release(10)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert controller.inflight_rows == 0
+
+    asyncio.run(run())
+
+
+def test_oversized_batch_is_charged_as_max_rows():
+    async def run() -> None:
+        controller = _controller()
+        async with controller.admit(5000):
+            assert controller.inflight_rows == 10
+        assert controller.inflight_rows == 0
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+"""Micro-batching: un lote que falla se reintenta petición por petición."""
+import asyncio
+from typing import Dict, List
+
+from app_api.batching import MicroBatcher
+
+
+def _handler(calls: List[List[int]]):
+    """Predice el doble de cada valor; falla si el lote trae un valor negativo."""
+
+    def handler(columns: Dict[str, list]) -> dict:
+        calls.append(list(columns["x"]))
+        if any(v < 0 for v in columns["x"]):
+            raise ValueError("valor negativo")
+        return {"predictions": [2.0 * v for v in columns["x"]], "version": "v1"}
+
+    return handler
+
+
+def _submit_all(batcher: MicroBatcher, requests: List[List[int]]) -> list:
+    async def run() -> list:
+        return await asyncio.gather(
+            *(batcher.submit({"x": xs}, len(xs)) for xs in requests), return_exceptions=True
+        )
+
+    return asyncio.run(run())
+
+
+def test_requests_share_one_call():
+    calls: List[List[int]] = []
+    batcher = MicroBatcher(_handler(calls), max_wait_ms=50, max_rows=100)
+    results = _submit_all(batcher, [[1, 2], [3], [4, 5, 6]])
+    assert calls == [[1, 2, 3, 4, 5, 6]]
+    assert [r["predictions"] for r in results] == [[2.0, 4.0], [6.0], [8.0, 10.0, 12.0]]
+    assert all(r["version"] == "v1" for r in results)
+
+
+def test_failed_batch_falls_back_to_per_request():
+    calls: List[List[int]] = []
+    batcher = MicroBatcher(_handler(calls), max_wait_ms=50, max_rows=100)
+    ok_1, failed, ok_2 = _submit_all(batcher, [[1, 2], [-3], [4]])
+    # El lote completo falla y cada petición se reintenta sola
+    assert calls[0] == [1, 2, -3, 4]
+    assert sorted(calls[1:]) == [[-3], [1, 2], [4]]
+    assert ok_1["predictions"] == [2.0, 4.0] and ok_2["predictions"] == [8.0]
+    assert isinstance(failed, ValueError)
+
+
+def test_max_rows_flushes_without_waiting():
+    calls: List[List[int]] = []
+    # Ventana de una hora: solo el tope de filas puede disparar el lote
+    batcher = MicroBatcher(_handler(calls), max_wait_ms=3_600_000, max_rows=3)
+    results = _submit_all(batcher, [[1], [2, 3]])
+    assert calls == [[1, 2, 3]]
+    assert [r["predictions"] for r in results] == [[2.0], [4.0, 6.0]]
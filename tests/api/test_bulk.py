@@ -0,0 +1,123 @@
+"""Scoring en streaming: framing NDJSON / Arrow IPC con el cuerpo partido en bloques."""
+import asyncio
+import io
+import json
+from typing import AsyncIterator, Dict, List
+
+import pandas as pd
+import pytest
+
+from app_api import bulk
+
+ROW = {
+    "Municipio": "PEREIRA",
+    "Estacion": "U.T.P.",
+    "Diametro aerodinamico": "PM10",
+    "Año": 2025,
+    "Mes": 10,
+    "Dia": 15,
+    "DiaSemana": "Wednesday",
+}
+
+
+def _rows(n: int) -> List[dict]:
+    return [{**ROW, "Dia": 1 + i % 28} for i in range(n)]
+
+
+async def _chunks(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+class FakeModel:
+    """Predice el día de cada fila y registra el tamaño de cada bloque."""
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+
+    async def __call__(self, columns: Dict[str, list]) -> dict:
+        self.calls.append(len(columns["Dia"]))
+        return {"predictions": [float(d) for d in columns["Dia"]]}
+
+
+def _collect(stream: AsyncIterator) -> list:
+    async def run() -> list:
+        return [part async for part in stream]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_ndjson_split_chunks(chunk_size):
+    rows = _rows(10)
+    body = "".join(json.dumps(r) + "\n" for r in rows).encode()
+    model = FakeModel()
+    out = "".join(_collect(bulk.stream_ndjson(_chunks(body, chunk_size), model, chunk_rows=4)))
+    predictions = [json.loads(line)["prediction"] for line in out.splitlines()]
+    assert predictions == [float(r["Dia"]) for r in rows]
+    assert model.calls == [4, 4, 2]
+
+
+def test_ndjson_invalid_line_ends_stream_with_error():
+    body = (json.dumps(ROW) + "\n{no es json\n").encode()
+    lines = "".join(_collect(bulk.stream_ndjson(_chunks(body, 5), FakeModel(), chunk_rows=4))).splitlines()
+    assert "error" in json.loads(lines[-1])
+
+
+pa = pytest.importorskip("pyarrow")
+ipc = pytest.importorskip("pyarrow.ipc")
+
+
+def _arrow_body(frames: List[pd.DataFrame], **options) -> bytes:
+    sink = io.BytesIO()
+    schema = pa.Schema.from_pandas(frames[0], preserve_index=False)
+    with ipc.new_stream(sink, schema, options=ipc.IpcWriteOptions(**options)) as writer:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+    return sink.getvalue()
+
+
+def _arrow_predictions(parts: List[bytes]) -> List[float]:
+    return ipc.open_stream(b"".join(parts)).read_all().column("prediction").to_pylist()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 256, 1 << 20])
+def test_arrow_split_chunks(chunk_size):
+    df = pd.DataFrame(_rows(25))
+    body = _arrow_body([df.iloc[:10], df.iloc[10:]])
+    model = FakeModel()
+    parts = _collect(bulk.stream_arrow(_chunks(body, chunk_size), model, chunk_rows=4))
+    assert _arrow_predictions(parts) == df["Dia"].astype(float).tolist()
+    assert model.calls == [4, 4, 2, 4, 4, 4, 3]
+
+
+def test_arrow_dictionary_columns():
+    # from_pandas codifica las columnas category como diccionarios (mensajes aparte)
+    df = pd.DataFrame(_rows(12))
+    for col in ("Municipio", "Estacion", "Diametro aerodinamico", "DiaSemana"):
+        df[col] = df[col].astype("category")
+    body = _arrow_body([df.iloc[:6], df.iloc[6:]])
+    parts = _collect(bulk.stream_arrow(_chunks(body, 17), FakeModel(), chunk_rows=5))
+    assert _arrow_predictions(parts) == df["Dia"].astype(float).tolist()
+
+
+def test_arrow_dictionary_deltas():
+    first, second = pd.DataFrame(_rows(3)), pd.DataFrame(_rows(3)).assign(Municipio="DOSQUEBRADAS")
+    first["Municipio"] = pd.Categorical(first["Municipio"], categories=["PEREIRA"])
+    second["Municipio"] = pd.Categorical(second["Municipio"], categories=["PEREIRA", "DOSQUEBRADAS"])
+    body = _arrow_body([first, second], emit_dictionary_deltas=True)
+    model = FakeModel()
+    parts = _collect(bulk.stream_arrow(_chunks(body, 11), model, chunk_rows=10))
+    assert len(_arrow_predictions(parts)) == 6
+    assert model.calls == [3, 3]
+
+
+def test_arrow_truncated_stream_is_cut_cleanly():
+    df = pd.DataFrame(_rows(8))
+    body = _arrow_body([df.iloc[:4], df.iloc[4:]])
+    model = FakeModel()
+    parts = _collect(bulk.stream_arrow(_chunks(body[:-20], 9), model, chunk_rows=4))
+    # Sale el primer bloque completo y el stream se corta sin excepción (ni fin de stream)
+    assert model.calls == [4]
+    reader = ipc.open_stream(b"".join(parts))
+    assert reader.read_next_batch().column("prediction").to_pylist() == df["Dia"].iloc[:4].astype(float).tolist()
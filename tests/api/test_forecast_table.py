@@ -0,0 +1,53 @@
+"""Publicación de versiones de la tabla de pronósticos."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app_api import forecast_table
+from calidad_aire import predict
+from calidad_aire.feature_store import OnlineFeatureStore
+
+
+@pytest.fixture
+def feature_store(tmp_path):
+    history = pd.DataFrame({
+        "Municipio": ["PEREIRA"] * 3 + ["DOSQUEBRADAS"] * 3,
+        "Estacion": ["A"] * 3 + ["B"] * 3,
+        "Diametro aerodinamico": ["PM10"] * 6,
+        "Fecha": list(pd.date_range("2025-01-01", periods=3)) * 2,
+        "Medicion": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+    path = tmp_path / "feature_store.json"
+    OnlineFeatureStore.from_history(history).save(path)
+    return str(path)
+
+
+def _fake_model(offset):
+    def make_fast_prediction(columns, run_id):
+        return {"predictions": [offset + d for d in columns["Dia"]], "errors": None}
+
+    return make_fast_prediction
+
+
+def test_builds_in_the_same_second_do_not_touch_mapped_versions(tmp_path, feature_store, monkeypatch):
+    directory = tmp_path / "forecast"
+    monkeypatch.setattr(forecast_table.time, "strftime", lambda fmt: "20250101T000000")
+
+    monkeypatch.setattr(predict, "make_fast_prediction", _fake_model(0.0))
+    first = forecast_table.build_forecast_table(directory, "run", feature_store, days=3, start=date(2025, 1, 4))
+    mapped = forecast_table.ForecastTable(directory)
+    before = mapped.values.tolist()
+
+    for offset in (100.0, 200.0):
+        monkeypatch.setattr(predict, "make_fast_prediction", _fake_model(offset))
+        latest = forecast_table.build_forecast_table(directory, "run", feature_store, days=3, start=date(2025, 1, 4))
+
+    assert len({first["version"], latest["version"]}) == 2
+    # La versión mapeada antes conserva sus valores
+    assert mapped.values.tolist() == before
+    assert forecast_table.ForecastTable(directory).values.min() >= 200.0
+    # Quedan la vigente y la anterior, sin temporales
+    names = sorted(p.name for p in directory.iterdir())
+    assert len([n for n in names if n.endswith(".keys.npy")]) == 2
+    assert not [n for n in names if n.endswith(".tmp")]
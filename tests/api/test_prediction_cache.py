@@ -0,0 +1,60 @@
+"""Claves del cache de predicciones: run_id, columnas y valores normalizados por fila."""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app_api.prediction_cache import PredictionCache
+
+
+class Model:
+    """Suma las columnas numéricas de cada fila y registra las filas que recibe."""
+
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, list]] = []
+
+    def __call__(self, columns: Dict[str, Sequence]) -> dict:
+        columns = {name: list(values) for name, values in columns.items()}
+        self.calls.append(columns)
+        rows = zip(*columns.values())
+        return {"predictions": [float(sum(v for v in row if v is not None)) for row in rows], "errors": None}
+
+
+def test_only_missing_rows_are_computed():
+    cache, model = PredictionCache(maxsize=100, ttl=60), Model()
+    cache.predict("run-a", {"Dia": [1, 2]}, model)
+    result = cache.predict("run-a", {"Dia": [2, 3, 1]}, model)
+    assert result["predictions"] == [2.0, 3.0, 1.0]
+    assert model.calls[-1] == {"Dia": [3]}
+    assert cache.stats() == {"hits": 2, "misses": 3, "size": 3}
+
+
+def test_run_id_is_part_of_the_key():
+    cache, model = PredictionCache(maxsize=100, ttl=60), Model()
+    cache.predict("run-a", {"Dia": [1]}, model)
+    cache.predict("run-b", {"Dia": [1]}, model)
+    assert len(model.calls) == 2
+
+
+def test_feature_columns_are_part_of_the_key():
+    cache, model = PredictionCache(maxsize=100, ttl=60), Model()
+    cache.predict("run-a", {"Dia": [1], "lag_1": [10.0]}, model)
+    # Una medición nueva cambia el lag: la fila ya no coincide
+    assert cache.predict("run-a", {"Dia": [1], "lag_1": [12.0]}, model)["predictions"] == [13.0]
+    # Otro conjunto de columnas con los mismos valores tampoco
+    cache.predict("run-a", {"Dia": [1]}, model)
+    assert len(model.calls) == 3
+
+
+def test_nan_none_and_arrays_share_keys():
+    cache, model = PredictionCache(maxsize=100, ttl=60), Model()
+    cache.predict("run-a", {"Dia": [1], "lag_1": [None]}, model)
+    result = cache.predict("run-a", {"Dia": np.array([1]), "lag_1": np.array([np.nan])}, model)
+    assert result["predictions"] == [1.0]
+    assert len(model.calls) == 1
+
+
+def test_errors_are_not_cached():
+    cache = PredictionCache(maxsize=100, ttl=60)
+    failed = cache.predict("run-a", {"Dia": [1]}, lambda columns: {"predictions": None, "errors": "falla"})
+    assert failed["errors"] == "falla"
+    assert len(cache) == 0
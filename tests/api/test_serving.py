@@ -0,0 +1,57 @@
+"""Feature store compartido entre workers a través de FEATURE_STORE_PATH."""
+import pandas as pd
+import pytest
+
+from app_api import serving
+from calidad_aire.feature_store import OnlineFeatureStore
+
+KEY = {"Municipio": "PEREIRA", "Estacion": "U.T.P.", "Diametro aerodinamico": "PM10"}
+
+
+def _measurements(start: str, values) -> pd.DataFrame:
+    dates = pd.date_range(start, periods=len(values), freq="D")
+    return pd.DataFrame([{**KEY, "Fecha": d.strftime("%Y-%m-%d"), "Medicion": v} for d, v in zip(dates, values)])
+
+
+def _lag_1() -> float:
+    store = serving.get_feature_store()
+    return store.feature_matrix({k: [v] for k, v in KEY.items()}, 1)[0][store.feature_cols.index("lag_1")]
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(serving, "FEATURE_STORE_CHECK_INTERVAL", 0.0)
+    monkeypatch.setattr(serving, "_feature_store", None)
+    path = tmp_path / "feature_store.json"
+    OnlineFeatureStore().save(path)
+    serving.load_feature_store(str(path))
+    yield path
+    serving.load_feature_store(None)
+
+
+def test_ingest_publishes_to_the_file(store_path):
+    assert serving.ingest_into_feature_store(_measurements("2025-01-01", [10.0, 11.0])) == 2
+    assert len(OnlineFeatureStore.load(store_path)) == 1
+    assert _lag_1() == 11.0
+
+
+def test_other_worker_writes_are_reloaded(store_path):
+    serving.ingest_into_feature_store(_measurements("2025-01-01", [10.0]))
+    # Otro worker parte del archivo, ingiere y lo reescribe
+    other = OnlineFeatureStore.load(store_path)
+    other.ingest(_measurements("2025-01-02", [20.0]))
+    other.save(store_path)
+    assert _lag_1() == 20.0
+
+
+def test_concurrent_ingests_are_not_lost(store_path, monkeypatch):
+    # Sin revisión periódica: solo la ingesta relee el archivo antes de escribir
+    monkeypatch.setattr(serving, "FEATURE_STORE_CHECK_INTERVAL", 3600.0)
+    serving.ingest_into_feature_store(_measurements("2025-01-01", [10.0]))
+    other = OnlineFeatureStore.load(store_path)
+    other.ingest(_measurements("2025-01-02", [20.0]))
+    other.save(store_path)
+
+    serving.ingest_into_feature_store(_measurements("2025-01-03", [30.0]))
+    (tail,) = OnlineFeatureStore.load(store_path).tails()["values"]
+    assert tail.tolist() == [10.0, 20.0, 30.0]
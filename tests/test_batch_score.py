@@ -0,0 +1,17 @@
+"""Featurización por bloques del scoring batch."""
+import warnings
+
+import pandas as pd
+
+from benchmarks.synthetic import make_station_dataset, write_dataset
+from calidad_aire.batch_score import featurized_chunks
+from calidad_aire.feature_store import OnlineFeatureStore
+
+
+def test_chunks_match_one_block_and_do_not_warn(tmp_path):
+    path = write_dataset(make_station_dataset(n_stations=3, n_years=1), tmp_path / "data.csv")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        chunked = pd.concat(featurized_chunks(path, 250, OnlineFeatureStore(), [1, 7, 30], [7, 30]))
+    whole = pd.concat(featurized_chunks(path, 10**6, OnlineFeatureStore(), [1, 7, 30], [7, 30]))
+    pd.testing.assert_frame_equal(chunked.reset_index(drop=True), whole.reset_index(drop=True))
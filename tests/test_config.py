@@ -0,0 +1,25 @@
+"""Configuración memoizada y el alias `pipeline.air_quality_pipe`."""
+import yaml
+
+from calidad_aire import pipeline
+from calidad_aire.config import core
+
+
+def test_config_is_read_once_until_reload(tmp_path, monkeypatch):
+    parsed = core.fetch_config_from_yaml()
+    path = tmp_path / "config.yml"
+    path.write_text(yaml.safe_dump(parsed), encoding="utf-8")
+    monkeypatch.setattr(core, "CONFIG_FILE_PATH", path)
+    monkeypatch.setattr(core, "_cached_config", None)
+
+    assert core.config.max_depth == parsed["max_depth"]
+    path.write_text(yaml.safe_dump({**parsed, "max_depth": parsed["max_depth"] + 1}), encoding="utf-8")
+    # Sin reload no se vuelve a leer el archivo
+    assert core.config.max_depth == parsed["max_depth"]
+    assert core.reload_config().max_depth == parsed["max_depth"] + 1
+    assert core.config.max_depth == parsed["max_depth"] + 1
+
+
+def test_air_quality_pipe_is_one_object(monkeypatch):
+    monkeypatch.delitem(vars(pipeline), "air_quality_pipe", raising=False)
+    assert pipeline.air_quality_pipe is pipeline.air_quality_pipe
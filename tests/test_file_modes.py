@@ -0,0 +1,23 @@
+"""Los archivos publicados con temporal + os.replace no quedan en 0600."""
+import stat
+
+import pandas as pd
+
+from calidad_aire.artifact_store import _atomic_write_text
+from calidad_aire.feature_store import OnlineFeatureStore
+from calidad_aire.fileutil import FILE_MODE
+from calidad_aire.processing.dataset_cache import _write_cache
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_published_files_follow_the_umask(tmp_path):
+    _atomic_write_text(tmp_path / "refs" / "run", "digest")
+    _write_cache(pd.DataFrame({"Medicion": [1.0, 2.0]}), tmp_path / ".cache" / "data.parquet")
+    OnlineFeatureStore().save(tmp_path / "feature_store.json")
+
+    for path in (tmp_path / "refs" / "run", tmp_path / ".cache" / "data.parquet", tmp_path / "feature_store.json"):
+        assert _mode(path) == FILE_MODE
+    assert FILE_MODE & stat.S_IRUSR
@@ -0,0 +1,64 @@
+"""ChildRunLogger contra un tracking store local (`file://`) temporal."""
+import pytest
+from mlflow.tracking import MlflowClient
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID, MLFLOW_RUN_NAME
+
+from calidad_aire.tracking import MAX_PARAMS_PER_BATCH, ChildRunLogger
+
+
+@pytest.fixture
+def client(tmp_path):
+    return MlflowClient(tracking_uri=(tmp_path / "mlruns").as_uri())
+
+
+@pytest.fixture
+def parent(client):
+    experiment_id = client.create_experiment("child_runs")
+    return client.create_run(experiment_id)
+
+
+def test_child_runs_are_logged_and_finished(client, parent):
+    experiment_id = parent.info.experiment_id
+    with ChildRunLogger(client) as logger:
+        for i in range(3):
+            logger.log_child_run(
+                experiment_id,
+                parent.info.run_id,
+                f"candidato_{i}",
+                params={"max_depth": i + 2, "learning_rate": 0.1},
+                metrics={"rmse": 1.0 + i, "r2": 0.5},
+                tags={"variant": "xgb"},
+            )
+    assert logger.logged == 3
+
+    children = client.search_runs(
+        [experiment_id], filter_string=f"tags.`{MLFLOW_PARENT_RUN_ID}` = '{parent.info.run_id}'"
+    )
+    by_name = {run.data.tags[MLFLOW_RUN_NAME]: run for run in children}
+    assert sorted(by_name) == ["candidato_0", "candidato_1", "candidato_2"]
+    for i in range(3):
+        run = by_name[f"candidato_{i}"]
+        assert run.info.status == "FINISHED"
+        assert run.data.params == {"max_depth": str(i + 2), "learning_rate": "0.1"}
+        assert run.data.metrics == {"rmse": 1.0 + i, "r2": 0.5}
+        assert run.data.tags["variant"] == "xgb"
+
+
+def test_params_beyond_one_batch_are_split(client, parent):
+    params = {f"p{i:03d}": i for i in range(MAX_PARAMS_PER_BATCH + 5)}
+    with ChildRunLogger(client) as logger:
+        logger.log_child_run(parent.info.experiment_id, parent.info.run_id, "grande", params=params)
+
+    (run,) = client.search_runs([parent.info.experiment_id], filter_string="tags.mlflow.runName = 'grande'")
+    assert run.info.status == "FINISHED"
+    assert len(run.data.params) == len(params)
+
+
+def test_write_errors_are_raised_on_close(client):
+    logger = ChildRunLogger(client)
+    logger.log_child_run("no-existe", "sin-padre", "huerfano", metrics={"rmse": 1.0})
+    with pytest.raises(RuntimeError, match="Fallaron 1 child runs"):
+        logger.close()
+    assert logger.logged == 0
+    with pytest.raises(RuntimeError, match="cerrado"):
+        logger.log_child_run("0", "x", "tarde")